@@ -1,9 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, make_response, Response
 import os
-import json
+import time
+import uuid
+import tempfile
+import atexit
+import functools
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import logging
-from resume_parser.parser import parse_resume, get_all_skills, format_parsed_data, get_degree_graduation_years
+from werkzeug.utils import secure_filename
+from resume_parser.parser import parse_resume, get_all_skills, read_stream, sniff_file_type, flag_duplicate
+from resume_parser.corpus import ResumeCorpus, UPDATED
+from resume_parser.watcher import CorpusWatcher
+from resume_parser.search import BM25Index
+from resume_parser.embeddings import SemanticMatcher, get_embedder
+from resume_parser.dedup import MinHashLSH
+from resume_parser.storage import (RECORD_SUFFIXES, read_record, write_record, expand_record, record_filename,
+                                   resolve_record_path, is_record_id)
+from resume_parser.shared_cache import SharedCache
+from resume_parser.views import build_result_view, RecordVersion
+from resume_parser.query import ResumeQuery, compile_query
+from resume_parser.concurrency import LLM_DEADLINE, llm_limiter
+from resume_parser.artifacts import ArtifactStore
+from resume_parser.fulltext import FullTextIndex, QuerySyntaxError
+from resume_parser.sandbox import ExtractionPool, ExtractionError
+from resume_parser.scheduler import Job, BULK, INTERACTIVE_JOB, llm_scheduler
+from resume_parser.export import FORMATS as EXPORT_FORMATS, ExportError, check_export, export_rows, matching_ids
+from resume_parser.analytics import SkillMatrix, AnalyticsError
 
 # Configure logging
 logging.basicConfig(
@@ -15,11 +39,134 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['PARSED_DATA'] = 'parsed_data'
+app.config['VECTOR_DATA'] = 'vector_data'
+# Content-addressed store of extracted and cleaned resume text
+app.config['ARTIFACT_DATA'] = 'artifacts'
+# SQLite FTS5 index over resume text and experience
+app.config['FULLTEXT_INDEX'] = os.path.join('cache', 'fulltext.sqlite3')
+# Set to a sentence-transformers model name (e.g. all-MiniLM-L6-v2) to use it instead of the hashing embedder
+app.config['EMBEDDING_MODEL'] = os.environ.get('RESUME_EMBEDDING_MODEL')
+# Reuse the earlier parse when an upload is a near-duplicate of a stored resume
+app.config['REUSE_DUPLICATE_PARSE'] = True
+# Codec and compression for stored records; None picks the best installed option
+app.config['STORAGE_CODEC'] = None
+app.config['STORAGE_COMPRESSION'] = None
+# Cache shared by all worker processes for result payloads, filter facets and parses
+app.config['SHARED_CACHE_PATH'] = os.path.join('cache', 'shared_cache.sqlite3')
+app.config['RESULTS_CACHE_TTL'] = 24 * 60 * 60
+app.config['PARSE_CACHE_TTL'] = 30 * 24 * 60 * 60
+# Seconds an upload may wait for the LLM before it is parsed with rules instead
+app.config['LLM_DEADLINE'] = LLM_DEADLINE
+# Largest accepted upload; applies however the app is served, not only under app.run()
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('RESUME_MAX_UPLOAD_MB', '16')) * 1024 * 1024
+# Text extraction runs in sandboxed subprocesses with these limits (see resume_parser.sandbox)
+app.config['EXTRACTION_WORKERS'] = int(os.environ.get('RESUME_EXTRACTION_WORKERS', '2'))
+app.config['EXTRACTION_TIMEOUT'] = float(os.environ.get('RESUME_EXTRACTION_TIMEOUT', '30'))
+app.config['EXTRACTION_CPU_SECONDS'] = int(os.environ.get('RESUME_EXTRACTION_CPU_SECONDS', '20'))
+app.config['EXTRACTION_MEMORY_MB'] = int(os.environ.get('RESUME_EXTRACTION_MEMORY_MB', '1024'))
+app.config['EXTRACTION_JOBS_PER_WORKER'] = int(os.environ.get('RESUME_EXTRACTION_JOBS_PER_WORKER', '50'))
+# Extraction workers held back for interactive uploads while a bulk import runs
+app.config['EXTRACTION_RESERVED_INTERACTIVE'] = int(os.environ.get('RESUME_EXTRACTION_RESERVED_INTERACTIVE', '1'))
+# Bulk imports (/api/import): files parsed at once, how long a file may wait for the LLM,
+# and how many files one tenant may have waiting before new batches are refused
+app.config['IMPORT_WORKERS'] = int(os.environ.get('RESUME_IMPORT_WORKERS', '16'))
+app.config['IMPORT_LLM_DEADLINE'] = float(os.environ.get('RESUME_IMPORT_LLM_DEADLINE', '3600'))
+app.config['IMPORT_MAX_PENDING_PER_TENANT'] = int(os.environ.get('RESUME_IMPORT_MAX_PENDING_PER_TENANT', '20000'))
+app.config['IMPORT_STATUS_TTL'] = 7 * 24 * 60 * 60
+# Files of queued imports wait here rather than in memory; leftovers of a crashed worker
+# are removed at startup once they are older than IMPORT_STATUS_TTL
+app.config['IMPORT_SPOOL_DIR'] = os.path.join('cache', 'import_spool')
+# Serving through asgi.py: threads running views, a pool of their own for uploads (which wait on
+# extraction and the LLM, so it is sized to the LLM's maximum concurrency), request body
+# bytes kept in memory before they are spooled to a temporary file, and where those files go
+app.config['ASGI_THREADS'] = int(os.environ.get('RESUME_ASGI_THREADS', '16'))
+app.config['ASGI_UPLOAD_THREADS'] = int(os.environ.get('RESUME_ASGI_UPLOAD_THREADS',
+                                                       os.environ.get('RESUME_LLM_MAX_CONCURRENCY', '32')))
+app.config['ASGI_SPOOL_MEMORY'] = int(os.environ.get('RESUME_ASGI_SPOOL_MEMORY_KB', '1024')) * 1024
+app.config['ASGI_SPOOL_DIR'] = os.environ.get('RESUME_ASGI_SPOOL_DIR', os.path.join('cache', 'asgi_spool'))
 app.secret_key = 'your_secret_key_here'  # Change this to a secure random key
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['PARSED_DATA'], exist_ok=True)
+os.makedirs(app.config['IMPORT_SPOOL_DIR'], exist_ok=True)
+
+# Extracted and cleaned text of every upload, so re-parsing and indexing never re-extract files
+artifact_store = ArtifactStore(app.config['ARTIFACT_DATA'])
+
+# In-memory corpus of parsed resumes, kept current by watching PARSED_DATA so
+# files copied in from other nodes are picked up without rescanning
+corpus = ResumeCorpus(app.config['PARSED_DATA'])
+search_index = BM25Index()
+corpus.subscribe(search_index.corpus_listener)
+semantic_matcher = SemanticMatcher(app.config['VECTOR_DATA'], get_embedder(app.config['EMBEDDING_MODEL']))
+corpus.subscribe(semantic_matcher.corpus_listener)
+dedup_index = MinHashLSH()
+corpus.subscribe(dedup_index.corpus_listener)
+fulltext_index = FullTextIndex(app.config['FULLTEXT_INDEX'], artifact_store)
+corpus.subscribe(fulltext_index.corpus_listener)
+corpus.subscribe_batches(fulltext_index.commit_batch)
+skill_matrix = SkillMatrix()
+corpus.subscribe(skill_matrix.corpus_listener)
+corpus_watcher = CorpusWatcher(app.config['PARSED_DATA'], corpus.apply, suffixes=RECORD_SUFFIXES)
+corpus_watcher.prime()
+corpus.load()
+corpus_watcher.start()
+fulltext_index.prune(corpus.snapshot().records)
+semantic_matcher.prune(corpus.snapshot().records)
+
+# Generation counters in the shared cache tell other workers when the corpus changed
+shared_cache = SharedCache(app.config['SHARED_CACHE_PATH'])
+corpus_generation = shared_cache.generation('corpus')
+
+def publish_corpus_change(events):
+    """Invalidate cached facets and tell other workers to sync their corpus."""
+    global corpus_generation
+    shared_cache.bump_generation('facets')
+    shared_cache.bump_generation('corpus')
+    corpus_generation = shared_cache.generation('corpus')
+
+corpus.subscribe_batches(publish_corpus_change)
+
+@app.before_request
+def sync_corpus():
+    """Catch up with changes another worker made before its watcher poll would reach us."""
+    global corpus_generation
+    if request.endpoint == 'static':
+        return
+    generation = shared_cache.generation('corpus')
+    if generation != corpus_generation:
+        corpus_generation = generation
+        corpus_watcher.sync()
+
+# Uploaded originals are written to disk in the background; parsing works from memory
+upload_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-writer')
+
+# PDF, DOCX and OCR extraction of untrusted uploads never runs in the web process
+extraction_pool = ExtractionPool(workers=app.config['EXTRACTION_WORKERS'],
+                                 timeout=app.config['EXTRACTION_TIMEOUT'],
+                                 cpu_seconds=app.config['EXTRACTION_CPU_SECONDS'],
+                                 memory_bytes=app.config['EXTRACTION_MEMORY_MB'] * 1024 * 1024,
+                                 jobs_per_worker=app.config['EXTRACTION_JOBS_PER_WORKER'],
+                                 reserved_interactive=app.config['EXTRACTION_RESERVED_INTERACTIVE'])
+atexit.register(extraction_pool.close)
+
+# Bulk imports are parsed in the background at bulk priority (see resume_parser.scheduler)
+import_executor = ThreadPoolExecutor(max_workers=app.config['IMPORT_WORKERS'], thread_name_prefix='import')
+import_pending = {}
+import_pending_lock = threading.Lock()
+
+def remove_stale_spool(directory, max_age):
+    """Delete spooled files older than ``max_age`` seconds, left behind by a worker that died."""
+    cutoff = time.time() - max_age
+    for entry in os.scandir(directory):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+remove_stale_spool(app.config['IMPORT_SPOOL_DIR'], app.config['IMPORT_STATUS_TTL'])
 
 @app.route('/')
 def index():
@@ -43,42 +190,139 @@ def upload():
             return redirect(request.url)
         
         try:
-            # Generate a timestamp for unique filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{file.filename}"
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            # Save the uploaded file
-            file.save(file_path)
-            logger.info(f"File saved: {file_path}")
+            # Read the upload once; hashing, type sniffing and parsing all share this buffer
+            file_data, file_hash = read_stream(file.stream)
+            file_type = sniff_file_type(file_data)
+            if file_type not in ('pdf', 'docx', 'image'):
+                flash('Invalid file type. Please upload a PDF, DOCX, or image file.', 'error')
+                return redirect(request.url)
             
-            # Parse the resume
-            parsed_data = parse_resume(file_path, use_llm=True)
-            
-            # Format the parsed data for better display
-            formatted_data = format_parsed_data(parsed_data)
-            
-            # Generate JSON filename and save parsed data
-            json_filename = f"{timestamp}_{os.path.splitext(file.filename)[0]}.json"
-            json_path = os.path.join(app.config['PARSED_DATA'], json_filename)
-            
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'filename': file.filename,
-                    'parsed_data': formatted_data,
-                    'raw_parsed_data': parsed_data  # Keep the original data for reference
-                }, f, indent=2, ensure_ascii=False)
-                
-            logger.info(f"Parsed data saved: {json_path}")
+            json_filename = ingest_upload(file.filename, file_data, file_hash, file_type, INTERACTIVE_JOB,
+                                          deadline=time.monotonic() + app.config['LLM_DEADLINE'])
             
             # Redirect to results page
             return redirect(url_for('results', filename=json_filename))
             
+        except ExtractionError as e:
+            logger.warning(f"Could not extract {file.filename}: {str(e)}")
+            flash(f"Could not read this file: {str(e)}", 'error')
+            return redirect(request.url)
         except Exception as e:
             logger.error(f"Error processing file: {str(e)}")
             flash(f"Error processing file: {str(e)}", 'error')
             return redirect(request.url)
 
+def ingest_upload(original_name, file_data, file_hash, file_type, job, deadline):
+    """Save, parse and store one uploaded resume; returns the id of its record.
+    
+    ``job`` says whom the parse stages are scheduled for (an interactive
+    upload or a tenant's bulk import) and ``deadline`` is when the LLM must
+    have answered before rules are used instead.
+    """
+    # Unique even for uploads of the same name in the same second, in any worker;
+    # secure_filename keeps a client-supplied name from reaching outside UPLOAD_FOLDER
+    stem = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    safe_name = secure_filename(original_name) or 'resume'
+    filename = f"{stem}_{safe_name}"
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    
+    # Save the uploaded file
+    upload_writer.submit(save_upload, file_path, file_data)
+    
+    # Parse the resume, flagging near-duplicates of resumes we already have.
+    # Identical bytes parsed by any worker are served from the shared parse cache.
+    parsed_data = shared_cache.get('parse', file_hash)
+    if parsed_data is None:
+        parsed_data = parse_resume(file_data, use_llm=True, file_type=file_type,
+                                   dedup_index=dedup_index,
+                                   reuse_duplicate=load_raw_parsed_data if app.config['REUSE_DUPLICATE_PARSE'] else None,
+                                   deadline=deadline,
+                                   artifacts=artifact_store,
+                                   extractor=functools.partial(extraction_pool.extract, job=job),
+                                   job=job)
+        # Only LLM parses are kept: a rules fallback (load, API error, bad JSON) is retried next time
+        if not parsed_data.get('llm_fallback'):
+            shared_cache.set('parse', file_hash, parsed_data, ttl=app.config['PARSE_CACHE_TTL'])
+    else:
+        logger.info(f"Reusing cached parse for {original_name}")
+        parsed_data = flag_duplicate(parsed_data, dedup_index)
+    
+    # Save the parsed data; the formatted view is derived from it on read
+    json_filename = record_filename(f"{stem}_{os.path.splitext(safe_name)[0]}")
+    json_path = os.path.join(app.config['PARSED_DATA'], json_filename)
+    
+    record = {
+        'filename': original_name,
+        'source_file': filename,
+        'content_sha256': file_hash,
+        'raw_parsed_data': parsed_data
+    }
+    write_record(json_path, record, app.config['STORAGE_CODEC'], app.config['STORAGE_COMPRESSION'])
+        
+    logger.info(f"Parsed data saved: {json_path}")
+    
+    # Precompute the results view model so the redirect below is a cache hit
+    shared_cache.set('results', RecordVersion(json_path).key, build_result_view(expand_record(record)),
+                     ttl=app.config['RESULTS_CACHE_TTL'])
+    
+    # Make the new resume visible to filters immediately
+    corpus.apply([(UPDATED, json_filename)])
+    return json_filename
+
+def save_upload(file_path, file_data):
+    """Write an uploaded file to disk; runs on the background upload writer."""
+    try:
+        with open(file_path, 'wb') as f:
+            f.write(file_data)
+        logger.info(f"File saved: {file_path}")
+    except Exception as e:
+        logger.error(f"Error saving {file_path}: {str(e)}")
+
+def load_raw_parsed_data(resume_id):
+    """Return the stored raw parse of a resume, or None if it is no longer available."""
+    data = corpus.snapshot().get(resume_id)
+    return data.get('raw_parsed_data') if data else None
+
+def load_result_view(filename):
+    """Return (view model, record version) for a stored result, or None if it does not exist."""
+    if not is_record_id(filename):
+        return None
+    json_path = resolve_record_path(app.config['PARSED_DATA'], filename)
+    if not os.path.exists(json_path):
+        return None
+    
+    # Key on the file's version so re-parsed results are never served stale
+    version = RecordVersion(json_path)
+    view = shared_cache.get('results', version.key)
+    if view is None:
+        view = build_result_view(read_record(json_path))
+        shared_cache.set('results', version.key, view, ttl=app.config['RESULTS_CACHE_TTL'])
+    return view, version
+
+def is_not_modified(version):
+    """Check the request's conditional headers against a record version."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(version.etag)
+    if request.if_modified_since:
+        return version.last_modified <= request.if_modified_since
+    return False
+
+def conditional_response(body, version, mimetype):
+    """Wrap a body with validators so browsers revalidate instead of refetching."""
+    response = make_response(body)
+    response.mimetype = mimetype
+    response.set_etag(version.etag, weak=True)
+    response.last_modified = version.last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified_response(version):
+    response = make_response('', 304)
+    response.set_etag(version.etag, weak=True)
+    response.last_modified = version.last_modified
+    return response
+
 @app.route('/results')
 def results():
     filename = request.args.get('filename')
@@ -86,57 +330,48 @@ def results():
         flash('No filename provided', 'error')
         return redirect(url_for('index'))
     
-    json_path = os.path.join(app.config['PARSED_DATA'], filename)
+    json_path = resolve_record_path(app.config['PARSED_DATA'], filename) if is_record_id(filename) else None
     
-    if not os.path.exists(json_path):
+    if json_path is None or not os.path.exists(json_path):
         flash('File not found', 'error')
         return redirect(url_for('index'))
     
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        version = RecordVersion(json_path)
+        if is_not_modified(version):
+            return not_modified_response(version)
         
-        return render_template('results.html', 
-                              filename=data['filename'], 
-                              skills=data['parsed_data'].get('skills', []),
-                              education=data['parsed_data'].get('education', []),
-                              experience=data['parsed_data'].get('experience', []),
-                              degree_info=data['parsed_data'].get('degree_info', {}))
+        # Serve the rendered page from cache when this version was rendered before
+        html = shared_cache.get('rendered_results', version.key)
+        if html is None:
+            view, version = load_result_view(filename)
+            html = render_template('results.html', **view)
+            shared_cache.set('rendered_results', version.key, html, ttl=app.config['RESULTS_CACHE_TTL'])
+        
+        return conditional_response(html, version, 'text/html')
     except Exception as e:
         logger.error(f"Error loading results: {str(e)}")
         flash(f"Error loading results: {str(e)}", 'error')
         return redirect(url_for('index'))
 
-@app.route('/filter', methods=['GET'])
-def filter_page():
-    all_skills = set()
-    all_parsed_resumes = []
-    
-    # Load all parsed resumes
+@app.route('/api/results/<filename>')
+def results_api(filename):
+    """API endpoint returning the parsed result view model as JSON."""
     try:
-        for filename in os.listdir(app.config['PARSED_DATA']):
-            if filename.endswith('.json'):
-                with open(os.path.join(app.config['PARSED_DATA'], filename), 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    resume_skills = data['parsed_data'].get('skills', [])
-                    all_skills.update(resume_skills)
-                    all_parsed_resumes.append(data['raw_parsed_data'])
+        loaded = load_result_view(filename)
+        if loaded is None:
+            return jsonify({'error': 'File not found'}), 404
+        view, version = loaded
+        if is_not_modified(version):
+            return not_modified_response(version)
+        return conditional_response(jsonify(view).get_data(), version, 'application/json')
     except Exception as e:
-        logger.error(f"Error loading skills and resumes: {str(e)}")
-        flash(f"Error loading skills and resumes: {str(e)}", 'error')
-    
-    # Get only degree graduation years
-    degree_graduation_years = get_degree_graduation_years(all_parsed_resumes)
-    
-    predefined_skills = get_all_skills()
-    
-    combined_skills = []
-    for skill in predefined_skills:
-        if skill in all_skills:
-            combined_skills.append(skill)
-            all_skills.remove(skill)
-    
-    combined_skills.extend(sorted(all_skills))
+        logger.error(f"Error loading results: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/filter', methods=['GET'])
+def filter_page():
+    combined_skills, degree_graduation_years = get_filter_facets()
     
     # Get current year for the template
     current_year = datetime.now().year
@@ -152,103 +387,379 @@ def filter_page():
                           current_year=current_year,
                           all_years=all_years)
 
+def get_filter_facets():
+    """Return (skills, degree graduation years) for the filter page, shared across workers."""
+    facets = shared_cache.get('facets', 'filter_page')
+    if facets is not None:
+        return facets['skills'], facets['years']
+    
+    snapshot = corpus.snapshot()
+    all_skills = set(snapshot.skills())
+    
+    # Get only degree graduation years
+    degree_graduation_years = snapshot.graduation_years()
+    
+    predefined_skills = get_all_skills()
+    
+    combined_skills = []
+    for skill in predefined_skills:
+        if skill in all_skills:
+            combined_skills.append(skill)
+            all_skills.remove(skill)
+    
+    combined_skills.extend(sorted(all_skills))
+    
+    shared_cache.set('facets', 'filter_page', {'skills': combined_skills, 'years': degree_graduation_years})
+    return combined_skills, degree_graduation_years
+
+def json_body():
+    """The request's JSON object, or {} when the body is missing, malformed or not an object."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
 @app.route('/api/filter_resumes', methods=['POST'])
 def filter_resumes():
-    skills = request.json.get('skills', [])
-    selected_year = request.json.get('year', '')
-    
-    # Handle GPA filtering with proper type conversion and error handling
-    gpa_threshold = 0.0  # Default to 0.0 (no filtering)
+    data = json_body()
+    collapse_duplicates = data.get('collapseDuplicates', True)
     try:
-        gpa_value = request.json.get('degreeGpa', 0)  # Use degreeGpa instead of gpa
-        if gpa_value:
-            gpa_threshold = float(gpa_value)
+        query = ResumeQuery.from_filter(data)
     except (ValueError, TypeError) as e:
-        logger.error(f"Error parsing GPA value: {str(e)}")
-        gpa_threshold = 0.0  # Default to no filtering on error
-    
-    logger.info(f"Filtering resumes with skills: {skills}, year: {selected_year}, degreeGpa: {gpa_threshold}")
+        return jsonify({'error': f"Invalid filter: {str(e)}"}), 400
     
-    filtered_resumes = []
+    snapshot = corpus.snapshot()
     try:
-        for filename in os.listdir(app.config['PARSED_DATA']):
-            if filename.endswith('.json'):
-                with open(os.path.join(app.config['PARSED_DATA'], filename), 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    resume_skills = data['parsed_data'].get('skills', [])
-                    
-                    # Check if skills match (case-insensitive)
-                    skills_match = True
-                    if skills:
-                        skills_match = all(
-                            any(s.lower() == skill.lower() for s in resume_skills) 
-                            for skill in skills
-                        )
-                    
-                    # Get degree-specific information - try all possible sources
-                    degree_year = None
-                    degree_gpa = None
-                    
-                    # First try raw_parsed_data direct fields
-                    raw_data = data.get('raw_parsed_data', {})
-                    if raw_data.get('degree_graduation_year'):
-                        degree_year = raw_data.get('degree_graduation_year')
-                    
-                    if raw_data.get('degree_gpa'):
-                        degree_gpa = raw_data.get('degree_gpa')
-                    
-                    # If not found, try degree_education
-                    if degree_year is None and 'degree_education' in raw_data:
-                        degree_year = raw_data['degree_education'].get('graduation_year')
-                    
-                    if degree_gpa is None and 'degree_education' in raw_data:
-                        degree_gpa = raw_data['degree_education'].get('gpa')
-                    
-                    # If still not found, try formatted degree_info
-                    if degree_year is None or degree_gpa is None:
-                        degree_info = data['parsed_data'].get('degree_info', {})
-                        if degree_info:
-                            if degree_year is None:
-                                degree_year = degree_info.get('graduation_year')
-                            if degree_gpa is None:
-                                degree_gpa = degree_info.get('degree_gpa')
-                    
-                    # Check if year matches (only for degree/B.Tech)
-                    year_match = True
-                    if selected_year and degree_year:
-                        # Convert to string for consistent comparison
-                        degree_year_str = str(degree_year)
-                        year_match = degree_year_str == str(selected_year)
-                    
-                    # Check if GPA matches (only for degree/B.Tech)
-                    gpa_match = True
-                    if gpa_threshold > 0 and degree_gpa is not None:
-                        try:
-                            degree_gpa_float = float(degree_gpa)
-                            gpa_match = degree_gpa_float >= gpa_threshold
-                        except (ValueError, TypeError):
-                            # If GPA can't be converted to float, it doesn't match
-                            gpa_match = False
-                    
-                    # All filters must match
-                    if skills_match and year_match and gpa_match:
-                        filtered_resumes.append({
-                            'id': filename,
-                            'name': data['filename'],
-                            'skills': resume_skills,
-                            'degree_info': {
-                                'year': degree_year,
-                                'gpa': degree_gpa
-                            },
-                            'experience_count': len(data['parsed_data'].get('experience', []))
-                        })
+        plan = compile_query(query, snapshot.query_index())
+        logger.info(f"Filtering resumes with plan: {'; '.join(plan.explain())}")
+        
+        filtered_resumes = []
+        for filename in plan.execute():
+            data = snapshot.records[filename]
+            facts = snapshot.facts[filename]
+            filtered_resumes.append({
+                'id': filename,
+                'name': data['filename'],
+                'skills': data['parsed_data'].get('skills', []),
+                'degree_info': {
+                    'year': facts.year,
+                    'gpa': facts.gpa
+                },
+                'experience_count': facts.experience_count,
+                'duplicate_of': (data.get('raw_parsed_data') or {}).get('duplicate_of')
+            })
     except Exception as e:
         logger.error(f"Error filtering resumes: {str(e)}")
         return jsonify({'error': str(e)}), 500
     
+    if collapse_duplicates:
+        filtered_resumes = collapse_duplicate_resumes(filtered_resumes)
+    
     logger.info(f"Found {len(filtered_resumes)} matching resumes")
     return jsonify(filtered_resumes)
 
+def collapse_duplicate_resumes(resumes):
+    """Keep one entry per near-duplicate cluster, listing the other ids under 'duplicates'."""
+    clusters = {}
+    for resume in resumes:
+        key = resume.get('duplicate_of') or resume['id']
+        cluster = clusters.get(key)
+        if cluster is None:
+            clusters[key] = dict(resume, duplicates=[])
+        elif resume['id'] == key:
+            # Prefer the original upload as the representative
+            clusters[key] = dict(resume, duplicates=cluster['duplicates'] + [cluster['id']])
+        else:
+            cluster['duplicates'].append(resume['id'])
+    return list(clusters.values())
+
+@app.route('/api/export', methods=['POST'])
+def export_resumes():
+    """Stream the resumes matching a filter as CSV, NDJSON or Parquet.
+    
+    The JSON body is the same as for /api/filter_resumes; 'format' ('csv',
+    'ndjson' or 'parquet') and 'rows' ('candidates' or 'experience') may be
+    given in the body or the query string.
+    """
+    data = json_body()
+    fmt = request.args.get('format', data.get('format', 'csv'))
+    rows = request.args.get('rows', data.get('rows', 'candidates'))
+    try:
+        check_export(fmt, rows)
+        query = ResumeQuery.from_filter(data)
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f"Invalid filter: {str(e)}"}), 400
+    
+    # The snapshot is immutable, so the stream stays consistent while new uploads arrive
+    snapshot = corpus.snapshot()
+    ids = matching_ids(snapshot, query, collapse_duplicates=data.get('collapseDuplicates', True))
+    logger.info(f"Exporting {len(ids)} resumes as {fmt}")
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"{rows}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(export_rows(snapshot, ids, fmt, rows), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Export-Count': str(len(ids))})
+
+def analytics_limit(name='k', default=20):
+    return max(1, min(request.args.get(name, default, type=int), 1000))
+
+def analytics_response(compute):
+    """Run an analytics query and return it as JSON, or a 400 for a bad facet or unknown skill."""
+    try:
+        return jsonify(compute())
+    except AnalyticsError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/analytics/skills')
+def analytics_skills():
+    """Most common skills, optionally among one graduation year (?year=), as [[skill, resumes]]."""
+    year = request.args.get('year', type=int)
+    return analytics_response(lambda: skill_matrix.top_skills(analytics_limit(), year=year))
+
+@app.route('/api/analytics/skills_by_year')
+def analytics_skills_by_year():
+    """Most common skills for every graduation year, newest first."""
+    return analytics_response(lambda: skill_matrix.top_skills_by_year(analytics_limit(default=10)))
+
+@app.route('/api/analytics/cooccurrence')
+def analytics_cooccurrence():
+    """Skills listed together with ?skill=, or the most frequent skill pairs when no skill is given."""
+    skill = request.args.get('skill')
+    if skill:
+        return analytics_response(lambda: skill_matrix.cooccurrence(skill, analytics_limit()))
+    return analytics_response(lambda: skill_matrix.top_pairs(analytics_limit()))
+
+@app.route('/api/analytics/histogram')
+def analytics_histogram():
+    """Distribution of ?facet= (year, gpa or experience), optionally among resumes listing ?skill=."""
+    return analytics_response(lambda: skill_matrix.histogram(request.args.get('facet', 'gpa'),
+                                                             skill=request.args.get('skill'),
+                                                             bins=analytics_limit('bins', 10)))
+
+@app.route('/api/analytics/gpa_by_skill')
+def analytics_gpa_by_skill():
+    """GPA histogram and mean for each of ?skills=a,b,... or for the ?k= most common skills."""
+    skills = [skill.strip() for skill in request.args.get('skills', '').split(',') if skill.strip()]
+    return analytics_response(lambda: skill_matrix.gpa_by_skill(skills or None, k=analytics_limit(),
+                                                                bins=analytics_limit('bins', 10)))
+
+@app.route('/api/rank_resumes', methods=['POST'])
+def rank_resumes():
+    """API endpoint to rank resumes against a free-text job description."""
+    data = json_body()
+    job_description = data.get('job_description', '')
+    try:
+        limit = max(1, min(int(data.get('limit', 20)), 200))
+    except (ValueError, TypeError):
+        limit = 20
+    
+    if not isinstance(job_description, str) or not job_description.strip():
+        return jsonify({'error': 'job_description must be a non-empty string'}), 400
+    
+    snapshot = corpus.snapshot()
+    ranked_resumes = []
+    for resume_id, score in search_index.search(job_description, k=limit):
+        data = snapshot.get(resume_id)
+        if data is None:
+            continue
+        ranked_resumes.append({
+            'id': resume_id,
+            'name': data['filename'],
+            'score': round(score, 4),
+            'skills': data['parsed_data'].get('skills', []),
+            'experience_count': len(data['parsed_data'].get('experience', []))
+        })
+    
+    logger.info(f"Ranked {len(ranked_resumes)} resumes for job description ({len(job_description)} chars)")
+    return jsonify(ranked_resumes)
+
+@app.route('/api/similar_resumes', methods=['POST'])
+def similar_resumes():
+    """API endpoint for semantic matching, either against a resume or free text such as a list of skills."""
+    data = json_body()
+    resume_id = data.get('resume_id')
+    query = data.get('query', '')
+    if isinstance(query, list):
+        query = ', '.join(str(item) for item in query)
+    try:
+        limit = max(1, min(int(data.get('limit', 10)), 100))
+    except (ValueError, TypeError):
+        limit = 10
+    
+    if (resume_id is not None and not isinstance(resume_id, str)) or not isinstance(query, str):
+        return jsonify({'error': 'resume_id and query must be strings'}), 400
+    
+    try:
+        if resume_id:
+            matches = semantic_matcher.similar_to_resume(resume_id, k=limit)
+        elif query.strip():
+            matches = semantic_matcher.similar_to_text(query, k=limit)
+        else:
+            return jsonify({'error': 'resume_id or query is required'}), 400
+    except Exception as e:
+        logger.error(f"Error finding similar resumes: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    snapshot = corpus.snapshot()
+    similar = []
+    for match_id, similarity in matches:
+        data = snapshot.get(match_id)
+        if data is None:
+            continue
+        similar.append({
+            'id': match_id,
+            'name': data['filename'],
+            'similarity': round(similarity, 4),
+            'skills': data['parsed_data'].get('skills', []),
+            'experience_count': len(data['parsed_data'].get('experience', []))
+        })
+    
+    return jsonify(similar)
+
+@app.route('/api/search')
+def search_resumes():
+    """API endpoint for full-text search over resume content.
+    
+    Supports "quoted phrases", prefix* terms, -exclusions and OR; each hit
+    carries an HTML snippet with the matching words in <mark> tags.
+    """
+    query = request.args.get('q', '')
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 200))
+    except (ValueError, TypeError):
+        limit = 20
+    
+    try:
+        hits = fulltext_index.search(query, k=limit)
+    except QuerySyntaxError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching resumes: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    
+    snapshot = corpus.snapshot()
+    results = []
+    for resume_id, score, snippet in hits:
+        data = snapshot.get(resume_id)
+        if data is None:
+            continue
+        results.append({
+            'id': resume_id,
+            'name': data['filename'],
+            'score': round(score, 4),
+            'snippet': snippet,
+            'skills': data['parsed_data'].get('skills', []),
+            'experience_count': len(data['parsed_data'].get('experience', []))
+        })
+    return jsonify(results)
+
+@app.route('/api/metrics/extraction')
+def extraction_metrics():
+    """Sandbox worker counters of this process's extraction pool."""
+    return jsonify(extraction_pool.metrics())
+
+@app.route('/api/import', methods=['POST'])
+def import_resumes():
+    """Queue a batch of resumes for bulk parsing on behalf of a tenant.
+    
+    Multipart form with one or more ``files`` and an optional ``tenant``.
+    Files are spooled to IMPORT_SPOOL_DIR and parsed in the background at
+    bulk priority, so interactive uploads keep their latency; poll
+    ``/api/import/<batch_id>`` for progress.
+    """
+    tenant = request.form.get('tenant') or 'default'
+    files = [file for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    accepted, rejected = [], []
+    for file in files:
+        file_data, file_hash = read_stream(file.stream)
+        file_type = sniff_file_type(file_data) if allowed_file(file.filename) else None
+        if file_type not in ('pdf', 'docx', 'image'):
+            rejected.append({'filename': file.filename, 'error': 'Invalid file type'})
+            continue
+        accepted.append((file.filename, spool_import(file_data), file_hash, file_type))
+    
+    with import_pending_lock:
+        pending = import_pending.get(tenant, 0)
+        over_quota = accepted and pending + len(accepted) > app.config['IMPORT_MAX_PENDING_PER_TENANT']
+        if not over_quota:
+            import_pending[tenant] = pending + len(accepted)
+    if over_quota:
+        for _, spool_path, _, _ in accepted:
+            remove_spooled(spool_path)
+        return jsonify({'error': f"Tenant {tenant!r} already has {pending} files waiting to be imported"}), 429
+    
+    batch_id = uuid.uuid4().hex
+    status = {'batch_id': batch_id, 'tenant': tenant, 'total': len(accepted), 'done': 0, 'failed': 0,
+              'resumes': [], 'errors': rejected}
+    shared_cache.set('import_batches', batch_id, status, ttl=app.config['IMPORT_STATUS_TTL'])
+    
+    job = Job(BULK, tenant)
+    batch_lock = threading.Lock()
+    for original_name, spool_path, file_hash, file_type in accepted:
+        import_executor.submit(import_file, batch_id, status, batch_lock, job,
+                               original_name, spool_path, file_hash, file_type)
+    return jsonify(status), 202
+
+def spool_import(file_data):
+    """Write an accepted import file to IMPORT_SPOOL_DIR; returns its path."""
+    with tempfile.NamedTemporaryFile(dir=app.config['IMPORT_SPOOL_DIR'], prefix='import-', delete=False) as spool:
+        spool.write(file_data)
+    return spool.name
+
+def remove_spooled(spool_path):
+    try:
+        os.remove(spool_path)
+    except OSError as e:
+        logger.error(f"Error removing spooled import {spool_path}: {str(e)}")
+
+def import_file(batch_id, status, batch_lock, job, original_name, spool_path, file_hash, file_type):
+    """Parse one spooled file of an import batch and record the outcome in the batch status."""
+    json_filename, error = None, None
+    try:
+        with open(spool_path, 'rb') as spool:
+            file_data = spool.read()
+        json_filename = ingest_upload(original_name, file_data, file_hash, file_type, job,
+                                      deadline=time.monotonic() + app.config['IMPORT_LLM_DEADLINE'])
+    except Exception as e:
+        logger.warning(f"Could not import {original_name}: {str(e)}")
+        error = str(e)
+    finally:
+        remove_spooled(spool_path)
+        with import_pending_lock:
+            import_pending[job.tenant] -= 1
+            if not import_pending[job.tenant]:
+                del import_pending[job.tenant]
+    with batch_lock:
+        if error is None:
+            status['done'] += 1
+            status['resumes'].append(json_filename)
+        else:
+            status['failed'] += 1
+            status['errors'].append({'filename': original_name, 'error': error})
+        shared_cache.set('import_batches', batch_id, status, ttl=app.config['IMPORT_STATUS_TTL'])
+
+@app.route('/api/import/<batch_id>')
+def import_status(batch_id):
+    """Progress of an import batch: files done and failed out of the total."""
+    status = shared_cache.get('import_batches', batch_id)
+    if status is None:
+        return jsonify({'error': 'Unknown import batch'}), 404
+    return jsonify(status)
+
+@app.route('/api/metrics/scheduler')
+def scheduler_metrics():
+    """Queue depth, slots in use and queueing delay per priority class of each parse stage."""
+    return jsonify({'llm': llm_scheduler.metrics(), 'extraction': extraction_pool.scheduler.metrics()})
+
+@app.route('/api/metrics/llm')
+def llm_metrics():
+    """API endpoint exposing this worker's LLM concurrency limit, queue depth and shed rate."""
+    return jsonify(llm_limiter.metrics())
+
 @app.route('/api/skills')
 def get_skills_api():
     return jsonify(get_all_skills())
@@ -257,17 +768,8 @@ def get_skills_api():
 def get_years_api():
     """API endpoint to get all available graduation years."""
     try:
-        all_parsed_resumes = []
-        
-        # Load all parsed resumes
-        for filename in os.listdir(app.config['PARSED_DATA']):
-            if filename.endswith('.json'):
-                with open(os.path.join(app.config['PARSED_DATA'], filename), 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    all_parsed_resumes.append(data['raw_parsed_data'])
-        
         # Get only degree graduation years
-        degree_graduation_years = get_degree_graduation_years(all_parsed_resumes)
+        _, degree_graduation_years = get_filter_facets()
         
         return jsonify(degree_graduation_years)
     except Exception as e:
@@ -280,7 +782,7 @@ def allowed_file(filename):
 
 @app.errorhandler(413)
 def request_entity_too_large(error):
-    flash('File too large. Maximum file size is 16MB.', 'error')
+    flash(f"File too large. Maximum file size is {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB.", 'error')
     return redirect(url_for('index')), 413
 
 @app.errorhandler(500)
@@ -290,5 +792,4 @@ def internal_server_error(error):
     return redirect(url_for('index')), 500
 
 if __name__ == '__main__':
-    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
     app.run(debug=True)
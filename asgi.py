@@ -0,0 +1,31 @@
+"""ASGI entry point: the app served from an event loop (see resume_parser.asgi).
+
+Uploads are received by the event loop and parsed on a pool of their own,
+so they wait for extraction and the LLM on threads of that pool, not on the
+threads that serve /filter and /results. Request bodies too large to keep
+in memory are spooled to ASGI_SPOOL_DIR. Routes and templates are those of
+app.py.
+
+Usage:
+    python serve.py --mode asgi
+    gunicorn -k asgi --workers 4 asgi:application
+    uvicorn asgi:application --workers 4
+"""
+import os
+
+from app import app, extraction_pool, remove_stale_spool
+from resume_parser.asgi import AsgiBridge
+
+# Spool files are deleted when their request ends; this only catches those of a worker that died
+os.makedirs(app.config['ASGI_SPOOL_DIR'], exist_ok=True)
+remove_stale_spool(app.config['ASGI_SPOOL_DIR'], 60 * 60)
+
+application = AsgiBridge(
+    app,
+    threads=app.config['ASGI_THREADS'],
+    pools={'upload': app.config['ASGI_UPLOAD_THREADS']},
+    routes={('POST', '/upload'): 'upload'},
+    spool_memory=app.config['ASGI_SPOOL_MEMORY'],
+    spool_dir=app.config['ASGI_SPOOL_DIR'],
+    max_body=app.config['MAX_CONTENT_LENGTH'],
+    on_shutdown=[extraction_pool.close])
@@ -0,0 +1,103 @@
+"""Latency of the /api/analytics queries on a synthetic corpus.
+
+Builds a SkillMatrix from synthetic resume facts: skills drawn from a
+Zipf-like vocabulary of a few thousand names, so that a few are very
+common and most are rare, plus degree year, GPA and experience count.
+Then it reports:
+
+- the time to build the matrix from scratch and to apply one change;
+- p50/p95 latency of each query, each run straight after a change, so
+  that every measurement includes rebuilding the CSR arrays.
+
+Usage:
+    python benchmarks/bench_analytics.py [--docs 100000] [--skills 3000] [--repeat 20]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resume_parser.analytics import SkillMatrix
+from resume_parser.query import ResumeFacts
+
+COMMON = ["Python", "Java", "SQL", "JavaScript", "AWS", "Docker", "Git", "React", "Kubernetes", "Go",
+          "PostgreSQL", "Machine Learning", "Linux", "C++", "Spark", "Kafka", "Node.js", "TypeScript"]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float('nan')
+
+
+def synthetic_facts(rng, vocabulary, weights):
+    skills = {skill.lower() for skill in rng.choices(vocabulary, weights, k=rng.randint(4, 16))}
+    year = rng.randint(2005, 2025) if rng.random() < 0.85 else None
+    gpa = round(rng.uniform(5.5, 10.0), 2) if rng.random() < 0.7 else None
+    return ResumeFacts(frozenset(skills), year, gpa, rng.randint(0, 8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--skills', type=int, default=3000, help="Size of the skill vocabulary")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    vocabulary = COMMON + [f"skill{n}" for n in range(args.skills - len(COMMON))]
+    weights = [1 / (rank + 3) for rank in range(len(vocabulary))]
+    facts = {f"resume_{i:06d}.rpr": synthetic_facts(rng, vocabulary, weights) for i in range(args.docs)}
+
+    start = time.perf_counter()
+    matrix = SkillMatrix.from_facts(facts)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    matrix.top_skills()
+    first = time.perf_counter() - start
+    print(f"{args.docs} resumes, {args.skills} skills: built in {built:.2f} s, CSR arrays in {first * 1000:.0f} ms")
+
+    ids = list(facts)
+
+    def change():
+        resume_id = rng.choice(ids)
+        matrix.add(resume_id, synthetic_facts(rng, vocabulary, weights))
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        change()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"one update: p50 {percentile(timings, 0.5) * 1e6:.0f} us")
+
+    queries = [
+        ('top_skills', lambda: matrix.top_skills(20)),
+        ('top_skills year', lambda: matrix.top_skills(20, year=2018)),
+        ('skills_by_year', lambda: matrix.top_skills_by_year(10)),
+        ('cooccurrence', lambda: matrix.cooccurrence('Python', 20)),
+        ('cooccurrence rare', lambda: matrix.cooccurrence('skill2000', 20)),
+        ('top_pairs', lambda: matrix.top_pairs(20)),
+        ('histogram gpa', lambda: matrix.histogram('gpa', bins=20)),
+        ('histogram year', lambda: matrix.histogram('year', skill='Kafka')),
+        ('gpa_by_skill', lambda: matrix.gpa_by_skill(k=50, bins=10)),
+    ]
+    print(f"{'query':>18} {'p50 (ms)':>9} {'p95 (ms)':>9} {'cached (ms)':>12}")
+    for name, query in queries:
+        timings = []
+        for _ in range(args.repeat):
+            change()
+            start = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        start = time.perf_counter()
+        query()
+        cached = time.perf_counter() - start
+        print(f"{name:>18} {percentile(timings, 0.5) * 1000:>9.1f} {percentile(timings, 0.95) * 1000:>9.1f} "
+              f"{cached * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Compare the streaming DOCX extractor with the python-docx object model.
+
+Builds synthetic resumes of increasing size (paragraphs plus a skills table
+and a header) and reports wall time and peak Python memory for each path.
+"streaming-iter" consumes the blocks without building the output string,
+which shows the extractor's own working memory. tracemalloc does not see
+lxml's native allocations, so the python-docx figures are a lower bound.
+
+Usage:
+    python benchmarks/bench_docx.py [--sizes 100 1000 10000] [--repeat 3]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+import docx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resume_parser.docx_reader import extract_docx_text, iter_docx_blocks
+
+
+TABLE_TEXT = "PostgreSQL, Redis"
+
+
+def python_docx_text(data):
+    """The previous extraction path: paragraphs only, concatenated with +=."""
+    text = ""
+    doc = docx.Document(io.BytesIO(data))
+    for para in doc.paragraphs:
+        text += para.text + "\n"
+    return text.strip()
+
+
+def streaming_iter(data):
+    """Consume the streaming extractor block by block without keeping the blocks."""
+    chars = 0
+    found_table = False
+    for block in iter_docx_blocks(data):
+        chars += len(block) + 1
+        found_table = found_table or TABLE_TEXT in block
+    return chars, found_table
+
+
+def summarize(func):
+    """Adapt a text-returning extractor to return (chars, found_table)."""
+    def run(data):
+        text = func(data)
+        return len(text), TABLE_TEXT in text
+    return run
+
+
+def build_resume(paragraphs):
+    doc = docx.Document()
+    doc.sections[0].header.paragraphs[0].text = "Jane Doe | jane@example.com | +1 555 0100"
+    doc.add_heading("EXPERIENCE", level=1)
+    for i in range(paragraphs):
+        doc.add_paragraph(f"• Built data pipeline number {i} with Python, Kafka and PostgreSQL for the payments team")
+    doc.add_heading("SKILLS", level=1)
+    table = doc.add_table(rows=0, cols=2)
+    for category, skills in [("Languages", "Python, Java, Go"), ("Databases", "PostgreSQL, Redis")]:
+        row = table.add_row()
+        row.cells[0].text = category
+        row.cells[1].text = skills
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(func, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(data)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'paragraphs':>10} {'path':>14} {'time (ms)':>10} {'peak (KiB)':>11} {'chars':>8} {'has table':>9}")
+    for size in args.sizes:
+        data = build_resume(size)
+        paths = (
+            ("python-docx", summarize(python_docx_text)),
+            ("streaming", summarize(extract_docx_text)),
+            ("streaming-iter", streaming_iter),
+        )
+        for name, func in paths:
+            seconds, peak, (chars, found_table) = measure(func, data, args.repeat)
+            print(f"{size:>10} {name:>14} {seconds * 1000:>10.1f} {peak / 1024:>11.0f} {chars:>8} "
+                  f"{'yes' if found_table else 'no':>9}")
+
+
+if __name__ == '__main__':
+    main()
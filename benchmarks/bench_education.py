@@ -0,0 +1,214 @@
+"""Accuracy and speed of education level classification on a labelled set.
+
+Compares the substring scan the parsers used before (every keyword tested
+with ``in`` against the lowercased text, degree keywords first) with the
+compiled, word-bounded EducationClassifier. Accuracy is measured on the
+hand-labelled entries below, written the way degrees and institutions
+appear in resumes. Speed is entries classified per second:
+
+- distinct/s: the labelled set over and over, every entry matched afresh;
+- corpus/s and batch/s: a stream drawn from the labelled set with common
+  entries repeating, as degree names do across resumes, and a share made
+  unique; classified one at a time and through ``classify_many``;
+- lines/s: the "does this line mention education" check the rule-based
+  parser runs on every line of the education section;
+- section/s: that check on each line of an entry plus classifying it,
+  the rule-based parser's work per education entry.
+
+Usage:
+    python benchmarks/bench_education.py [--passes 2000] [--corpus 200000] [--unique 0.5] [--show-errors]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resume_parser.education import EducationClassifier, DEGREE, SECONDARY, HIGH_SCHOOL
+
+
+# The keyword lists and order of the previous substring classifier
+LEGACY_DEGREE = ["bachelor", "b.tech", "btech", "b. tech", "undergraduate", "ug", "be", "b.e.",
+                 "engineering", "computer science", "cse", "it", "information technology",
+                 "electrical", "mechanical", "civil", "electronics", "college"]
+LEGACY_SECONDARY = ["senior secondary", "12th", "12 th", "xii", "higher secondary", "intermediate",
+                    "junior college", "pre-university", "hsc", "intermediate", "10+2"]
+LEGACY_HIGH_SCHOOL = ["secondary", "high school", "10th", "10 th", "x", "ssc", "matriculation"]
+
+
+def legacy_classify(text):
+    if not text:
+        return None
+    text = text.lower()
+    for keyword in LEGACY_DEGREE:
+        if keyword in text:
+            return DEGREE
+    for keyword in LEGACY_SECONDARY:
+        if keyword in text:
+            return SECONDARY
+    for keyword in LEGACY_HIGH_SCHOOL:
+        if keyword in text:
+            return HIGH_SCHOOL
+    if "degree" in text:
+        return DEGREE
+    return None
+
+
+def legacy_mentions(line):
+    return any(keyword in line.lower() for keyword in LEGACY_DEGREE + LEGACY_SECONDARY + LEGACY_HIGH_SCHOOL)
+
+
+LABELLED = [
+    # Degrees
+    ("B.Tech in Computer Science and Engineering", DEGREE),
+    ("Bachelor of Technology, Electronics and Communication", DEGREE),
+    ("B. Tech (Information Technology)", DEGREE),
+    ("BE in Mechanical Engineering", DEGREE),
+    ("B.E. Civil Engineering", DEGREE),
+    ("Bachelor of Arts in History", DEGREE),
+    ("Bachelor's degree in Nursing", DEGREE),
+    ("B.Sc. Mathematics, Delhi University", DEGREE),
+    ("BSc (Hons) Economics", DEGREE),
+    ("B.Com, Shri Ram College of Commerce", DEGREE),
+    ("BCA, Symbiosis Institute of Computer Studies", DEGREE),
+    ("BBA, Christ University", DEGREE),
+    ("Master of Science in Physics", DEGREE),
+    ("M.Tech in VLSI Design", DEGREE),
+    ("M.Sc. Statistics", DEGREE),
+    ("MBA, Indian Institute of Management Ahmedabad", DEGREE),
+    ("Executive MBA", DEGREE),
+    ("Master of Computer Applications", DEGREE),
+    ("Masters in Data Science", DEGREE),
+    ("Ph.D. in Chemistry", DEGREE),
+    ("Doctor of Philosophy (PhD) in Biology", DEGREE),
+    ("Postgraduate Diploma in Management", DEGREE),
+    ("Undergraduate, Computer Science", DEGREE),
+    ("Indian Institute of Technology Bombay", DEGREE),
+    ("Stanford University", DEGREE),
+    ("National Institute of Technology, Trichy - Electrical Engineering", DEGREE),
+    ("UG in Biotechnology", DEGREE),
+    ("Bachelor of Engineering (Hons.)", DEGREE),
+    ("BA English Literature, St. Stephen's College", DEGREE),
+    ("Degree in Hotel Management", DEGREE),
+    # Senior secondary / 12th
+    ("Senior Secondary (XII), Kendriya Vidyalaya", SECONDARY),
+    ("Class XII, St. Xavier's High School", SECONDARY),
+    ("12th, CBSE Board", SECONDARY),
+    ("Higher Secondary Certificate, Delhi Public School", SECONDARY),
+    ("Intermediate (MPC), Narayana Junior College", SECONDARY),
+    ("Higher Secondary, Christ Junior College", SECONDARY),
+    ("Pre-University Course, Mount Carmel PU College", SECONDARY),
+    ("Pre University College, Bangalore", SECONDARY),
+    ("Senior Secondary Education, Amity International School", SECONDARY),
+    ("Higher School Certificate (HSC), Notre Dame College, Dhaka", SECONDARY),
+    ("CBSE Class 12, DAV Public School", SECONDARY),
+    ("10+2, Sri Chaitanya Junior College", SECONDARY),
+    ("A-Levels, Westminster School", SECONDARY),
+    ("Intermediate, Board of Intermediate Education", SECONDARY),
+    ("12th Grade, Saint Mary's Academy", SECONDARY),
+    ("HSC, Maharashtra State Board", SECONDARY),
+    # High school / 10th
+    ("Class X, Little Flower Convent School", HIGH_SCHOOL),
+    ("10th, CBSE", HIGH_SCHOOL),
+    ("10th Standard, Holy Cross School", HIGH_SCHOOL),
+    ("SSC, Zilla Parishad High School", HIGH_SCHOOL),
+    ("Secondary School Certificate (SSC), Ideal School", HIGH_SCHOOL),
+    ("Matriculation, Government Boys High School", HIGH_SCHOOL),
+    ("Matric, Government High School Lahore", HIGH_SCHOOL),
+    ("High School Diploma, Lincoln High School", HIGH_SCHOOL),
+    ("High School, Phoenix Academy", HIGH_SCHOOL),
+    ("CBSE Class 10, Delhi Public School", HIGH_SCHOOL),
+    ("GCSEs, Oakwood Secondary School", HIGH_SCHOOL),
+    ("ICSE (Class X), Bishop Cotton Boys' School", HIGH_SCHOOL),
+    ("Secondary Education, Little Angels School", HIGH_SCHOOL),
+    ("High School, Boston, MA", HIGH_SCHOOL),
+    ("O-Levels, Beaconhouse School System", HIGH_SCHOOL),
+    # Not an education level
+    ("Relevant coursework: Data Structures, Algorithms", None),
+    ("Dean's List, 2019", None),
+    ("Certified Scrum Master", None),
+    ("Exchange semester, TU Munich", None),
+    ("Online course: Machine Learning (Coursera)", None),
+    ("AWS Certified Solutions Architect", None),
+    ("Debugging workshop, Google Developer Group", None),
+    ("Member, Robotics Club", None),
+]
+
+
+def accuracy(classify, labelled):
+    errors = [(text, label, classify(text)) for text, label in labelled if classify(text) != label]
+    return 1 - len(errors) / len(labelled), errors
+
+
+def corpus_stream(size, unique, rng):
+    """Entries as a corpus repeats them: common ones often, and a share made unique by a campus name."""
+    texts = [text for text, _ in LABELLED]
+    weights = [1 / (rank + 1) for rank in range(len(texts))]
+    stream = rng.choices(texts, weights, k=size)
+    return [f"{text}, Campus {n}" if rng.random() < unique else text for n, text in enumerate(stream)]
+
+
+def rate(function, items, passes=1):
+    start = time.perf_counter()
+    for _ in range(passes):
+        function(items)
+    return passes * len(items) / (time.perf_counter() - start)
+
+
+def section(classify, mentions):
+    """The rule-based parser's work per entry: check each line for keywords, then classify the entry."""
+    def run(items):
+        for text in items:
+            for line in text.split(', '):
+                mentions(line)
+            classify(text)
+    return run
+
+
+class Substring:
+    """The previous classifier behind the EducationClassifier interface."""
+
+    def __init__(self, cache_size=None):
+        self.classify = legacy_classify
+        self.mentions_education = legacy_mentions
+
+    def classify_many(self, texts):
+        return [legacy_classify(text) for text in texts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--passes', type=int, default=2000)
+    parser.add_argument('--corpus', type=int, default=200000, help="Entries in the corpus-like stream")
+    parser.add_argument('--unique', type=float, default=0.5, help="Share of corpus entries seen only once")
+    parser.add_argument('--show-errors', action='store_true', help="List the entries each classifier gets wrong")
+    args = parser.parse_args()
+
+    texts = [text for text, _ in LABELLED]
+    stream = corpus_stream(args.corpus, args.unique, random.Random(7))
+    print(f"{len(LABELLED)} labelled entries; corpus of {len(stream)} entries, {args.unique:.0%} unique")
+    print(f"{'classifier':>10} {'accuracy':>9} {'errors':>7} {'distinct/s':>11} {'corpus/s':>10} {'batch/s':>10} "
+          f"{'lines/s':>10} {'section/s':>10}")
+    for name, factory in (('substring', Substring), ('compiled', EducationClassifier)):
+        score, errors = accuracy(factory().classify, LABELLED)
+        # Passes over the labelled set would only measure the cache, so they run without one
+        uncached = factory(cache_size=0)
+        distinct = rate(lambda items: [uncached.classify(text) for text in items], texts, args.passes)
+        lines = rate(lambda items: [uncached.mentions_education(text) for text in items], texts, args.passes)
+        # One pass over the corpus each, with a fresh cache
+        cached = factory()
+        corpus = rate(lambda items: [cached.classify(text) for text in items], stream)
+        batch = rate(factory().classify_many, stream)
+        cached = factory()
+        parse = rate(section(cached.classify, cached.mentions_education), stream)
+        print(f"{name:>10} {score:>9.1%} {len(errors):>7} {distinct:>11,.0f} {corpus:>10,.0f} {batch:>10,.0f} "
+              f"{lines:>10,.0f} {parse:>10,.0f}")
+        if args.show_errors:
+            for text, label, got in errors:
+                print(f"{'':>12}{text!r}: expected {label}, got {got}")
+
+
+if __name__ == '__main__':
+    main()
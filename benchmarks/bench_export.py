@@ -0,0 +1,76 @@
+"""Measure streaming export time and memory on a synthetic corpus.
+
+Builds an in-memory corpus snapshot of synthetic resumes and exports all of
+them in every format and row shape, reporting wall time, output size and
+peak Python memory allocated while exporting (in a separate, traced pass).
+The output is counted and discarded, as a client reading the stream would.
+
+Usage:
+    python benchmarks/bench_export.py [--docs 100000] [--chunk-rows 5000]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resume_parser.corpus import CorpusSnapshot
+from resume_parser.query import ResumeFacts, ResumeQuery
+from resume_parser.export import FORMATS, ROW_SHAPES, ExportError, export_rows, matching_ids
+
+
+SKILLS = ["Python", "Java", "Go", "Kafka", "Spark", "PostgreSQL", "Redis", "Kubernetes", "Docker", "AWS",
+          "React", "Node.js", "TensorFlow", "PyTorch", "Airflow", "Snowflake", "Terraform", "GraphQL"]
+
+
+def synthetic_snapshot(docs, rng):
+    records = {}
+    facts = {}
+    for i in range(docs):
+        skills = rng.sample(SKILLS, rng.randint(3, 10))
+        experience = [{'company': f'Company {rng.randint(0, 5000)}', 'position': 'Software Engineer',
+                       'date': '2019 - 2023', 'description': f"Built {rng.choice(skills)} services"}
+                      for _ in range(rng.randint(1, 4))]
+        degree = {'degree': 'B.Tech in Computer Science', 'institution': 'State University',
+                  'graduation_year': str(rng.randint(2005, 2024)), 'gpa': round(rng.uniform(6, 10), 2)}
+        raw = {'skills': skills, 'experience': experience, 'education': [degree], 'degree_education': degree,
+               'degree_graduation_year': degree['graduation_year'], 'degree_gpa': degree['gpa']}
+        resume_id = f'resume_{i:06d}.rpr'
+        records[resume_id] = {'filename': f'resume_{i}.pdf', 'raw_parsed_data': raw,
+                              'parsed_data': {'skills': skills, 'experience': experience}}
+        facts[resume_id] = ResumeFacts.from_record(records[resume_id])
+    return CorpusSnapshot(records, facts=facts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    snapshot = synthetic_snapshot(args.docs, random.Random(7))
+    ids = matching_ids(snapshot, ResumeQuery())
+    print(f"{'format':>8} {'rows':>11} {'seconds':>8} {'MB out':>8} {'peak MB':>8}")
+    for fmt in FORMATS:
+        for rows in ROW_SHAPES:
+            try:
+                start = time.perf_counter()
+                size = sum(len(chunk) for chunk in export_rows(snapshot, ids, fmt, rows, args.chunk_rows))
+                elapsed = time.perf_counter() - start
+            except ExportError as e:
+                print(f"{fmt:>8} {rows:>11} skipped: {e}")
+                continue
+            # Measured in a second pass: tracing slows the export down several times
+            tracemalloc.start()
+            for _ in export_rows(snapshot, ids, fmt, rows, args.chunk_rows):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{fmt:>8} {rows:>11} {elapsed:>8.2f} {size / 1e6:>8.1f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
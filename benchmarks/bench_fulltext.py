@@ -0,0 +1,106 @@
+"""Measure full-text index build time and query latency on a synthetic corpus.
+
+Builds an FTS5 index of synthetic resumes (a few hundred words of text plus
+experience entries each) and reports p50/p95 latency for word, phrase,
+prefix, OR and exclusion queries, including snippet generation, plus a
+worst case: a word that appears in nearly every resume.
+
+Usage:
+    python benchmarks/bench_fulltext.py [--docs 100000] [--repeat 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resume_parser.corpus import ADDED
+from resume_parser.fulltext import FullTextIndex, build_match_expression
+from resume_parser.artifacts import ArtifactStore
+
+
+TECH = ["Python", "Java", "Go", "Kafka", "Spark", "PostgreSQL", "Redis", "Kubernetes", "Docker", "AWS",
+        "React", "Node.js", "TensorFlow", "PyTorch", "Airflow", "Snowflake", "Terraform", "GraphQL", "C++", "Rust"]
+# Long tail of other tools, so skill frequencies look like a real corpus
+# (a few very common, most rare) instead of every resume naming everything
+TOOLS = TECH + [f"tool{n}" for n in range(2000)]
+TOOL_WEIGHTS = [1 / (rank + 5) for rank in range(len(TOOLS))]
+TEAMS = ["payments team", "search team", "growth team", "platform team", "data team", "risk team"]
+FILLER = ("designed built maintained improved scaled migrated owned led delivered reduced latency cost "
+          "throughput reliability service pipeline system api customers engineers product launch").split()
+
+QUERIES = {
+    'word': 'kafka',
+    'rare word': 'rust',
+    'phrase': '"payments team"',
+    'prefix': 'kube*',
+    'or': 'snowflake OR airflow',
+    'exclude': 'kafka -java',
+    'multi': 'python "data team" spark',
+    # Worst case: a word in nearly every resume, so every one is scored
+    'common': 'service',
+}
+
+
+def synthetic_record(rng, i, store):
+    tools = rng.choices(TOOLS, TOOL_WEIGHTS, k=rng.randint(5, 25))
+    words = []
+    for _ in range(rng.randint(150, 400)):
+        roll = rng.random()
+        if roll < 0.05:
+            words.append(rng.choice(tools))
+        elif roll < 0.06:
+            words.append(rng.choice(TEAMS))
+        else:
+            words.append(rng.choice(FILLER))
+    text = f"Candidate {i}\n" + " ".join(words)
+    address = store.put(text)
+    experience = [{'position': 'Software Engineer', 'company': f'Company {rng.randint(0, 5000)}',
+                   'description': f"Built {rng.choice(tools)} services for the {rng.choice(TEAMS)}"}
+                  for _ in range(rng.randint(1, 4))]
+    return {'filename': f'resume_{i}.pdf',
+            'raw_parsed_data': {'experience': experience, 'pipeline': {'text_sha256': address}}}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--batch', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as workdir:
+        store = ArtifactStore(os.path.join(workdir, 'artifacts'))
+        index = FullTextIndex(os.path.join(workdir, 'fulltext.sqlite3'), store)
+
+        start = time.perf_counter()
+        for first in range(0, args.docs, args.batch):
+            for i in range(first, min(first + args.batch, args.docs)):
+                index.corpus_listener(ADDED, f'resume_{i}.rpr', synthetic_record(rng, i, store))
+            index.commit_batch()
+        print(f"Indexed {len(index)} documents in {time.perf_counter() - start:.1f} s")
+
+        conn = index._connection()
+        print(f"{'query':>10} {'matches':>8} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        for name, query in QUERIES.items():
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                index.search(query, k=20)
+                samples.append((time.perf_counter() - started) * 1000)
+            matches = conn.execute("SELECT COUNT(*) FROM resume_text WHERE resume_text MATCH ?",
+                                   (build_match_expression(query),)).fetchone()[0]
+            print(f"{name:>10} {matches:>8} {percentile(samples, 0.5):>9.2f} {percentile(samples, 0.95):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
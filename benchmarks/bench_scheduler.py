@@ -0,0 +1,147 @@
+"""Interactive parse latency while a bulk import runs, with and without the scheduler.
+
+Simulates the two scarce parse stages, sandboxed extraction (2 workers) and
+LLM calls (8 concurrent), with sleeps of realistic relative length. A bulk
+import keeps many threads' worth of files queued at both stages while
+interactive uploads arrive at a steady rate, and each configuration reports
+interactive p50/p95/p99 end-to-end latency and bulk throughput:
+
+- idle: interactive uploads alone, the target to stay close to;
+- fifo: both stages first come, first served (what a plain semaphore gives);
+- scheduler: PriorityScheduler with 8:1 weights and one reserved slot for
+  interactive work on each stage.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--seconds 20] [--bulk-threads 64] [--rate 2]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import deque
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resume_parser.scheduler import PriorityScheduler, Job, INTERACTIVE, BULK
+
+
+class FifoStage:
+    """First come, first served admission, the behaviour without a scheduler."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = deque()
+
+    def acquire(self, job=None, deadline=None):
+        with self._lock:
+            if not self._waiting and self._in_flight < self.capacity:
+                self._in_flight += 1
+                return
+            event = threading.Event()
+            self._waiting.append(event)
+        event.wait()
+
+    def release(self, job=None):
+        with self._lock:
+            if self._waiting:
+                # Hand the slot straight to the next waiter
+                self._waiting.popleft().set()
+            else:
+                self._in_flight -= 1
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float('nan')
+
+
+def parse(stages, job, rng, scale):
+    """One resume through extraction then the LLM; returns seconds taken."""
+    extraction, llm = stages
+    started = time.monotonic()
+    extraction.acquire(job)
+    try:
+        time.sleep(rng.lognormvariate(0, 0.5) * 0.3 * scale)
+    finally:
+        extraction.release(job)
+    llm.acquire(job)
+    try:
+        time.sleep(rng.lognormvariate(0, 0.3) * 2.0 * scale)
+    finally:
+        llm.release(job)
+    return time.monotonic() - started
+
+
+def run(stages, seconds, rate, bulk_threads, scale, seed):
+    stop = threading.Event()
+    bulk_done = [0]
+    bulk_lock = threading.Lock()
+
+    def bulk_worker(n):
+        rng = random.Random(seed * 1000 + n)
+        # Two import batches from different tenants share the bulk class
+        job = Job(BULK, f"batch-{n % 2}")
+        while not stop.is_set():
+            parse(stages, job, rng, scale)
+            with bulk_lock:
+                bulk_done[0] += 1
+
+    threads = [threading.Thread(target=bulk_worker, args=(n,), daemon=True) for n in range(bulk_threads)]
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def interactive(rng):
+        latency = parse(stages, Job(INTERACTIVE, 'recruiter'), rng, scale)
+        with latencies_lock:
+            latencies.append(latency)
+
+    rng = random.Random(seed)
+    uploads = []
+    # Let the bulk import fill the queues before measuring
+    time.sleep(2 * scale if bulk_threads else 0)
+    start = time.monotonic()
+    bulk_start = bulk_done[0]
+    while time.monotonic() - start < seconds:
+        time.sleep(rng.expovariate(rate))
+        thread = threading.Thread(target=interactive, args=(random.Random(rng.random()),), daemon=True)
+        thread.start()
+        uploads.append(thread)
+    for thread in uploads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    stop.set()
+    return sorted(latencies), (bulk_done[0] - bulk_start) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--rate', type=float, default=2.0, help="Interactive uploads per second")
+    parser.add_argument('--bulk-threads', type=int, default=64)
+    parser.add_argument('--scale', type=float, default=0.25, help="Multiplier on simulated stage durations")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    def scheduled(capacity):
+        return PriorityScheduler(capacity, weights={INTERACTIVE: 8, BULK: 1}, reserved={INTERACTIVE: 1})
+
+    configurations = [
+        ('idle', (FifoStage(2), FifoStage(8)), 0),
+        ('fifo', (FifoStage(2), FifoStage(8)), args.bulk_threads),
+        ('scheduler', (scheduled(2), scheduled(8)), args.bulk_threads),
+    ]
+    print(f"{'config':>10} {'uploads':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} {'bulk/s':>7}")
+    for name, stages, bulk_threads in configurations:
+        latencies, bulk_rate = run(stages, args.seconds, args.rate, bulk_threads, args.scale, args.seed)
+        print(f"{name:>10} {len(latencies):>8} {percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f} "
+              f"{percentile(latencies, 0.99):>8.2f} {bulk_rate:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Compare the legacy JSON result files with the compact record format.
+
+Writes the same synthetic corpus once as legacy ``json.dump(..., indent=2)``
+files (formatted view plus raw parse) and once per codec/compression
+combination of ``resume_parser.storage``, then reports bytes written, disk
+footprint (allocated blocks) and the time to load the whole corpus back.
+
+Usage:
+    python benchmarks/bench_storage.py [--count 2000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resume_parser.parser import format_parsed_data, get_all_skills
+from resume_parser.storage import write_record, read_record, msgpack, zstandard, record_filename
+
+
+def synthetic_parse(rng):
+    skills = rng.sample(get_all_skills(), rng.randint(5, 25))
+    year = str(rng.randint(2005, 2026))
+    degree = {
+        "institution": "Institute of Technology",
+        "degree": "B.Tech in Computer Science",
+        "graduation_year": year,
+        "gpa": round(rng.uniform(6, 10), 2),
+        "education_level": "degree",
+    }
+    education = [degree, {
+        "institution": "Senior Secondary School",
+        "degree": "12th",
+        "completion_year": str(int(year) - 4),
+        "gpa": None,
+        "education_level": "secondary",
+    }]
+    experience = [{
+        "company": f"Company {i}",
+        "position": "Software Engineer",
+        "date": "Jan 2020 - Present",
+        "description": " ".join(rng.sample(skills, min(5, len(skills)))) + " services for the payments team",
+    } for i in range(rng.randint(1, 4))]
+    return {
+        "skills": skills,
+        "education": education,
+        "experience": experience,
+        "degree_education": degree,
+        "degree_gpa": degree["gpa"],
+        "degree_graduation_year": year,
+    }
+
+
+def disk_usage(directory):
+    total_bytes = total_blocks = 0
+    for name in os.listdir(directory):
+        st = os.stat(os.path.join(directory, name))
+        total_bytes += st.st_size
+        total_blocks += st.st_blocks * 512
+    return total_bytes, total_blocks
+
+
+def write_legacy(directory, parses):
+    for i, parsed in enumerate(parses):
+        with open(os.path.join(directory, f"resume_{i}.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'filename': f"resume_{i}.pdf",
+                'parsed_data': format_parsed_data(parsed),
+                'raw_parsed_data': parsed
+            }, f, indent=2, ensure_ascii=False)
+
+
+def load_legacy(directory):
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+            json.load(f)
+
+
+def write_compact(directory, parses, codec, compression):
+    for i, parsed in enumerate(parses):
+        write_record(os.path.join(directory, record_filename(f"resume_{i}")), {
+            'filename': f"resume_{i}.pdf",
+            'raw_parsed_data': parsed
+        }, codec, compression)
+
+
+def load_compact(directory):
+    for name in os.listdir(directory):
+        read_record(os.path.join(directory, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    parses = [synthetic_parse(rng) for _ in range(args.count)]
+
+    variants = [("legacy json", None, None)]
+    for codec in ['json'] + (['msgpack'] if msgpack is not None else []):
+        for compression in ['none', 'gzip'] + (['zstd'] if zstandard is not None else []):
+            variants.append((f"{codec}+{compression}", codec, compression))
+
+    print(f"{args.count} records")
+    print(f"{'format':>16} {'written (KiB)':>14} {'on disk (KiB)':>14} {'write (s)':>10} {'load (s)':>9}")
+    baseline = None
+    for name, codec, compression in variants:
+        directory = tempfile.mkdtemp(prefix='bench_storage_')
+        try:
+            start = time.perf_counter()
+            if codec is None:
+                write_legacy(directory, parses)
+            else:
+                write_compact(directory, parses, codec, compression)
+            write_seconds = time.perf_counter() - start
+
+            written, on_disk = disk_usage(directory)
+
+            start = time.perf_counter()
+            if codec is None:
+                load_legacy(directory)
+            else:
+                load_compact(directory)
+            load_seconds = time.perf_counter() - start
+        finally:
+            shutil.rmtree(directory)
+
+        if baseline is None:
+            baseline = written
+        print(f"{name:>16} {written / 1024:>14.0f} {on_disk / 1024:>14.0f} {write_seconds:>10.2f} {load_seconds:>9.2f}"
+              f"   ({written / baseline * 100:.0f}% of legacy bytes)")
+
+
+if __name__ == '__main__':
+    main()
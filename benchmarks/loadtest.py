@@ -0,0 +1,426 @@
+"""Load-test the app under a multi-worker WSGI server with a stubbed LLM.
+
+Starts a local stub of the Anthropic messages API (configurable latency and
+error rates), starts app.py under gunicorn (or waitress) in a scratch
+directory pointed at the stub, seeds it with a few uploads and then drives
+mixed upload / filter / results traffic at each target request rate in turn.
+
+Traffic is open-loop: requests are sent on a fixed schedule whether or not
+earlier ones have finished, and latency is measured from the scheduled send
+time, so a server that falls behind shows up as growing latency instead of
+as a lower request rate.
+
+The report is JSON with sorted keys, one entry per rate and route with
+p50/p95/p99 latency, throughput and error rate, plus what the stub LLM saw,
+so that reports from two versions can be diffed directly.
+
+gunicorn is not in requirements.txt; install it (or waitress) to run this.
+``--server asgi`` serves asgi.py on gunicorn's asgi worker instead, with
+``--threads`` view threads per worker.
+
+Usage:
+    python benchmarks/loadtest.py [--rates 2 5 10] [--duration 30] [--workers 4]
+        [--mix upload=1,filter=6,results=3] [--llm-latency 2.0] [--llm-429 0.05]
+        [--output report.json]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import Counter
+from urllib.parse import urlencode, urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import docx
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SKILLS = ["Python", "Java", "Go", "Kafka", "Spark", "PostgreSQL", "Redis", "Kubernetes", "Docker", "AWS",
+          "React", "Node.js", "TensorFlow", "PyTorch", "Airflow", "Snowflake", "Terraform", "GraphQL"]
+DEGREES = ["B.Tech in Computer Science", "Bachelor of Science in Mathematics", "B.E. in Electronics"]
+ROUTES = ('upload', 'filter', 'results')
+
+
+# --- Stub Anthropic API ---------------------------------------------------
+
+class StubLLM:
+    """Settings and counters shared by the stub API's request handlers."""
+
+    def __init__(self, latency=2.0, jitter=0.5, rate_limited=0.0, overloaded=0.0, failed=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = [(429, 'rate_limit_error', rate_limited), (529, 'overloaded_error', overloaded),
+                       (500, 'api_error', failed)]
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.responses = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def outcome(self):
+        """Pick (status, error type, delay) for one request."""
+        with self.lock:
+            roll = self.random.random()
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter * self.latency))
+        for status, error_type, rate in self.errors:
+            if roll < rate:
+                # Errors come back quickly, as they do from the real API
+                return status, error_type, min(delay, 0.05)
+            roll -= rate
+        return 200, None, delay
+
+    def stats(self):
+        with self.lock:
+            return {'responses': {str(status): count for status, count in sorted(self.responses.items())},
+                    'peak_in_flight': self.peak_in_flight}
+
+
+def stub_parse(prompt):
+    """Build a plausible parse of the resume text embedded in ``prompt``."""
+    lowered = prompt.lower()
+    skills = [skill for skill in SKILLS if skill.lower() in lowered]
+    year = next((word for word in prompt.split() if word.isdigit() and len(word) == 4), None)
+    return {
+        'skills': skills,
+        'education': [{'institution': 'State University', 'degree': DEGREES[len(prompt) % len(DEGREES)],
+                       'graduation_year': year, 'gpa': 8.1, 'education_level': 'degree'}],
+        'experience': [{'company': 'Example Corp', 'position': 'Software Engineer', 'date': '2019 - 2023',
+                        'description': f"Built services with {', '.join(skills[:3])}"}],
+    }
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with stub.lock:
+            stub.in_flight += 1
+            stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+        try:
+            status, error_type, delay = stub.outcome()
+            time.sleep(delay)
+            headers = {}
+            if status == 200:
+                prompt = ''.join(message.get('content', '') for message in body.get('messages', [])
+                                 if isinstance(message.get('content'), str))
+                payload = {
+                    'id': f"msg_stub_{random.getrandbits(48):012x}", 'type': 'message', 'role': 'assistant',
+                    'model': body.get('model', 'stub'), 'stop_reason': 'end_turn', 'stop_sequence': None,
+                    'content': [{'type': 'text', 'text': json.dumps(stub_parse(prompt))}],
+                    'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': 200},
+                }
+            else:
+                payload = {'type': 'error', 'error': {'type': error_type, 'message': 'stubbed error'}}
+                if status == 429:
+                    headers['retry-after'] = '1'
+            self._send(status, payload, headers)
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+                stub.responses[status] += 1
+
+    def _send(self, status, payload, headers):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_llm(stub, port=0):
+    """Serve ``stub`` on a background thread; returns the server (``server_address`` has the port)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubLLMHandler)
+    server.daemon_threads = True
+    server.stub = stub
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --- App under test -------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_app(workdir, port, env, server='gunicorn', workers=4, threads=4, timeout=120):
+    """Start app.py under a WSGI (or ASGI) server with ``workdir`` as its data directory."""
+    if server == 'asgi':
+        command = [sys.executable, '-m', 'gunicorn', '-k', 'asgi', '--pythonpath', REPO, '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--timeout', str(timeout), '--log-level', 'warning', 'asgi:application']
+        env = dict(env, RESUME_ASGI_THREADS=str(threads))
+    elif server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--pythonpath', REPO, '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--threads', str(threads), '--timeout', str(timeout),
+                   '--log-level', 'warning', 'app:app']
+    else:
+        # waitress has no worker processes; it is here for platforms without gunicorn
+        command = [sys.executable, '-m', 'waitress', f'--listen=127.0.0.1:{port}',
+                   f'--threads={workers * threads}', 'app:app']
+        env = dict(env, PYTHONPATH=os.pathsep.join(filter(None, [REPO, env.get('PYTHONPATH')])))
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(port, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}; see server.log")
+        try:
+            status, _, _ = request(port, 'GET', '/api/skills', timeout=5)
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server not ready after {timeout} s")
+
+
+# --- Traffic --------------------------------------------------------------
+
+def request(port, method, path, body=None, headers=None, timeout=60):
+    """Send one request without following redirects; returns (status, headers, body)."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def build_resume(rng, n):
+    """A small DOCX resume; ``n`` makes its text unique so no cache short-circuits the parse."""
+    skills = rng.sample(SKILLS, rng.randint(3, 8))
+    doc = docx.Document()
+    doc.add_paragraph(f"Candidate {n} {rng.getrandbits(32):08x}")
+    doc.add_paragraph("EDUCATION")
+    doc.add_paragraph(f"{rng.choice(DEGREES)}, State University, {rng.randint(2005, 2024)}, GPA {rng.uniform(6, 10):.1f}")
+    doc.add_paragraph("EXPERIENCE")
+    for _ in range(rng.randint(1, 4)):
+        doc.add_paragraph(f"Software Engineer at Example Corp: built {rng.choice(skills)} services")
+    doc.add_paragraph("SKILLS")
+    doc.add_paragraph(', '.join(skills))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def multipart(field, filename, data):
+    boundary = f"----loadtest{random.getrandbits(64):016x}"
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n").encode('utf-8') + data + \
+        f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+class Traffic:
+    """Builds and checks requests for each route; remembers uploaded records for 'results'."""
+
+    def __init__(self, port, timeout, seed=0):
+        self.port = port
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.uploads = 0
+        self.records = []
+
+    def upload(self):
+        with self.lock:
+            self.uploads += 1
+            n = self.uploads
+            data = build_resume(self.rng, n)
+        body, headers = multipart('file', f'resume_{n}.docx', data)
+        status, response_headers, _ = request(self.port, 'POST', '/upload', body, headers, self.timeout)
+        # Success redirects to the results page; failures redirect back with a flashed error
+        location = urlsplit(response_headers.get('Location', ''))
+        filename = parse_qs(location.query).get('filename', [None])[0]
+        if status != 302 or location.path != '/results' or not filename:
+            return status, False
+        with self.lock:
+            self.records.append(filename)
+        return status, True
+
+    def filter(self):
+        with self.lock:
+            criteria = {'skills': self.rng.sample(SKILLS, self.rng.randint(1, 2))}
+            if self.rng.random() < 0.5:
+                criteria['yearFrom'] = self.rng.randint(2005, 2015)
+        status, _, _ = request(self.port, 'POST', '/api/filter_resumes', json.dumps(criteria).encode('utf-8'),
+                               {'Content-Type': 'application/json'}, self.timeout)
+        return status, status == 200
+
+    def results(self):
+        with self.lock:
+            if not self.records:
+                return None, False
+            filename = self.rng.choice(self.records)
+        status, _, _ = request(self.port, 'GET', '/results?' + urlencode({'filename': filename}),
+                               timeout=self.timeout)
+        return status, status == 200
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route {route!r}; expected one of {', '.join(ROUTES)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else None
+
+
+def summarize(samples, duration):
+    """Per-route statistics for one stage from (route, latency, status, ok) samples."""
+    summary = {}
+    for route in sorted({sample[0] for sample in samples}):
+        rows = [sample for sample in samples if sample[0] == route]
+        latencies = sorted(latency * 1000 for _, latency, _, ok in rows if ok)
+        errors = sum(1 for row in rows if not row[3])
+        summary[route] = {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4),
+            'throughput_rps': round(len(latencies) / duration, 3),
+            'latency_ms': {name: round(value, 1) if value is not None else None for name, value in (
+                ('p50', percentile(latencies, 0.50)), ('p95', percentile(latencies, 0.95)),
+                ('p99', percentile(latencies, 0.99)), ('max', latencies[-1] if latencies else None))},
+            'status': {str(status): count for status, count in sorted(Counter(row[2] for row in rows).items(),
+                                                                       key=lambda item: str(item[0]))},
+        }
+    return summary
+
+
+def run_stage(traffic, rate, duration, mix, rng, max_in_flight):
+    """Send requests at ``rate`` per second for ``duration`` seconds and wait for all of them."""
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    samples = []
+    samples_lock = threading.Lock()
+
+    def send(route, scheduled):
+        try:
+            status, ok = getattr(traffic, route)()
+        except Exception as e:
+            status, ok = type(e).__name__, False
+        latency = time.monotonic() - scheduled
+        with samples_lock:
+            samples.append((route, latency, status, ok))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        start = time.monotonic()
+        scheduled = start
+        while scheduled < start + duration:
+            # Poisson arrivals at the target rate
+            scheduled += rng.expovariate(rate)
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, rng.choices(routes, weights)[0], scheduled)
+    return summarize(samples, duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=float, nargs='+', default=[2, 5, 10], help="Requests per second, one stage each")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds per stage")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('upload=1,filter=6,results=3'))
+    parser.add_argument('--seed-uploads', type=int, default=10, help="Uploads before the first stage")
+    parser.add_argument('--server', choices=['gunicorn', 'waitress', 'asgi'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=60, help="Client timeout per request")
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--llm-latency', type=float, default=2.0, help="Mean stub LLM latency in seconds")
+    parser.add_argument('--llm-jitter', type=float, default=0.25, help="Latency std dev as a fraction of the mean")
+    parser.add_argument('--llm-429', type=float, default=0.0, help="Fraction of LLM calls answered 429")
+    parser.add_argument('--llm-529', type=float, default=0.0, help="Fraction of LLM calls answered 529")
+    parser.add_argument('--llm-500', type=float, default=0.0, help="Fraction of LLM calls answered 500")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch directory (server.log, data)")
+    parser.add_argument('--output', default='-')
+    args = parser.parse_args()
+
+    stub = StubLLM(args.llm_latency, args.llm_jitter, args.llm_429, args.llm_529, args.llm_500, args.seed)
+    llm_server = start_stub_llm(stub)
+    workdir = tempfile.mkdtemp(prefix='resume-loadtest-')
+    port = free_port()
+    env = dict(os.environ,
+               ANTHROPIC_BASE_URL=f"http://127.0.0.1:{llm_server.server_address[1]}",
+               ANTHROPIC_API_KEY='stub', RESUME_LLM_CACHE='off')
+    process = start_app(workdir, port, env, args.server, args.workers, args.threads)
+
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'keep')},
+        'stages': [],
+    }
+    try:
+        wait_until_ready(port, process)
+        traffic = Traffic(port, args.timeout, args.seed)
+        for _ in range(args.seed_uploads):
+            traffic.upload()
+        print(f"Seeded {len(traffic.records)} resumes", file=sys.stderr)
+
+        rng = random.Random(args.seed)
+        for rate in args.rates:
+            before = stub.stats()['responses']
+            routes = run_stage(traffic, rate, args.duration, args.mix, rng, args.max_in_flight)
+            after = stub.stats()['responses']
+            llm = {status: count - int(before.get(status, 0)) for status, count in after.items()}
+            status, _, body = request(port, 'GET', '/api/metrics/llm', timeout=10)
+            report['stages'].append({
+                'target_rps': rate,
+                'routes': routes,
+                'llm_responses': llm,
+                # One worker's limiter; each worker process keeps its own
+                'llm_limiter': json.loads(body) if status == 200 else None,
+            })
+            worst = max((route['latency_ms']['p99'] or 0 for route in routes.values()), default=0)
+            print(f"{rate:g} rps: worst p99 {worst:.0f} ms", file=sys.stderr)
+        report['llm_peak_in_flight'] = stub.stats()['peak_in_flight']
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        llm_server.shutdown()
+        if args.keep:
+            print(f"Scratch directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""Marks the repository root, which pytest puts on sys.path so tests import ``resume_parser`` directly.
+
+Run the tests with ``python -m pytest`` from anywhere in the repository; pytest.ini points it at tests/.
+"""
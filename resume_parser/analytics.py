@@ -0,0 +1,333 @@
+"""Talent-pool analytics over the corpus with sparse matrices.
+
+:class:`SkillMatrix` holds every resume as a row of a resume x skill CSR
+matrix, with the degree year, degree GPA and number of experience entries
+in vectors aligned with the rows. It follows a :class:`ResumeCorpus`
+through ``corpus_listener``:
+
+- an added resume appends one row to flat buffers;
+- a removed or updated resume only clears its old row's live flag;
+- so a change costs the size of that resume, not the corpus.
+
+Dead rows are compacted away once they make up a quarter of the buffers.
+The CSR and CSC arrays are rebuilt from the buffers, vectorized, at most
+once per query after a change.
+
+Queries are whole-matrix operations rather than loops over resumes:
+
+- :meth:`SkillMatrix.top_skills`: most common skills, optionally for one
+  graduation year;
+- :meth:`SkillMatrix.top_skills_by_year`: the same for every year at once
+  (years x skills = Y X);
+- :meth:`SkillMatrix.cooccurrence`: skills listed together with one skill,
+  with support, Jaccard similarity and lift;
+- :meth:`SkillMatrix.top_pairs`: the most frequent skill pairs overall
+  (the upper triangle of X^T X);
+- :meth:`SkillMatrix.histogram`: distribution of year, GPA or experience,
+  optionally among resumes with one skill;
+- :meth:`SkillMatrix.gpa_by_skill`: GPA histogram and mean for many skills
+  at once (X^T B, with B the one-hot GPA bin of each resume).
+
+Skills are matched case-insensitively, as the filters do, and reported
+with the spelling they were first seen with. Needs scipy
+(``pip install scipy``).
+"""
+import threading
+from array import array
+
+import numpy as np
+
+try:
+    import scipy.sparse
+except ImportError:
+    scipy = None
+
+from resume_parser.corpus import REMOVED
+from resume_parser.query import ResumeFacts
+
+FACETS = ('year', 'gpa', 'experience')
+
+
+class AnalyticsError(ValueError):
+    """Raised for an unknown facet or skill, or when scipy is not installed."""
+
+
+def _top(counts, k):
+    """Indices of the ``k`` largest non-zero ``counts``, largest first."""
+    nonzero = np.flatnonzero(counts)
+    if k <= 0:
+        return nonzero[:0]
+    if len(nonzero) > k:
+        nonzero = nonzero[np.argpartition(counts[nonzero], -k)[-k:]]
+    # Ties are broken by column so results are stable
+    return nonzero[np.lexsort((nonzero, -counts[nonzero]))]
+
+
+class _Matrices:
+    """The live rows of a :class:`SkillMatrix` at one version; never modified."""
+
+    def __init__(self, csr, ids, years, gpas, experience, names):
+        self.csr = csr
+        self.csc = csr.tocsc()
+        self.ids = ids
+        self.years = years
+        self.gpas = gpas
+        self.experience = experience
+        self.names = names
+        self.document_frequency = np.diff(self.csc.indptr)
+        self._pairs = None
+        self._lock = threading.Lock()
+
+    def rows_with(self, column):
+        return self.csc.indices[self.csc.indptr[column]:self.csc.indptr[column + 1]]
+
+    def pairs(self):
+        """Upper triangle of the skill co-occurrence matrix X^T X, computed once per version."""
+        with self._lock:
+            if self._pairs is None:
+                self._pairs = scipy.sparse.triu(self.csc.T @ self.csc, k=1).tocoo()
+            return self._pairs
+
+
+class SkillMatrix:
+    """Resume x skill matrix kept current by corpus events; see the module docstring."""
+
+    def __init__(self, compact_ratio=0.25):
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._columns = {}              # lowercase skill -> column
+        self._names = []                # column -> skill as first seen
+        self._rows = {}                 # resume id -> row in the buffers
+        self._row_ids = []
+        self._alive = bytearray()
+        self._indices = array('i')
+        self._indptr = array('q', [0])
+        self._years = array('d')
+        self._gpas = array('d')
+        self._experience = array('i')
+        self._dead = 0
+        self._version = 0
+        self._built = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    @classmethod
+    def from_facts(cls, facts):
+        """Build a matrix from ``{resume_id: ResumeFacts}``, e.g. a corpus snapshot's facts."""
+        matrix = cls()
+        for resume_id, resume_facts in facts.items():
+            matrix.add(resume_id, resume_facts)
+        return matrix
+
+    def add(self, resume_id, facts, skills=None):
+        """Add (or replace) a resume given its :class:`ResumeFacts`.
+
+        ``skills`` are the resume's skills as written, used only to name new
+        columns; the lowercase ``facts.skills`` decide which columns are set.
+        """
+        spelling = {skill.lower(): skill for skill in skills or () if isinstance(skill, str)}
+        with self._lock:
+            self._remove(resume_id)
+            columns = []
+            for skill in facts.skills:
+                column = self._columns.get(skill)
+                if column is None:
+                    column = self._columns[skill] = len(self._names)
+                    self._names.append(spelling.get(skill, skill))
+                columns.append(column)
+            columns.sort()
+            self._rows[resume_id] = len(self._row_ids)
+            self._row_ids.append(resume_id)
+            self._alive.append(1)
+            self._indices.extend(columns)
+            self._indptr.append(len(self._indices))
+            self._years.append(np.nan if facts.year is None else facts.year)
+            self._gpas.append(np.nan if facts.gpa is None else facts.gpa)
+            self._experience.append(facts.experience_count)
+            self._version += 1
+
+    def remove(self, resume_id):
+        """Remove a resume if present."""
+        with self._lock:
+            if self._remove(resume_id):
+                self._version += 1
+
+    def _remove(self, resume_id):
+        row = self._rows.pop(resume_id, None)
+        if row is None:
+            return False
+        self._alive[row] = 0
+        self._dead += 1
+        if self._dead > self.compact_ratio * len(self._row_ids):
+            self._compact()
+        return True
+
+    def _compact(self):
+        """Drop dead rows from the buffers."""
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        indptr = np.array(self._indptr)
+        keep_entries = np.repeat(alive, np.diff(indptr))
+        self._indices = array('i', np.array(self._indices)[keep_entries].tobytes())
+        self._indptr = array('q', np.concatenate(([0], np.cumsum(np.diff(indptr)[alive]))).tobytes())
+        self._years = array('d', np.array(self._years)[alive].tobytes())
+        self._gpas = array('d', np.array(self._gpas)[alive].tobytes())
+        self._experience = array('i', np.array(self._experience)[alive].tobytes())
+        self._row_ids = [resume_id for resume_id, live in zip(self._row_ids, alive) if live]
+        self._rows = {resume_id: row for row, resume_id in enumerate(self._row_ids)}
+        self._alive = bytearray(b'\x01' * len(self._row_ids))
+        self._dead = 0
+
+    def corpus_listener(self, kind, resume_id, record):
+        """Keep the matrix in sync with a :class:`ResumeCorpus`."""
+        if kind == REMOVED:
+            self.remove(resume_id)
+        else:
+            self.add(resume_id, ResumeFacts.from_record(record), (record.get('parsed_data') or {}).get('skills'))
+
+    def _matrices(self):
+        if scipy is None:
+            raise AnalyticsError("scipy not installed. Install with: pip install scipy")
+        with self._lock:
+            if self._built is not None and self._built[0] == self._version:
+                return self._built[1]
+            rows = len(self._row_ids)
+            indices = np.array(self._indices, dtype=np.int32)
+            csr = scipy.sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices,
+                                           np.array(self._indptr, dtype=np.int64)),
+                                          shape=(rows, len(self._names)))
+            live = np.flatnonzero(np.frombuffer(bytes(self._alive), dtype=np.uint8))
+            if len(live) < rows:
+                csr = csr[live]
+            matrices = _Matrices(csr, [self._row_ids[row] for row in live], np.array(self._years)[live],
+                                 np.array(self._gpas)[live], np.array(self._experience)[live], list(self._names))
+            self._built = (self._version, matrices)
+            return matrices
+
+    def _column(self, matrices, skill):
+        column = self._columns.get(skill.lower()) if skill else None
+        if column is None or column >= len(matrices.names) or not matrices.document_frequency[column]:
+            raise AnalyticsError(f"No resume lists the skill {skill!r}")
+        return column
+
+    def top_skills(self, k=20, year=None):
+        """Return the ``k`` most common skills as ``[(skill, resumes)]``, optionally for one graduation year."""
+        m = self._matrices()
+        if year is None:
+            counts = m.document_frequency
+        else:
+            rows = np.flatnonzero(m.years == year)
+            counts = np.bincount(m.csr[rows].indices, minlength=len(m.names))
+        return [(m.names[column], int(counts[column])) for column in _top(counts, k)]
+
+    def top_skills_by_year(self, k=10):
+        """Return ``[{'year', 'resumes', 'skills': [(skill, resumes)]}]`` for every graduation year, newest first."""
+        m = self._matrices()
+        known = np.flatnonzero(~np.isnan(m.years))
+        years, year_rows = np.unique(m.years[known].astype(np.int64), return_inverse=True)
+        # One row per year selecting its resumes; (Y X)[y, s] counts resumes of year y listing skill s
+        selector = scipy.sparse.csr_matrix((np.ones(len(known), dtype=np.int32), (year_rows, known)),
+                                           shape=(len(years), m.csr.shape[0]))
+        counts = (selector @ m.csr).toarray()
+        resumes = np.bincount(year_rows, minlength=len(years))
+        return [{'year': int(years[y]), 'resumes': int(resumes[y]),
+                 'skills': [(m.names[column], int(counts[y, column])) for column in _top(counts[y], k)]}
+                for y in range(len(years) - 1, -1, -1)]
+
+    def cooccurrence(self, skill, k=20):
+        """Return the ``k`` skills most often listed together with ``skill``.
+
+        Each entry has the number of resumes listing both, ``support`` (the
+        share of resumes with ``skill`` that also list it), ``jaccard`` and
+        ``lift`` (how much more often the two appear together than if they
+        were independent).
+        """
+        m = self._matrices()
+        column = self._column(m, skill)
+        rows = m.rows_with(column)
+        together = np.bincount(m.csr[rows].indices, minlength=len(m.names))
+        together[column] = 0
+        frequency = m.document_frequency
+        total = m.csr.shape[0]
+        result = []
+        for other in _top(together, k):
+            both = int(together[other])
+            result.append({
+                'skill': m.names[other],
+                'resumes': both,
+                'support': both / len(rows),
+                'jaccard': both / (len(rows) + frequency[other] - both),
+                'lift': both * total / (len(rows) * frequency[other]),
+            })
+        return {'skill': m.names[column], 'resumes': len(rows), 'cooccurring': result}
+
+    def top_pairs(self, k=20):
+        """Return the ``k`` skill pairs listed together on the most resumes as ``[(skill, skill, resumes)]``."""
+        m = self._matrices()
+        pairs = m.pairs()
+        return [(m.names[pairs.row[i]], m.names[pairs.col[i]], int(pairs.data[i])) for i in _top(pairs.data, k)]
+
+    def _facet(self, m, facet):
+        if facet not in FACETS:
+            raise AnalyticsError(f"Unknown facet {facet!r}; expected one of {', '.join(FACETS)}")
+        return {'year': m.years, 'gpa': m.gpas, 'experience': m.experience}[facet]
+
+    def _gpa_edges(self, m, bins):
+        known = m.gpas[~np.isnan(m.gpas)]
+        # Shared edges over the whole corpus, so histograms of different skills line up
+        return np.histogram_bin_edges(known if len(known) else [0.0], bins=bins)
+
+    def histogram(self, facet, skill=None, bins=10):
+        """Return the distribution of ``facet`` ('year', 'gpa' or 'experience'), optionally among resumes with ``skill``.
+
+        Years and experience counts are reported per value; GPAs in ``bins``
+        equal-width bins spanning the corpus's GPAs.
+        """
+        m = self._matrices()
+        values = self._facet(m, facet)
+        if skill:
+            values = values[m.rows_with(self._column(m, skill))]
+        values = np.asarray(values, dtype=np.float64)
+        known = values[~np.isnan(values)]
+        result = {'facet': facet, 'skill': skill, 'resumes': len(values), 'missing': int(len(values) - len(known)),
+                  'mean': float(known.mean()) if len(known) else None,
+                  'median': float(np.median(known)) if len(known) else None}
+        if facet == 'gpa':
+            edges = self._gpa_edges(m, bins)
+            counts, _ = np.histogram(known, bins=edges)
+            result['bins'] = [{'from': float(edges[i]), 'to': float(edges[i + 1]), 'count': int(counts[i])}
+                              for i in range(len(counts))]
+        else:
+            distinct, counts = np.unique(known.astype(np.int64), return_counts=True)
+            result['bins'] = [{'value': int(value), 'count': int(count)} for value, count in zip(distinct, counts)]
+        return result
+
+    def gpa_by_skill(self, skills=None, k=20, bins=10):
+        """Return the GPA distribution of each of ``skills``, or of the ``k`` most common skills.
+
+        Every skill gets the number of resumes listing it, how many of those
+        have a GPA, their mean GPA and a histogram over shared ``edges``.
+        """
+        m = self._matrices()
+        if skills:
+            columns = np.array([self._column(m, skill) for skill in skills], dtype=np.int64)
+        else:
+            columns = _top(m.document_frequency, k)
+        known = np.flatnonzero(~np.isnan(m.gpas))
+        edges = self._gpa_edges(m, bins)
+        gpas = m.gpas[known]
+        # Bin of each resume's GPA, the last bin closed like np.histogram's
+        bin_of = np.clip(np.searchsorted(edges, gpas, side='right') - 1, 0, len(edges) - 2)
+        binned = scipy.sparse.csr_matrix((np.ones(len(known), dtype=np.int32), (known, bin_of)),
+                                         shape=(m.csr.shape[0], len(edges) - 1))
+        selected = m.csc[:, columns].T.tocsr()
+        histograms = (selected @ binned).toarray()
+        with_gpa = histograms.sum(axis=1)
+        totals = selected @ np.nan_to_num(m.gpas)
+        return {
+            'edges': [float(edge) for edge in edges],
+            'skills': [{'skill': m.names[column], 'resumes': int(m.document_frequency[column]),
+                        'with_gpa': int(with_gpa[i]), 'mean': float(totals[i] / with_gpa[i]) if with_gpa[i] else None,
+                        'histogram': [int(count) for count in histograms[i]]}
+                       for i, column in enumerate(columns)],
+        }
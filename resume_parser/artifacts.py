@@ -0,0 +1,113 @@
+"""Content-addressed store for intermediate pipeline artifacts.
+
+Extracted text (``extract_text``) and cleaned text (``clean_text``) are kept
+so that re-parsing, search indexing and debugging never have to repeat PDF or
+OCR extraction. An artifact is addressed by the SHA-256 of its content, so
+identical text from different uploads is stored once and an address recorded
+in a parse (``pipeline['text_sha256']``) always names exactly the text it was
+parsed from. Each file holds a 5-byte header::
+
+    b'RPA' | format version | compression id
+
+followed by the compressed content, under ``<directory>/<ab>/<abcdef...>``.
+"""
+import os
+import hashlib
+import threading
+
+from resume_parser.storage import COMPRESSIONS, StorageError, compress, decompress, default_compression
+
+MAGIC = b'RPA'
+FORMAT_VERSION = 1
+
+
+def content_address(data):
+    """Return the address of ``data`` (bytes, or text encoded as UTF-8)."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class ArtifactStore:
+    """Compressed, content-addressed blobs on local disk."""
+
+    def __init__(self, directory, compression=None):
+        self.directory = directory
+        self.compression = compression or default_compression()
+
+    def path(self, address):
+        return os.path.join(self.directory, address[:2], address)
+
+    def __contains__(self, address):
+        return bool(address) and os.path.exists(self.path(address))
+
+    def put(self, data):
+        """Store ``data`` (bytes or text) if it is not stored yet and return its address."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        address = content_address(data)
+        path = self.path(address)
+        if os.path.exists(path):
+            return address
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = MAGIC + bytes([FORMAT_VERSION, COMPRESSIONS[self.compression]])
+        # Unique temp name: two workers may store the same text at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header + compress(data, self.compression))
+        os.replace(tmp_path, path)
+        return address
+
+    def get(self, address):
+        """Return the bytes stored at ``address``, or None if there are none."""
+        if not address:
+            return None
+        try:
+            with open(self.path(address), 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        if not blob.startswith(MAGIC):
+            raise StorageError(f"Not an artifact: {address}")
+        if blob[3] > FORMAT_VERSION:
+            raise StorageError(f"Artifact format version {blob[3]} is newer than supported ({FORMAT_VERSION})")
+        return decompress(blob[5:], blob[4])
+
+    def get_text(self, address):
+        data = self.get(address)
+        return data.decode('utf-8') if data is not None else None
+
+    def lazy_text(self, address):
+        """Return a :class:`LazyText` that reads the text at ``address`` on first use."""
+        return LazyText(self, address)
+
+
+class LazyText:
+    """Handle to stored text that is only read and decompressed when asked for."""
+
+    def __init__(self, store, address):
+        self.store = store
+        self.address = address
+        self._text = None
+
+    @property
+    def available(self):
+        return self._text is not None or self.address in self.store
+
+    @property
+    def text(self):
+        """The text, or None if the artifact is missing."""
+        if self._text is None:
+            self._text = self.store.get_text(self.address)
+        return self._text
+
+    def __str__(self):
+        return self.text or ''
+
+
+def record_text(store, raw, kind='clean'):
+    """Return a LazyText for the cleaned (or, with kind='raw', extracted) text of a parse, or None."""
+    pipeline = (raw or {}).get('pipeline') or {}
+    address = pipeline.get('text_sha256' if kind == 'clean' else 'raw_text_sha256')
+    return store.lazy_text(address) if address else None
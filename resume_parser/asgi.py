@@ -0,0 +1,220 @@
+"""Serve the Flask app from an event loop, over ASGI, without a thread per connection.
+
+Under a threaded WSGI server a request holds a thread from the moment its
+headers arrive until the last byte of its response is sent. A client
+uploading a 16 MB resume over a slow link holds one, and so does every
+upload waiting on extraction and the LLM; a handful of them leave no thread
+for /filter. :class:`AsgiBridge` puts an event loop in front of the
+unchanged Flask app:
+
+- request bodies are received by the event loop and spooled, in memory up
+  to ``spool_memory`` bytes and to a temporary file in ``spool_dir`` past
+  that, before any thread is involved, so a slow client holds a connection
+  rather than a thread; writes to the file are done off the loop;
+- the view then runs on a thread pool chosen by route. Views stay
+  synchronous: an upload holds one of its pool's threads while it waits on
+  extraction and the LLM, whose calls block rather than being awaited.
+  Giving uploads a pool of their own caps how many wait at once and keeps
+  them from starving reads of the in-memory corpus;
+- responses are sent one chunk at a time, so a streamed export does not
+  hold a thread while a slow client drains it.
+
+Routes, templates, sessions and flashed messages are Flask's own; the
+bridge only translates between ASGI messages and a WSGI environ.
+"""
+import sys
+import asyncio
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL = 'default'
+
+_DONE = object()
+
+
+class AsgiBridge:
+    """ASGI application running a WSGI application on thread pools.
+
+    Args:
+        wsgi_app: the WSGI application, e.g. the Flask app
+        threads: threads of the default pool, which runs every route not in ``routes``
+        pools: extra pools as ``{name: threads}``
+        routes: ``{(method, path): pool name}`` for requests that get their own pool
+        spool_memory: request body bytes kept in memory before spooling to a file
+        spool_dir: directory of spooled request bodies (the system default if None)
+        max_body: request body bytes read before giving up; past it the app sees the
+            oversized length and answers 413 itself
+        on_shutdown: callables run when the server shuts the application down
+    """
+
+    def __init__(self, wsgi_app, threads=16, pools=None, routes=None, spool_memory=1024 * 1024,
+                 spool_dir=None, max_body=None, on_shutdown=()):
+        self.wsgi_app = wsgi_app
+        self.routes = dict(routes or {})
+        self.spool_memory = spool_memory
+        self.spool_dir = spool_dir
+        self.max_body = max_body
+        self.on_shutdown = list(on_shutdown)
+        self._executors = {name: ThreadPoolExecutor(max_workers=count, thread_name_prefix=f'asgi-{name}')
+                           for name, count in dict(pools or {}, **{DEFAULT_POOL: threads}).items()}
+        unknown = set(self.routes.values()) - set(self._executors)
+        if unknown:
+            raise ValueError(f"Routes refer to undefined pools: {', '.join(sorted(unknown))}")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+        received = await self._receive_body(scope, receive)
+        if received is None:
+            # The client went away before sending the whole body
+            return
+        body, length = received
+        try:
+            executor = self._executors[self.routes.get((scope['method'], scope['path']), DEFAULT_POOL)]
+            await self._respond(executor, self._environ(scope, body, length), send)
+        finally:
+            body.close()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _receive_body(self, scope, receive):
+        """Spool the request body; returns (rewound file, length), or None if the client disconnected."""
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_memory, dir=self.spool_dir)
+        declared = _header(scope, b'content-length')
+        if declared is not None and declared.isdigit() and self.max_body is not None \
+                and int(declared) > self.max_body:
+            # Leave the body unread; the app rejects the declared length without reading it
+            return spool, int(declared)
+
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                spool.close()
+                return None
+            chunk = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if not chunk:
+                continue
+            size += len(chunk)
+            if self.max_body is not None and size > self.max_body:
+                break
+            if size > self.spool_memory:
+                # Past the in-memory limit the spool is a file; keep disk writes off the loop
+                await asyncio.to_thread(spool.write, chunk)
+            else:
+                spool.write(chunk)
+        spool.seek(0)
+        return spool, size
+
+    def _environ(self, scope, body, length):
+        root_path = scope.get('root_path', '')
+        path = scope['path']
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            # WSGI carries paths as bytes decoded as latin-1
+            'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+            'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'CONTENT_LENGTH': str(length),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_LENGTH':
+                continue
+            key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+    async def _respond(self, executor, environ, send):
+        loop = asyncio.get_running_loop()
+        response = {}
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'], response['headers'] = status, headers
+            return written.append
+
+        def start():
+            # Run the view and produce the first chunk, by which time the status is known
+            iterable = self.wsgi_app(environ, start_response)
+            chunks = iter(iterable)
+            return iterable, chunks, next(chunks, _DONE)
+
+        try:
+            iterable, chunks, chunk = await loop.run_in_executor(executor, start)
+        except Exception:
+            logger.exception(f"Unhandled error serving {environ['REQUEST_METHOD']} {environ['PATH_INFO']}")
+            await send({'type': 'http.response.start', 'status': 500,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+            await send({'type': 'http.response.body', 'body': b'Internal Server Error'})
+            return
+
+        try:
+            status = int(response['status'].split(' ', 1)[0])
+            headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                       for name, value in response['headers']]
+            response['sent'] = True
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            for data in written:
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            while chunk is not _DONE:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(executor, next, chunks, _DONE)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(executor, close)
+
+    def close(self):
+        """Stop the thread pools and run the shutdown callbacks."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False)
+        for callback in self.on_shutdown:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error during shutdown: {str(e)}")
+
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
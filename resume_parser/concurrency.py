@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+from collections import deque
+
+
+# Seconds an upload may wait for the LLM before it is parsed by rules instead
+LLM_DEADLINE = float(os.environ.get('RESUME_LLM_DEADLINE', '45'))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a queued call could not start in time to finish before its deadline."""
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for a remote dependency, learned with AIMD.
+
+    Calls are admitted while fewer than ``limit`` are in flight; the rest wait
+    in FIFO order. After each call the limit is adjusted the way TCP adjusts
+    its window: it doubles every round trip (slow start) until the first sign
+    of overload, then grows by ``1 / limit`` per successful call whose
+    latency stays within ``latency_tolerance`` times the best latency seen
+    recently. It is multiplied by ``backoff`` on a rate-limit response or a
+    latency spike, at most once per round trip so that one burst of 429s
+    counts once.
+
+    A waiting call is shed, raising :class:`DeadlineExceeded`, as soon as the
+    expected wait plus the expected call time would overrun its deadline.
+    Callers can then take a cheaper path instead of holding the request.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=64, backoff=0.5,
+                 latency_tolerance=2.0, smoothing=0.2, recheck_interval=1.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.recheck_interval = recheck_interval
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiting = deque()
+        self._lock = threading.Lock()
+        self._latency = None       # EWMA of successful call latency
+        self._min_latency = None   # slowly decaying floor used as the "unloaded" latency
+        self._last_decrease = 0.0
+        self._slow_start = True    # grow by one per success until the first sign of overload
+
+        self._admitted = 0
+        self._completed = 0
+        self._rate_limited = 0
+        self._errors = 0
+        self._shed = 0
+        self._max_queue_depth = 0
+
+    @property
+    def limit(self):
+        return max(self.min_limit, int(self._limit))
+
+    def expected_latency(self):
+        return self._latency or 0.0
+
+    def _expected_wait(self, position):
+        """Seconds until the call at ``position`` in the queue is likely to start."""
+        if self._latency is None:
+            return 0.0
+        # During slow start the limit is still climbing, so judge by where it may get to
+        limit = self.max_limit if self._slow_start else self.limit
+        free = limit - self._in_flight
+        if position < free:
+            return 0.0
+        return ((position - free) // limit + 1) * self._latency
+
+    def _misses_deadline(self, position, deadline):
+        if deadline is None:
+            return False
+        return time.monotonic() + self._expected_wait(position) + self.expected_latency() >= deadline
+
+    def acquire(self, deadline=None):
+        """Wait for a slot, or raise DeadlineExceeded if ``deadline`` (monotonic time) would be missed."""
+        with self._lock:
+            if self._misses_deadline(len(self._waiting), deadline):
+                self._shed += 1
+                raise DeadlineExceeded("LLM queue is too long to finish before the deadline")
+            if not self._waiting and self._in_flight < self.limit:
+                return self._admit()
+
+            # One condition per waiter so a release wakes the head of the queue, not everyone
+            waiter = threading.Condition(self._lock)
+            self._waiting.append(waiter)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._waiting))
+            try:
+                while self._waiting[0] is not waiter or self._in_flight >= self.limit:
+                    if self._misses_deadline(self._waiting.index(waiter), deadline):
+                        self._shed += 1
+                        raise DeadlineExceeded("LLM queue is too long to finish before the deadline")
+                    timeout = None
+                    if deadline is not None:
+                        # Wake up now and then to re-check as the limit and latency estimates move
+                        timeout = min(self.recheck_interval,
+                                      max(0.0, deadline - self.expected_latency() - time.monotonic()))
+                    waiter.wait(timeout)
+            finally:
+                self._waiting.remove(waiter)
+                self._wake_next()
+            return self._admit()
+
+    def _admit(self):
+        self._in_flight += 1
+        self._admitted += 1
+        return time.monotonic()
+
+    def _wake_next(self):
+        if self._waiting and self._in_flight < self.limit:
+            self._waiting[0].notify()
+
+    def release(self, started, rate_limited=False, failed=False):
+        """Record the outcome of a call started at ``started`` (the value returned by acquire)."""
+        now = time.monotonic()
+        latency = now - started
+        with self._lock:
+            self._in_flight -= 1
+            if rate_limited:
+                self._rate_limited += 1
+                self._decrease(now)
+            elif failed:
+                self._errors += 1
+            else:
+                self._completed += 1
+                self._observe(latency)
+                if latency > self.latency_tolerance * self._min_latency:
+                    self._decrease(now)
+                else:
+                    step = 1.0 if self._slow_start else 1.0 / self._limit
+                    self._limit = min(self.max_limit, self._limit + step)
+            self._wake_next()
+
+    def _observe(self, latency):
+        if self._latency is None:
+            self._latency = self._min_latency = latency
+            return
+        self._latency += self.smoothing * (latency - self._latency)
+        # Let the floor drift up slowly so one lucky fast call does not pin it forever
+        self._min_latency = min(latency, self._min_latency * 1.01)
+
+    def _decrease(self, now):
+        # React once per round trip; the other calls in flight saw the same overload
+        if now - self._last_decrease < (self._latency or 0.0):
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+
+    def metrics(self):
+        """Return a snapshot of the limiter's state and counters."""
+        with self._lock:
+            attempts = self._admitted + self._shed
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'queue_depth': len(self._waiting),
+                'max_queue_depth': self._max_queue_depth,
+                'admitted': self._admitted,
+                'completed': self._completed,
+                'rate_limited': self._rate_limited,
+                'errors': self._errors,
+                'shed': self._shed,
+                'shed_rate': self._shed / attempts if attempts else 0.0,
+                'latency_ewma': self._latency,
+                'latency_floor': self._min_latency,
+            }
+
+
+# Shared by every LLM call in the process so bursts are throttled as a whole
+llm_limiter = AdaptiveLimiter(
+    initial_limit=int(os.environ.get('RESUME_LLM_CONCURRENCY', '4')),
+    max_limit=int(os.environ.get('RESUME_LLM_MAX_CONCURRENCY', '32')))
@@ -0,0 +1,421 @@
+import os
+import threading
+import logging
+from itertools import chain
+from collections.abc import Mapping, Set, KeysView, ItemsView, ValuesView
+
+from resume_parser.query import ResumeFacts, QueryIndex, RangeIndex, RANGE_ATTRIBUTES
+from resume_parser.storage import RECORD_SUFFIXES, read_record
+
+logger = logging.getLogger(__name__)
+
+ADDED = "added"
+UPDATED = "updated"
+REMOVED = "removed"
+
+
+# Shards of the snapshot's maps; a batch copies only the shards its events touch
+MAP_SHARDS = 256
+# Skill postings are plain frozensets until they reach this size, then sharded as well
+POSTING_SHARD_MIN = 1024
+POSTING_SHARDS = 64
+
+
+def load_record(path):
+    """Load one stored resume record from disk."""
+    return read_record(path)
+
+
+class ShardedMap(Mapping):
+    """Immutable mapping split by key hash into shards.
+
+    :meth:`evolve` returns a builder that copies a shard the first time a
+    change touches it and shares the others with this map, so publishing a
+    snapshot after a small batch costs the touched shards, not the corpus.
+    """
+
+    __slots__ = ('_shards', '_len')
+
+    def __init__(self, items=(), shards=MAP_SHARDS):
+        built = [{} for _ in range(shards)]
+        for key, value in dict(items).items():
+            built[hash(key) % shards][key] = value
+        self._shards = tuple(built)
+        self._len = sum(len(shard) for shard in built)
+
+    def __getitem__(self, key):
+        return self._shards[hash(key) % len(self._shards)][key]
+
+    def get(self, key, default=None):
+        return self._shards[hash(key) % len(self._shards)].get(key, default)
+
+    def __contains__(self, key):
+        return key in self._shards[hash(key) % len(self._shards)]
+
+    def __iter__(self):
+        return chain.from_iterable(self._shards)
+
+    def __len__(self):
+        return self._len
+
+    def keys(self):
+        return _ShardedKeys(self)
+
+    def items(self):
+        return _ShardedItems(self)
+
+    def values(self):
+        return _ShardedValues(self)
+
+    def evolve(self):
+        return _MapBuilder(self)
+
+
+class _ShardedKeys(KeysView):
+    def __iter__(self):
+        return chain.from_iterable(self._mapping._shards)
+
+
+class _ShardedItems(ItemsView):
+    def __iter__(self):
+        return chain.from_iterable(shard.items() for shard in self._mapping._shards)
+
+
+class _ShardedValues(ValuesView):
+    def __iter__(self):
+        return chain.from_iterable(shard.values() for shard in self._mapping._shards)
+
+
+class _MapBuilder:
+    """Copy-on-write changes to a :class:`ShardedMap`; :meth:`freeze` returns the new map."""
+
+    def __init__(self, base):
+        self._shards = list(base._shards)
+        self._copied = set()
+        self._len = base._len
+
+    def _shard(self, key, write=False):
+        index = hash(key) % len(self._shards)
+        if write and index not in self._copied:
+            self._shards[index] = dict(self._shards[index])
+            self._copied.add(index)
+        return self._shards[index]
+
+    def __getitem__(self, key):
+        return self._shard(key)[key]
+
+    def get(self, key, default=None):
+        return self._shard(key).get(key, default)
+
+    def __contains__(self, key):
+        return key in self._shard(key)
+
+    def __setitem__(self, key, value):
+        shard = self._shard(key, write=True)
+        self._len += key not in shard
+        shard[key] = value
+
+    def pop(self, key, *default):
+        if key not in self._shard(key):
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self._len -= 1
+        return self._shard(key, write=True).pop(key)
+
+    def freeze(self):
+        frozen = ShardedMap.__new__(ShardedMap)
+        frozen._shards = tuple(self._shards)
+        frozen._len = self._len
+        return frozen
+
+
+class ShardedSet(Set):
+    """Immutable set of resume ids split into frozenset shards, for skills many resumes list.
+
+    :meth:`changed` builds the set with some ids added and removed by
+    copying only the shards those ids fall in.
+    """
+
+    __slots__ = ('_shards', '_len')
+
+    def __init__(self, ids=(), shards=POSTING_SHARDS):
+        built = [set() for _ in range(shards)]
+        for resume_id in ids:
+            built[hash(resume_id) % shards].add(resume_id)
+        self._shards = tuple(frozenset(shard) for shard in built)
+        self._len = sum(len(shard) for shard in built)
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # Results of set operations are ordinary sets
+        return frozenset(iterable)
+
+    def __contains__(self, resume_id):
+        return resume_id in self._shards[hash(resume_id) % len(self._shards)]
+
+    def __iter__(self):
+        return chain.from_iterable(self._shards)
+
+    def __len__(self):
+        return self._len
+
+    def changed(self, added, removed):
+        shards = list(self._shards)
+        touched = {}
+        for resume_id in chain(added, removed):
+            index = hash(resume_id) % len(shards)
+            if index not in touched:
+                touched[index] = set(shards[index])
+        for resume_id in removed:
+            touched[hash(resume_id) % len(shards)].discard(resume_id)
+        for resume_id in added:
+            touched[hash(resume_id) % len(shards)].add(resume_id)
+        for index, shard in touched.items():
+            shards[index] = frozenset(shard)
+        result = ShardedSet.__new__(ShardedSet)
+        result._shards = tuple(shards)
+        result._len = sum(len(shard) for shard in shards)
+        return result
+
+
+def _changed_posting(ids, added, removed):
+    """Return the posting ``ids`` with ``added`` and ``removed`` applied, or None if it ends up empty."""
+    if isinstance(ids, ShardedSet):
+        ids = ids.changed(added, removed)
+        if len(ids) < POSTING_SHARD_MIN // 2:
+            ids = frozenset(ids)
+    else:
+        ids = (set(ids) - removed) | added
+        ids = ShardedSet(ids) if len(ids) >= POSTING_SHARD_MIN else frozenset(ids)
+    return ids or None
+
+
+def _changed_range(index, touched):
+    """Return a :class:`RangeIndex` with ``touched`` (value -> (added, removed)) applied to ``index``.
+
+    Only the touched values' postings are rebuilt; re-sorting covers the
+    distinct values, not the resumes.
+    """
+    postings = dict(index.postings)
+    missing = index.missing
+    for value, (added, removed) in touched.items():
+        if value is None:
+            missing = _changed_posting(missing, added, removed) or frozenset()
+            continue
+        ids = _changed_posting(postings.get(value, frozenset()), added, removed)
+        if ids:
+            postings[value] = ids
+        else:
+            postings.pop(value, None)
+    return RangeIndex(postings, missing)
+
+
+class CorpusSnapshot:
+    """Immutable view of the corpus.
+
+    A query holds on to one snapshot for its whole lifetime, so files that are
+    added or removed while it runs never show up half-applied. Snapshots are
+    never mutated after they are published; updates build a new one.
+    """
+
+    def __init__(self, records=None, skill_index=None, skill_counts=None, year_counts=None, generation=0,
+                 facts=None, ranges=None):
+        self.records = records if records is not None else ShardedMap()
+        self.facts = facts if facts is not None else ShardedMap()
+        # Year and GPA range indexes, maintained per batch like the skill index
+        self.ranges = ranges if ranges is not None else {attribute: RangeIndex() for attribute in RANGE_ATTRIBUTES}
+        self._query_index = None
+        self.skill_index = skill_index if skill_index is not None else ShardedMap()
+        self.skill_counts = skill_counts if skill_counts is not None else ShardedMap()
+        self.year_counts = year_counts if year_counts is not None else ShardedMap()
+        self.generation = generation
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, resume_id):
+        return self.records.get(resume_id)
+
+    def ids_with_skill(self, skill):
+        """Return the ids of resumes listing ``skill`` (case-insensitive)."""
+        return self.skill_index.get(skill.lower(), frozenset())
+
+    def query_index(self):
+        """Return a :class:`QueryIndex` over this snapshot, built on first use."""
+        if self._query_index is None:
+            self._query_index = QueryIndex(self.facts, self.skill_index, self.ranges)
+        return self._query_index
+
+    def skills(self):
+        """Return every skill present in the corpus."""
+        return list(self.skill_counts)
+
+    def graduation_years(self):
+        """Return degree graduation years present in the corpus, newest first."""
+        return sorted(self.year_counts, reverse=True)
+
+
+class ResumeCorpus:
+    """In-memory store of parsed resumes kept current by incremental events.
+
+    Events are ``(kind, resume_id)`` tuples where ``kind`` is one of
+    ``ADDED``, ``UPDATED`` or ``REMOVED`` and ``resume_id`` is the file name
+    inside ``data_dir``. Each batch of events produces a new
+    :class:`CorpusSnapshot`, which shares every shard of its maps that the
+    batch did not touch with the previous one; listeners registered with :meth:`subscribe` are
+    then called with ``(kind, resume_id, record)`` so other indexes can follow
+    along without rescanning the directory.
+    """
+
+    def __init__(self, data_dir, suffixes=RECORD_SUFFIXES):
+        self.data_dir = data_dir
+        self.suffixes = tuple(suffixes)
+        self._snapshot = CorpusSnapshot()
+        self._listeners = []
+        self._batch_listeners = []
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """Return the current consistent snapshot."""
+        return self._snapshot
+
+    def subscribe(self, listener):
+        """Register ``listener(kind, resume_id, record)`` for corpus changes."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def subscribe_batches(self, listener):
+        """Register ``listener(events)`` called once per applied batch with its ``(kind, resume_id)`` events."""
+        with self._lock:
+            self._batch_listeners.append(listener)
+
+    def load(self):
+        """Load every record currently in ``data_dir``."""
+        try:
+            names = [name for name in os.listdir(self.data_dir) if name.endswith(self.suffixes)]
+        except FileNotFoundError:
+            names = []
+        self.apply([(ADDED, name) for name in names])
+        logger.info(f"Loaded {len(self._snapshot)} resumes from {self.data_dir}")
+
+    def apply(self, events):
+        """Apply a batch of change events and publish a new snapshot."""
+        if not events:
+            return
+
+        with self._lock:
+            current = self._snapshot
+            records = current.records.evolve()
+            facts = current.facts.evolve()
+            skill_index = current.skill_index.evolve()
+            skill_counts = current.skill_counts.evolve()
+            year_counts = current.year_counts.evolve()
+            # skill -> (ids added, ids removed), applied to the postings once per batch
+            touched_skills = {}
+            # attribute -> value (None if missing) -> (ids added, ids removed), for the range indexes
+            touched_ranges = {attribute: {} for attribute in RANGE_ATTRIBUTES}
+            applied = []
+
+            for kind, resume_id in events:
+                previous = records.get(resume_id)
+                record = None
+
+                if kind != REMOVED:
+                    try:
+                        record = load_record(os.path.join(self.data_dir, resume_id))
+                    except FileNotFoundError:
+                        kind = REMOVED
+                    except Exception as e:
+                        logger.error(f"Error loading {resume_id}: {str(e)}")
+                        continue
+
+                if previous is None and record is None:
+                    continue
+
+                if previous is not None:
+                    self._unindex(resume_id, previous, facts.pop(resume_id), skill_index, touched_skills,
+                                  touched_ranges, skill_counts, year_counts)
+                    records.pop(resume_id)
+
+                if record is not None:
+                    records[resume_id] = record
+                    facts[resume_id] = ResumeFacts.from_record(record)
+                    self._index(resume_id, record, facts[resume_id], skill_index, touched_skills,
+                                touched_ranges, skill_counts, year_counts)
+                    kind = UPDATED if previous is not None else ADDED
+
+                applied.append((kind, resume_id, record))
+
+            for key, (added, removed) in touched_skills.items():
+                ids = _changed_posting(skill_index.get(key, frozenset()), added, removed)
+                if ids:
+                    skill_index[key] = ids
+                else:
+                    skill_index.pop(key, None)
+
+            ranges = {attribute: _changed_range(current.ranges[attribute], touched) if touched
+                      else current.ranges[attribute]
+                      for attribute, touched in touched_ranges.items()}
+
+            self._snapshot = CorpusSnapshot(records.freeze(), skill_index.freeze(), skill_counts.freeze(),
+                                            year_counts.freeze(), current.generation + 1, facts.freeze(), ranges)
+
+            for kind, resume_id, record in applied:
+                for listener in self._listeners:
+                    try:
+                        listener(kind, resume_id, record)
+                    except Exception as e:
+                        logger.error(f"Corpus listener failed on {kind} {resume_id}: {str(e)}")
+
+            if applied:
+                events = [(kind, resume_id) for kind, resume_id, _ in applied]
+                for listener in self._batch_listeners:
+                    try:
+                        listener(events)
+                    except Exception as e:
+                        logger.error(f"Corpus batch listener failed: {str(e)}")
+
+    def _index(self, resume_id, record, facts, skill_index, touched_skills, touched_ranges, skill_counts,
+               year_counts):
+        skills = (record.get('parsed_data') or {}).get('skills', [])
+        for skill in set(skills):
+            added, removed = touched_skills.setdefault(skill.lower(), (set(), set()))
+            added.add(resume_id)
+            removed.discard(resume_id)
+            _count(skill_counts, skill, 1)
+
+        for attribute, touched in touched_ranges.items():
+            added, removed = touched.setdefault(getattr(facts, attribute), (set(), set()))
+            added.add(resume_id)
+            removed.discard(resume_id)
+
+        if facts.year is not None:
+            _count(year_counts, str(facts.year), 1)
+
+    def _unindex(self, resume_id, record, facts, skill_index, touched_skills, touched_ranges, skill_counts,
+                 year_counts):
+        skills = (record.get('parsed_data') or {}).get('skills', [])
+        for skill in set(skills):
+            added, removed = touched_skills.setdefault(skill.lower(), (set(), set()))
+            # An id re-added later in the same batch stays in the posting
+            removed.add(resume_id)
+            added.discard(resume_id)
+            _count(skill_counts, skill, -1)
+
+        for attribute, touched in touched_ranges.items():
+            added, removed = touched.setdefault(getattr(facts, attribute), (set(), set()))
+            removed.add(resume_id)
+            added.discard(resume_id)
+
+        if facts.year is not None:
+            _count(year_counts, str(facts.year), -1)
+
+
+def _count(counts, key, delta):
+    """Adjust a count in a map builder, dropping keys that reach zero."""
+    count = counts.get(key, 0) + delta
+    if count > 0:
+        counts[key] = count
+    else:
+        counts.pop(key, None)
@@ -0,0 +1,132 @@
+import re
+import zlib
+import threading
+
+import numpy as np
+
+from resume_parser.corpus import REMOVED
+
+# Mersenne prime used for the universal hash family; shingle hashes are reduced
+# below it so (a * x + b) never overflows 64 bits
+_PRIME = (1 << 31) - 1
+
+
+def shingles(text, k=5):
+    """Return the set of hashed ``k``-word shingles of ``text``."""
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= k:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = (" ".join(words[i:i + k]) for i in range(len(words) - k + 1))
+    return {zlib.crc32(gram.encode('utf-8')) % _PRIME for gram in grams}
+
+
+class MinHashLSH:
+    """MinHash signatures with a banded locality-sensitive hash index.
+
+    A signature of ``num_perm`` minimums is split into ``bands`` bands; two
+    resumes become candidates when any band hashes identically, which for 16
+    bands of 8 rows happens with high probability above ~0.7 Jaccard
+    similarity. Candidates are then confirmed against ``threshold`` using the
+    estimated similarity, so a lookup only touches the few resumes sharing a
+    bucket rather than the whole corpus.
+
+    Texts shorter than ``min_words`` get no signature: an empty or nearly
+    empty extraction (a scanned PDF without OCR, say) says nothing about
+    which resume it came from, and would otherwise match every other one.
+    A stored parse is only worth reusing when the texts are practically the
+    same, so ``reuse_threshold`` is much stricter than ``threshold``.
+    """
+
+    def __init__(self, num_perm=128, bands=16, threshold=0.8, seed=1, min_words=20, reuse_threshold=0.99):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_words = min_words
+        self.reuse_threshold = reuse_threshold
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = {}
+        self._canonical = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, text):
+        """Compute the MinHash signature of ``text`` as a list of ints, or None if it is too short to tell."""
+        if len(re.findall(r'\w+', text or '')) < self.min_words:
+            return None
+        hashes = np.fromiter(shingles(text), dtype=np.uint64)
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return values.min(axis=1).tolist()
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash(tuple(signature[i * rows:(i + 1) * rows])) for i in range(self.bands)]
+
+    def similarity(self, sig_a, sig_b):
+        """Estimate the Jaccard similarity of two signatures."""
+        return float(np.mean(np.asarray(sig_a) == np.asarray(sig_b)))
+
+    def query(self, signature):
+        """Return ``(key, similarity)`` of the closest indexed near-duplicate, or None."""
+        best = None
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            for candidate in candidates:
+                score = self.similarity(signature, self._signatures[candidate])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (candidate, score)
+        return best
+
+    def canonical(self, key):
+        """Return the first-seen resume of the duplicate cluster ``key`` belongs to."""
+        return self._canonical.get(key, key)
+
+    def insert(self, key, signature, duplicate_of=None):
+        with self._lock:
+            self._remove(key)
+            self._signatures[key] = signature
+            if duplicate_of and duplicate_of != key:
+                self._canonical[key] = self._canonical.get(duplicate_of, duplicate_of)
+            for band, band_key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        signature = self._signatures.pop(key, None)
+        self._canonical.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def find_duplicate(self, signature):
+        """Return the canonical key of a near-duplicate of ``signature``, or None."""
+        match = self.query(signature) if signature is not None else None
+        return self.canonical(match[0]) if match else None
+
+    def corpus_listener(self, kind, resume_id, record):
+        """Keep the index in sync with a :class:`ResumeCorpus`."""
+        if kind == REMOVED:
+            self.remove(resume_id)
+            return
+        raw = record.get('raw_parsed_data') or {}
+        signature = raw.get('minhash_signature')
+        if signature and len(signature) == self.num_perm:
+            self.insert(resume_id, signature, raw.get('duplicate_of'))
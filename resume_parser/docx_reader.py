@@ -0,0 +1,119 @@
+import io
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+
+_P = W + 'p'
+_T = W + 't'
+_TAB = W + 'tab'
+_BR = W + 'br'
+_CR = W + 'cr'
+_TR = W + 'tr'
+_TC = W + 'tc'
+_FALLBACK = MC + 'Fallback'
+
+# Run-level elements and the text they contribute (w:t carries its own text)
+_RUN_TEXT = {_T: '', _TAB: '\t', _BR: '\n', _CR: '\n'}
+
+_PART_NUMBER = re.compile(r'(\d+)\.xml$')
+
+
+def _part_order(name):
+    match = _PART_NUMBER.search(name)
+    return int(match.group(1)) if match else 0
+
+
+def iter_part_blocks(stream):
+    """Yield the text blocks of one WordprocessingML part in document order.
+
+    Paragraphs are yielded as they close; table rows are yielded as a single
+    block with cells separated by " | ". Text boxes are included in the
+    paragraph they are anchored to, and the VML fallback copy of each text
+    box is skipped so its text is not repeated. Elements are cleared and
+    detached as soon as they have been read, so memory stays flat however
+    long the part is.
+    """
+    blocks = []  # (tag, parts) for each open paragraph, table row and table cell
+    stack = []
+    fallback_depth = 0
+
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+
+        if event == 'start':
+            stack.append(elem)
+            if tag == _FALLBACK:
+                fallback_depth += 1
+            elif not fallback_depth and tag in (_P, _TR, _TC):
+                blocks.append((tag, []))
+            continue
+
+        stack.pop()
+        if tag == _FALLBACK:
+            fallback_depth -= 1
+        elif fallback_depth:
+            pass
+        elif tag in _RUN_TEXT:
+            if blocks and blocks[-1][0] == _P:
+                blocks[-1][1].append(elem.text or '' if tag == _T else _RUN_TEXT[tag])
+        elif tag in (_P, _TR, _TC):
+            _, parts = blocks.pop()
+            if tag == _P:
+                text = ''.join(parts).strip()
+            elif tag == _TC:
+                text = ' '.join(parts)
+            else:
+                text = ' | '.join(part for part in parts if part)
+
+            if tag == _TC:
+                # Keep empty cells so the row can drop them
+                if blocks:
+                    blocks[-1][1].append(text)
+            elif text:
+                if not blocks:
+                    yield text
+                elif blocks[-1][0] == _P:
+                    # Text box inside a paragraph
+                    blocks[-1][1].append('\n' + text)
+                else:
+                    blocks[-1][1].append(text)
+
+        elem.clear()
+        if stack:
+            # Detach finished elements so the tree never grows
+            stack[-1].remove(elem)
+
+
+def iter_docx_blocks(source):
+    """Yield text blocks of a DOCX file: headers, then the body, then footers.
+
+    Args:
+        source: Path to the file, its contents as bytes, or a binary file-like object
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        headers = sorted((n for n in names if re.match(r'word/header\d*\.xml$', n)), key=_part_order)
+        footers = sorted((n for n in names if re.match(r'word/footer\d*\.xml$', n)), key=_part_order)
+
+        seen = set()
+        for name in headers + ['word/document.xml'] + footers:
+            if name not in names:
+                continue
+            with archive.open(name) as part:
+                for block in iter_part_blocks(part):
+                    # Different section headers often repeat the same text
+                    if name != 'word/document.xml':
+                        if block in seen:
+                            continue
+                        seen.add(block)
+                    yield block
+
+
+def extract_docx_text(source):
+    """Extract the text of a DOCX file, one block per line."""
+    return '\n'.join(iter_docx_blocks(source))
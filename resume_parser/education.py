@@ -0,0 +1,140 @@
+"""Education level classification with a compiled, word-bounded keyword matcher.
+
+Every education entry, from the LLM or the rule-based parser, is labelled
+``degree``, ``secondary`` (12th, intermediate, pre-university, A-levels) or
+``high_school`` (10th, matriculation, GCSEs). All keywords are compiled
+once into a single regular expression that only matches whole words, so
+"it" no longer matches inside "little" or "x" inside "Phoenix", and
+abbreviations that are also English words (BE, IT, UG, X) only match when
+written in capitals.
+
+The longest keyword starting at a word is preferred, so "junior college"
+or "pre-university" is read as one secondary-level phrase rather than as
+"college" or "university". When an entry mentions several levels, the
+first rule in ``RULES`` that matched decides: an explicit degree name, then
+secondary, then high school, and only then subject or institution words
+such as "engineering" or "university".
+"""
+import re
+import functools
+
+DEGREE = 'degree'
+SECONDARY = 'secondary'
+HIGH_SCHOOL = 'high_school'
+
+# Degree names: decide the level whatever else the entry mentions
+DEGREE_KEYWORDS = [
+    "bachelor", "bachelors", "bachelor's", "b.tech", "btech", "b. tech", "b tech", "b.e.", "b.e",
+    "undergraduate", "b.sc", "b.sc.", "bsc", "b.com", "bcom", "bca", "b.a.", "bba",
+    "master of", "master's", "masters", "master in", "m.tech", "mtech", "m.e.", "m.sc", "m.sc.", "msc",
+    "m.a.", "mca", "mba", "postgraduate", "post graduate", "ph.d", "ph.d.", "phd", "doctorate", "doctor of philosophy",
+]
+SECONDARY_KEYWORDS = [
+    "senior secondary", "12th", "12 th", "class 12", "class xii", "grade 12", "higher secondary",
+    "intermediate", "junior college", "pre-university", "pre university", "hsc", "higher school certificate",
+    "10+2", "a-levels", "a-level", "a levels",
+]
+HIGH_SCHOOL_KEYWORDS = [
+    "secondary", "high school", "10th", "10 th", "class 10", "class x", "grade 10", "ssc", "matriculation",
+    "matric", "gcse", "gcses", "o-levels", "o-level", "o levels",
+]
+# Subjects and institutions: only say "degree" when nothing more specific matched
+DEGREE_FIELD_KEYWORDS = [
+    "engineering", "computer science", "cse", "information technology", "electrical", "mechanical", "civil",
+    "electronics", "college", "university", "degree",
+]
+# Abbreviations that are also ordinary words, matched only as written here
+CASED_KEYWORDS = {
+    DEGREE: ["BE", "UG", "PG", "BA"],
+    SECONDARY: ["XII"],
+    HIGH_SCHOOL: ["X"],
+    'field': ["IT"],
+}
+
+RULES = (
+    (DEGREE, DEGREE_KEYWORDS, CASED_KEYWORDS[DEGREE]),
+    (SECONDARY, SECONDARY_KEYWORDS, CASED_KEYWORDS[SECONDARY]),
+    (HIGH_SCHOOL, HIGH_SCHOOL_KEYWORDS, CASED_KEYWORDS[HIGH_SCHOOL]),
+    (DEGREE, DEGREE_FIELD_KEYWORDS, CASED_KEYWORDS['field']),
+)
+
+
+def _trie_pattern(keywords):
+    """Alternation of ``keywords`` factored by common prefix, so the regex engine
+    walks each keyword's characters once instead of trying every keyword in turn."""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in ' '.join(keyword.split()):
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node):
+        # Any run of whitespace stands for a space; "b. tech" also matches "b.  tech"
+        branches = [(r'\s+' if char == ' ' else re.escape(char)) + render(child)
+                    for char, child in node.items() if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # The optional tail is greedy, so the longest keyword is preferred
+        return f'(?:{body})?' if '' in node else body
+
+    return render(trie)
+
+
+class EducationClassifier:
+    """Classify education entries by level with one compiled pattern.
+
+    Build it once (``education_classifier`` is shared by the parsers) and
+    call :meth:`classify` per entry or :meth:`classify_many` for a batch.
+    The same degree names recur across a corpus, so the last ``cache_size``
+    distinct texts are remembered.
+    """
+
+    def __init__(self, rules=RULES, cache_size=4096):
+        self._levels = [level for level, _, _ in rules]
+        groups = []
+        first_chars = set()
+        for rank, (level, keywords, cased) in enumerate(rules):
+            keywords = [keyword.lower() for keyword in keywords]
+            first_chars.update(keyword[0] for keyword in keywords + [keyword.lower() for keyword in cased])
+            parts = [_trie_pattern(keywords)]
+            if cased:
+                parts.append(f'(?-i:{_trie_pattern(cased)})')
+            groups.append(f'(?P<r{rank}>' + '|'.join(parts) + ')')
+        # The lookahead lets the engine skip positions no keyword can start at
+        self._pattern = re.compile(
+            '(?=[' + ''.join(re.escape(char) for char in sorted(first_chars)) + r'])(?<!\w)(?:'
+            + '|'.join(groups) + r')(?!\w)', re.IGNORECASE)
+        if cache_size:
+            self.classify = functools.lru_cache(maxsize=cache_size)(self.classify)
+
+    def classify(self, text):
+        """Return 'degree', 'secondary', 'high_school' or None for a degree or institution name."""
+        if not text:
+            return None
+        best = None
+        for match in self._pattern.finditer(text):
+            rank = int(match.lastgroup[1:])
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return None if best is None else self._levels[best]
+
+    def classify_many(self, texts):
+        """Classify a batch of texts; repeated texts are only matched once."""
+        levels = {}
+        result = []
+        for text in texts:
+            if text not in levels:
+                levels[text] = self.classify(text)
+            result.append(levels[text])
+        return result
+
+    def mentions_education(self, text):
+        """Whether ``text`` contains any education keyword at all."""
+        return bool(text) and self._pattern.search(text) is not None
+
+
+education_classifier = EducationClassifier()
@@ -0,0 +1,416 @@
+import os
+import re
+import zlib
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+
+import numpy as np
+
+from resume_parser.corpus import REMOVED
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.]*')
+
+
+def resume_embedding_text(record):
+    """Return the text that represents a stored record for semantic matching."""
+    raw = record.get('raw_parsed_data') or {}
+    parts = [", ".join(str(skill) for skill in raw.get('skills', []) or [])]
+    for exp in raw.get('experience', []) or []:
+        if isinstance(exp, dict):
+            parts.extend(str(exp.get(key) or '') for key in ('position', 'description'))
+    return "\n".join(part for part in parts if part)
+
+
+def text_fingerprint(text):
+    """Short digest of a resume's embedding text, stored next to its vector."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class HashingEmbedder:
+    """Dependency-free embedder using the hashing trick.
+
+    Each phrase contributes its words, character trigrams of each word (so
+    "postgres" lands close to "postgresql") and the acronym of multi-word
+    phrases (so "Machine Learning" also emits "ml").
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def _features(self, text):
+        for phrase in re.split(r'[,;\n|/•]', text.lower()):
+            words = WORD_PATTERN.findall(phrase)
+            if not words:
+                continue
+            if len(words) > 1:
+                yield "w:" + "".join(word[0] for word in words), 1.0
+            for word in words:
+                word = word.rstrip('.')
+                yield "w:" + word, 1.0
+                padded = f"<{word}>"
+                for i in range(len(padded) - 2):
+                    yield "g:" + padded[i:i + 3], 0.5
+
+    def embed(self, texts):
+        """Return an (n, dim) float32 matrix of L2-normalised vectors."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text or ""):
+                h = zlib.crc32(feature.encode('utf-8'))
+                # The top bit picks the sign so collisions tend to cancel out
+                vectors[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """Embedder backed by a small local sentence-transformers model on CPU."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers/{model_name}"
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=32, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def get_embedder(model_name=None):
+    """Return a local model embedder if requested and installed, else the hashing embedder."""
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except ImportError:
+            logger.error("sentence-transformers not installed. Install with: pip install sentence-transformers")
+        except Exception as e:
+            logger.error(f"Error loading embedding model {model_name}: {e}")
+    return HashingEmbedder()
+
+
+class VectorStore:
+    """Memory-mapped float32 matrix of resume vectors.
+
+    Rows live in ``vectors.f32`` inside ``directory``; ``ids.log`` is an
+    append-only log mapping ids to rows and to the fingerprint of the text
+    each vector was made from. Removed rows are zeroed and reused. Queries
+    use batched NumPy dot products (vectors are normalised, so this is
+    cosine similarity); when ``hnswlib`` is installed and the store grows
+    past ``ann_threshold`` rows an approximate index is used instead.
+
+    Several worker processes can share one directory. Writers take an
+    exclusive ``flock`` on ``lock``, replay what other processes appended
+    to the log, then pick a row, write the vector and append one log line.
+    Readers replay new log lines before each lookup, so every process sees
+    the same rows. Without ``fcntl`` (Windows) only one process may use a
+    directory.
+    """
+
+    def __init__(self, directory, dim, embedder_name="", ann_threshold=50000, batch_size=16384):
+        self.directory = directory
+        self.dim = dim
+        self.ann_threshold = ann_threshold
+        self.batch_size = batch_size
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._log_path = os.path.join(directory, "ids.log")
+        self._row_of = {}
+        self._id_of = {}
+        self._fingerprint_of = {}
+        self._free_rows = set()
+        self._size = 0
+        self._log_offset = 0
+        self._matrix = None
+        self._ann = None
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, "lock"), 'a+b')
+        with self._exclusive():
+            self._check_embedder(embedder_name)
+            self._open()
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold this process's lock and, where available, the directory's lock shared with other processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _check_embedder(self, embedder_name):
+        # Vectors from different embedders are not comparable, so start over if it changed
+        meta_path = os.path.join(self.directory, "embedder")
+        # v2: log lines carry text fingerprints
+        expected = f"{embedder_name}:{self.dim}:v2"
+        current = None
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                current = f.read().strip()
+        if current != expected:
+            for path in (self._vectors_path, self._log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                f.write(expected)
+
+    def _open(self):
+        self._log = open(self._log_path, 'ab', buffering=0)
+        self._replay()
+        capacity = max(1024, self._size)
+        if os.path.exists(self._vectors_path):
+            capacity = max(capacity, os.path.getsize(self._vectors_path) // (4 * self.dim))
+        self._map(capacity)
+
+    def _replay(self):
+        """Apply log lines appended since the last replay, by this or any other process."""
+        try:
+            if os.path.getsize(self._log_path) <= self._log_offset:
+                return
+        except FileNotFoundError:
+            return
+        with open(self._log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # A line still being appended by another process is picked up next time
+        data = data[:data.rfind(b'\n') + 1]
+        self._log_offset += len(data)
+        changed = []
+        for line in data.decode('utf-8').splitlines():
+            op, row, fingerprint, resume_id = line.split('\t', 3)
+            row = int(row)
+            if op == '+':
+                previous = self._row_of.get(resume_id)
+                if previous is not None and previous != row:
+                    del self._id_of[previous]
+                    self._free_rows.add(previous)
+                self._row_of[resume_id] = row
+                self._id_of[row] = resume_id
+                self._fingerprint_of[resume_id] = fingerprint
+                self._free_rows.discard(row)
+                self._free_rows.update(range(self._size, row))
+                self._size = max(self._size, row + 1)
+                changed.append((op, row))
+            elif self._row_of.get(resume_id) == row:
+                del self._row_of[resume_id]
+                del self._id_of[row]
+                del self._fingerprint_of[resume_id]
+                self._free_rows.add(row)
+                changed.append((op, row))
+
+        if self._matrix is not None and self._size > self._matrix.shape[0]:
+            # Another process grew the file
+            self._map(os.path.getsize(self._vectors_path) // (4 * self.dim))
+        if self._ann is not None:
+            for op, row in changed:
+                if op == '+':
+                    self._ann_add(row)
+                elif row not in self._id_of:
+                    self._ann.mark_deleted(row)
+
+    def _append(self, op, row, fingerprint, resume_id):
+        # One write on an O_APPEND file, so lines from several processes never interleave
+        self._log.write(f"{op}\t{row}\t{fingerprint}\t{resume_id}\n".encode('utf-8'))
+
+    def _map(self, capacity):
+        mode = 'r+' if os.path.exists(self._vectors_path) else 'w+'
+        if mode == 'r+' and os.path.getsize(self._vectors_path) < capacity * self.dim * 4:
+            with open(self._vectors_path, 'r+b') as f:
+                f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+
+    def __len__(self):
+        with self._lock:
+            self._replay()
+            return len(self._row_of)
+
+    def __contains__(self, resume_id):
+        with self._lock:
+            self._replay()
+            return resume_id in self._row_of
+
+    def ids(self):
+        with self._lock:
+            self._replay()
+            return list(self._row_of)
+
+    def fingerprint(self, resume_id):
+        """Fingerprint stored with ``resume_id``'s vector, or None if it has none."""
+        with self._lock:
+            self._replay()
+            return self._fingerprint_of.get(resume_id)
+
+    def get(self, resume_id):
+        with self._lock:
+            self._replay()
+            row = self._row_of.get(resume_id)
+            return None if row is None else np.array(self._matrix[row])
+
+    def put(self, resume_id, vector, fingerprint='-'):
+        """Store or replace the vector for ``resume_id``; skipped if it already has ``fingerprint``."""
+        with self._exclusive():
+            self._replay()
+            if fingerprint != '-' and self._fingerprint_of.get(resume_id) == fingerprint:
+                # Another worker embedded the same text first
+                return
+            row = self._row_of.get(resume_id)
+            if row is None:
+                row = min(self._free_rows) if self._free_rows else self._size
+                if row >= self._matrix.shape[0]:
+                    self._matrix.flush()
+                    self._map(self._matrix.shape[0] * 2)
+            self._matrix[row] = vector
+            # The vector is in the shared mapping before the line that points other processes at it
+            self._append('+', row, fingerprint, resume_id)
+            self._replay()
+
+    def remove(self, resume_id):
+        with self._exclusive():
+            self._replay()
+            row = self._row_of.get(resume_id)
+            if row is None:
+                return
+            self._matrix[row] = 0
+            self._append('-', row, self._fingerprint_of[resume_id], resume_id)
+            self._replay()
+
+    def flush(self):
+        with self._lock:
+            self._matrix.flush()
+
+    def _ann_add(self, row):
+        # Keep the approximate index current instead of rebuilding it
+        if self._ann.get_current_count() >= self._ann.get_max_elements():
+            self._ann.resize_index(self._ann.get_max_elements() * 2)
+        vector = np.asarray(self._matrix[row], dtype=np.float32).reshape(1, -1)
+        try:
+            self._ann.add_items(vector, [row])
+        except RuntimeError:
+            # A reused row whose earlier resume was marked deleted
+            self._ann.unmark_deleted(row)
+            self._ann.add_items(vector, [row])
+
+    def _ann_index(self):
+        if self._ann is not None:
+            return self._ann
+        try:
+            import hnswlib
+        except ImportError:
+            return None
+        rows = np.fromiter(self._id_of.keys(), dtype=np.int64)
+        index = hnswlib.Index(space='ip', dim=self.dim)
+        index.init_index(max_elements=max(len(rows), self._size) * 2, ef_construction=200, M=16)
+        index.add_items(self._matrix[rows], rows)
+        index.set_ef(64)
+        self._ann = index
+        return index
+
+    def search(self, query_vector, k=10, exclude=()):
+        """Return the ``k`` most similar ``(resume_id, similarity)`` pairs."""
+        query_vector = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        exclude = set(exclude)
+
+        with self._lock:
+            self._replay()
+            if not self._row_of:
+                return []
+
+            if len(self._row_of) >= self.ann_threshold:
+                index = self._ann_index()
+                if index is not None:
+                    count = min(len(self._row_of), k + len(exclude))
+                    labels, distances = index.knn_query(query_vector, k=count)
+                    results = [(self._id_of[int(row)], float(1 - distance))
+                               for row, distance in zip(labels[0], distances[0])]
+                    return [item for item in results if item[0] not in exclude][:k]
+
+            best_scores = np.empty(0, dtype=np.float32)
+            best_rows = np.empty(0, dtype=np.int64)
+            wanted = k + len(exclude)
+            # Free rows are zeroed, and a zero score beats the negative ones hashed vectors can have
+            free = np.fromiter(self._free_rows, dtype=np.int64, count=len(self._free_rows))
+            for start in range(0, self._size, self.batch_size):
+                end = min(start + self.batch_size, self._size)
+                block = self._matrix[start:end]
+                scores = block @ query_vector
+                free_in_block = free[(free >= start) & (free < end)] - start
+                if len(free_in_block):
+                    scores[free_in_block] = -np.inf
+                if len(scores) > wanted:
+                    top = np.argpartition(-scores, wanted)[:wanted]
+                else:
+                    top = np.arange(len(scores))
+                best_scores = np.concatenate([best_scores, scores[top]])
+                best_rows = np.concatenate([best_rows, top + start])
+                if len(best_scores) > wanted:
+                    keep = np.argpartition(-best_scores, wanted)[:wanted]
+                    best_scores, best_rows = best_scores[keep], best_rows[keep]
+
+            live = np.isfinite(best_scores)
+            best_scores, best_rows = best_scores[live], best_rows[live]
+            order = np.argsort(-best_scores)
+            results = []
+            for i in order:
+                resume_id = self._id_of.get(int(best_rows[i]))
+                if resume_id is None or resume_id in exclude:
+                    continue
+                results.append((resume_id, float(best_scores[i])))
+                if len(results) == k:
+                    break
+            return results
+
+
+class SemanticMatcher:
+    """Embeds resumes as they enter the corpus and answers similarity queries."""
+
+    def __init__(self, directory, embedder=None):
+        self.embedder = embedder or HashingEmbedder()
+        self.store = VectorStore(directory, self.embedder.dim, self.embedder.name)
+
+    def corpus_listener(self, kind, resume_id, record):
+        if kind == REMOVED:
+            self.store.remove(resume_id)
+            return
+        text = resume_embedding_text(record)
+        fingerprint = text_fingerprint(text)
+        # Embedded in an earlier run or by another worker, from the same text
+        if self.store.fingerprint(resume_id) == fingerprint:
+            return
+        self.store.put(resume_id, self.embedder.embed([text])[0], fingerprint)
+
+    def prune(self, resume_ids):
+        """Drop vectors of resumes that are not in ``resume_ids`` (e.g. deleted while offline)."""
+        keep = set(resume_ids)
+        stale = [resume_id for resume_id in self.store.ids() if resume_id not in keep]
+        for resume_id in stale:
+            self.store.remove(resume_id)
+        return len(stale)
+
+    def similar_to_text(self, text, k=10):
+        return self.store.search(self.embedder.embed([text])[0], k)
+
+    def similar_to_resume(self, resume_id, k=10):
+        vector = self.store.get(resume_id)
+        if vector is None:
+            return []
+        return self.store.search(vector, k, exclude=[resume_id])
@@ -0,0 +1,259 @@
+"""Streaming export of filtered candidates as CSV, NDJSON or Parquet.
+
+Rows are built from a corpus snapshot and the facts already resolved for
+filtering, one chunk at a time, and every writer yields encoded bytes per
+chunk. Memory therefore depends on the chunk size, not on how many
+candidates match, and the same generators serve the ``/api/export``
+endpoint and ``python -m resume_parser.export``.
+
+Two row shapes are available:
+
+- ``candidates``: one row per resume with its skills, degree year and GPA,
+  degree, institution and number of experience entries. CSV joins the
+  skills with "; "; NDJSON and Parquet keep them as a list.
+- ``experience``: one row per experience entry, keyed by resume id.
+
+Parquet needs pyarrow (``pip install pyarrow``).
+
+Usage:
+    python -m resume_parser.export [data_dir] [--format csv|ndjson|parquet]
+        [--rows candidates|experience] [--filter '{"skills": ["Python"]}']
+        [--keep-duplicates] [--output candidates.csv]
+"""
+import io
+import sys
+import csv
+import json
+import argparse
+import logging
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from resume_parser.query import ResumeQuery, compile_query
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+ROW_SHAPES = ('candidates', 'experience')
+
+CANDIDATE_COLUMNS = ('id', 'name', 'skills', 'degree_year', 'degree_gpa', 'degree', 'institution',
+                     'experience_count', 'duplicate_of')
+EXPERIENCE_COLUMNS = ('id', 'name', 'position', 'company', 'date', 'description')
+
+DEFAULT_CHUNK_ROWS = 5000
+
+
+class ExportError(ValueError):
+    """Raised for an unknown export format or row shape, or a missing writer dependency."""
+
+
+def check_export(fmt, rows='candidates'):
+    """Fail early, before any output is sent, if an export cannot be produced."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    if rows not in ROW_SHAPES:
+        raise ExportError(f"Unknown row shape {rows!r}; expected one of {', '.join(ROW_SHAPES)}")
+    if fmt == 'parquet' and pyarrow is None:
+        raise ExportError("pyarrow not installed. Install with: pip install pyarrow")
+
+
+def matching_ids(snapshot, query, collapse_duplicates=True):
+    """Return the sorted ids of resumes matching ``query``.
+
+    With ``collapse_duplicates``, a near-duplicate is left out when the
+    resume it duplicates matched too, like the filter API's collapsed view.
+    """
+    ids = compile_query(query, snapshot.query_index()).execute()
+    if not collapse_duplicates:
+        return ids
+    matched = set(ids)
+    return [resume_id for resume_id in ids
+            if (snapshot.records[resume_id].get('raw_parsed_data') or {}).get('duplicate_of') not in matched]
+
+
+def candidate_rows(snapshot, ids):
+    """Yield one dict per resume in ``ids``, in CANDIDATE_COLUMNS order."""
+    for resume_id in ids:
+        record = snapshot.records[resume_id]
+        facts = snapshot.facts[resume_id]
+        raw = record.get('raw_parsed_data') or {}
+        degree = raw.get('degree_education') or {}
+        yield {
+            'id': resume_id,
+            'name': record.get('filename'),
+            'skills': [str(skill) for skill in record['parsed_data'].get('skills') or []],
+            'degree_year': facts.year,
+            'degree_gpa': facts.gpa,
+            'degree': degree.get('degree'),
+            'institution': degree.get('institution'),
+            'experience_count': facts.experience_count,
+            'duplicate_of': raw.get('duplicate_of'),
+        }
+
+
+def experience_rows(snapshot, ids):
+    """Yield one dict per experience entry of the resumes in ``ids``."""
+    for resume_id in ids:
+        record = snapshot.records[resume_id]
+        for entry in (record.get('raw_parsed_data') or {}).get('experience') or []:
+            if not isinstance(entry, dict):
+                continue
+            row = {'id': resume_id, 'name': record.get('filename')}
+            for column in EXPERIENCE_COLUMNS[2:]:
+                value = entry.get(column)
+                row[column] = str(value) if value is not None else None
+            yield row
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_csv(rows, columns, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield CSV (UTF-8, header first) in chunks of ``chunk_rows`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows, chunk_rows):
+        for row in chunk:
+            writer.writerow(['; '.join(value) if isinstance(value, list) else ('' if value is None else value)
+                             for value in (row[column] for column in columns)])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an export with no rows
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_ndjson(rows, columns, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield one JSON object per line in chunks of ``chunk_rows`` rows."""
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for chunk in _chunks(rows, chunk_rows):
+        yield ''.join(encode(row) + '\n' for row in chunk).encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only file object that collects what pyarrow writes until it is drained."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_schema(columns):
+    types = {
+        'skills': pyarrow.list_(pyarrow.string()),
+        'degree_year': pyarrow.int32(),
+        'degree_gpa': pyarrow.float64(),
+        'experience_count': pyarrow.int32(),
+    }
+    return pyarrow.schema([(column, types.get(column, pyarrow.string())) for column in columns])
+
+
+def write_parquet(rows, columns, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield a Parquet file, one row group per chunk of ``chunk_rows`` rows."""
+    if pyarrow is None:
+        raise ExportError("pyarrow not installed. Install with: pip install pyarrow")
+    schema = _parquet_schema(columns)
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for chunk in _chunks(rows, chunk_rows):
+            writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        # Writes the footer; an export with no rows is still a valid, empty file
+        writer.close()
+    yield sink.drain()
+
+
+WRITERS = {'csv': write_csv, 'ndjson': write_ndjson, 'parquet': write_parquet}
+
+
+def export_rows(snapshot, ids, fmt='csv', rows='candidates', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield the export of resumes ``ids`` from ``snapshot`` as encoded chunks."""
+    check_export(fmt, rows)
+    if rows == 'experience':
+        return WRITERS[fmt](experience_rows(snapshot, ids), EXPERIENCE_COLUMNS, chunk_rows)
+    return WRITERS[fmt](candidate_rows(snapshot, ids), CANDIDATE_COLUMNS, chunk_rows)
+
+
+def main(argv=None):
+    from resume_parser.corpus import ResumeCorpus
+
+    parser = argparse.ArgumentParser(description="Export filtered candidates as CSV, NDJSON or Parquet.")
+    parser.add_argument('data_dir', nargs='?', default='parsed_data')
+    parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    parser.add_argument('--rows', choices=ROW_SHAPES, default='candidates')
+    parser.add_argument('--filter', default='{}', help="Filter as the JSON body of /api/filter_resumes")
+    parser.add_argument('--keep-duplicates', action='store_true', help="Also export near-duplicates")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--output', default='-')
+    args = parser.parse_args(argv)
+
+    try:
+        check_export(args.format, args.rows)
+        query = ResumeQuery.from_filter(json.loads(args.filter))
+    except (ExportError, ValueError, TypeError, AttributeError) as e:
+        parser.error(str(e))
+
+    corpus = ResumeCorpus(args.data_dir)
+    corpus.load()
+    snapshot = corpus.snapshot()
+    ids = matching_ids(snapshot, query, collapse_duplicates=not args.keep_duplicates)
+
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export_rows(snapshot, ids, args.format, args.rows, args.chunk_rows):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    print(f"Exported {len(ids)} candidates", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
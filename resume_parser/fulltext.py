@@ -0,0 +1,219 @@
+"""Full-text search over resume text with SQLite FTS5.
+
+The index holds the cleaned text of each resume (read from the artifact
+store) and its experience entries, so words that never make it into the
+structured skills field, like "Kafka" or "payments team", are searchable.
+It lives in its own SQLite file, is updated from corpus events and survives
+restarts: a resume is only re-indexed when its text or experience changed.
+
+Queries use a small, safe syntax translated to FTS5: bare words must all
+match, ``"quoted phrases"`` match in order, ``word*`` matches a prefix,
+``-word`` excludes and ``OR`` between terms makes either acceptable.
+"""
+import os
+import re
+import html
+import sqlite3
+import hashlib
+import threading
+import logging
+
+from resume_parser.corpus import REMOVED
+from resume_parser.search import resume_fields
+from resume_parser.artifacts import record_text
+
+logger = logging.getLogger(__name__)
+
+# Characters FTS5 keeps inside tokens besides letters and digits, so c++ and c# stay whole
+TOKEN_CHARS = '+#'
+_WORD = re.compile(r'[\w+#]+')
+_QUERY_PART = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+# Column weights for bm25(): resume text, experience entries
+COLUMN_WEIGHTS = (1.0, 2.0)
+
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+
+class QuerySyntaxError(ValueError):
+    """Raised when a search query has nothing to match on."""
+
+
+def build_match_expression(query):
+    """Translate a user query into an FTS5 MATCH expression.
+
+    Every term is re-quoted from its word characters, so no user input can
+    reach FTS5 as an operator or column filter.
+    """
+    positive = []
+    negative = []
+    for negate, phrase, word in _QUERY_PART.findall(query or ''):
+        if word == 'OR':
+            if positive and positive[-1] != 'OR':
+                positive.append('OR')
+            continue
+        if word.startswith('-'):
+            negate, word = '-', word[1:]
+        prefix = word.endswith('*')
+        words = _WORD.findall(phrase if phrase else word)
+        if not words:
+            continue
+        term = '"' + ' '.join(words) + '"' + ('*' if prefix else '')
+        (negative if negate else positive).append(term)
+
+    while positive and positive[-1] == 'OR':
+        positive.pop()
+    if not positive:
+        raise QuerySyntaxError("Query needs at least one word to search for")
+    expression = '(' + ' '.join(positive) + ')'
+    for term in negative:
+        expression += ' NOT ' + term
+    return expression
+
+
+def _highlight(snippet):
+    """HTML-escape a snippet and turn the highlight markers into <mark> tags."""
+    return (html.escape(snippet)
+            .replace(_HIGHLIGHT_START, '<mark>')
+            .replace(_HIGHLIGHT_END, '</mark>'))
+
+
+class FullTextIndex:
+    """SQLite FTS5 index of resume text, kept in sync with a :class:`ResumeCorpus`.
+
+    Register :meth:`corpus_listener` with ``corpus.subscribe`` and
+    :meth:`commit_batch` with ``corpus.subscribe_batches``: changes are
+    collected per event and written in one transaction per batch, which keeps
+    loading a large corpus fast.
+    """
+
+    def __init__(self, path, artifacts=None):
+        self.path = path
+        self.artifacts = artifacts
+        self._local = threading.local()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS resume_text USING fts5(
+                body, experience,
+                tokenize = "unicode61 remove_diacritics 2 tokenchars '{TOKEN_CHARS}'"
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                resume_id TEXT PRIMARY KEY,
+                doc_rowid INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS documents_rowid ON documents (doc_rowid);
+        """)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def corpus_listener(self, kind, resume_id, record):
+        """Queue a corpus change; written by the next :meth:`commit_batch`."""
+        with self._pending_lock:
+            self._pending[resume_id] = None if kind == REMOVED else record
+
+    def commit_batch(self, events=None):
+        """Write every queued change in one transaction."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for resume_id, record in pending.items():
+                if record is None:
+                    self._delete(conn, resume_id)
+                else:
+                    self._upsert(conn, resume_id, record)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _delete(self, conn, resume_id):
+        row = conn.execute("SELECT doc_rowid FROM documents WHERE resume_id = ?", (resume_id,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM resume_text WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM documents WHERE resume_id = ?", (resume_id,))
+
+    def _upsert(self, conn, resume_id, record):
+        raw = record.get('raw_parsed_data') or {}
+        experience = resume_fields(record)['experience']
+        text_address = (raw.get('pipeline') or {}).get('text_sha256') or ''
+        fingerprint = hashlib.sha256(f"{text_address}\0{experience}".encode('utf-8')).hexdigest()
+
+        row = conn.execute("SELECT fingerprint FROM documents WHERE resume_id = ?", (resume_id,)).fetchone()
+        if row and row[0] == fingerprint:
+            # Unchanged since it was last indexed (e.g. on a restart)
+            return
+
+        body = ''
+        if self.artifacts is not None:
+            text = record_text(self.artifacts, raw)
+            body = (text.text if text is not None else None) or ''
+        self._delete(conn, resume_id)
+        cursor = conn.execute("INSERT INTO resume_text (body, experience) VALUES (?, ?)", (body, experience))
+        conn.execute("INSERT INTO documents (resume_id, doc_rowid, fingerprint) VALUES (?, ?, ?)",
+                     (resume_id, cursor.lastrowid, fingerprint))
+
+    def prune(self, resume_ids):
+        """Drop indexed resumes that are not in ``resume_ids`` (e.g. deleted while offline)."""
+        conn = self._connection()
+        keep = set(resume_ids)
+        stale = [resume_id for (resume_id,) in conn.execute("SELECT resume_id FROM documents")
+                 if resume_id not in keep]
+        if not stale:
+            return 0
+        conn.execute("BEGIN IMMEDIATE")
+        for resume_id in stale:
+            self._delete(conn, resume_id)
+        conn.execute("COMMIT")
+        return len(stale)
+
+    def search(self, query, k=20, snippet_tokens=16):
+        """Return up to ``k`` matches as ``(resume_id, score, snippet_html)``, best first.
+
+        Raises:
+            QuerySyntaxError: if the query contains nothing to search for
+        """
+        expression = build_match_expression(query)
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+        # Rank first, then build snippets only for the top k: snippet()
+        # re-reads the whole document, so running it for every match would
+        # dominate queries on common words
+        top = self._connection().execute(f"""
+            SELECT rowid, bm25(resume_text, {weights}) AS score
+            FROM resume_text WHERE resume_text MATCH ?
+            ORDER BY score LIMIT ?
+        """, (expression, k)).fetchall()
+        if not top:
+            return []
+        scores = dict(top)
+        placeholders = ', '.join('?' * len(scores))
+        rows = self._connection().execute(f"""
+            SELECT d.resume_id, resume_text.rowid, snippet(resume_text, -1, ?, ?, '…', ?)
+            FROM resume_text JOIN documents d ON d.doc_rowid = resume_text.rowid
+            WHERE resume_text MATCH ? AND resume_text.rowid IN ({placeholders})
+        """, (_HIGHLIGHT_START, _HIGHLIGHT_END, snippet_tokens, expression, *scores)).fetchall()
+        rows.sort(key=lambda row: scores[row[1]])
+        # bm25() is lower-is-better; flip it so larger scores mean better matches
+        return [(resume_id, -scores[rowid], _highlight(snippet)) for resume_id, rowid, snippet in rows]
@@ -0,0 +1,119 @@
+"""Cache of validated LLM parses keyed on the normalized resume text.
+
+Two files with different bytes (a PDF and a DOCX export of the same resume)
+usually produce the same text after cleaning, so the key is a hash of that
+text together with everything else that determines the model's answer: the
+model name, the system prompt and the temperature. Changing any of them
+starts a fresh set of keys instead of serving answers to a different prompt.
+
+Entries live in a :class:`SharedCache` database of their own, so they
+survive restarts, are shared by all workers and are evicted by size without
+competing with the page caches. ``python -m resume_parser.llm_cache export``
+and ``warm`` move the cache between machines as JSON Lines.
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import unicodedata
+
+from resume_parser.shared_cache import SharedCache
+
+NAMESPACE = 'llm_parse'
+DEFAULT_PATH = os.path.join('cache', 'llm_responses.sqlite3')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Normalize text so that formatting-only differences map to the same key."""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text or '')).strip()
+
+
+def cache_key(text, model, system_prompt, temperature):
+    """Return the cache key for parsing ``text`` with the given request settings."""
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, repr(float(temperature)), normalize_text(text)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """Disk-backed cache of post-processed LLM parses."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, max_entries=1_000_000):
+        self.store = SharedCache(path, max_entries=max_entries, max_bytes=max_bytes)
+
+    def get(self, key):
+        return self.store.get(NAMESPACE, key)
+
+    def set(self, key, parsed):
+        self.store.set(NAMESPACE, key, parsed)
+
+    def export(self, stream):
+        """Write every entry to ``stream`` as JSON Lines; returns the number written."""
+        count = 0
+        for key, parsed in self.store.items(NAMESPACE):
+            stream.write(json.dumps({'key': key, 'parsed': parsed}, ensure_ascii=False) + '\n')
+            count += 1
+        return count
+
+    def warm(self, stream, batch_size=1000):
+        """Load entries written by :meth:`export`; returns the number loaded."""
+        count = 0
+        batch = []
+        for line in stream:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            batch.append((entry['key'], entry['parsed']))
+            if len(batch) >= batch_size:
+                count += self.store.set_many(NAMESPACE, batch)
+                batch = []
+        if batch:
+            count += self.store.set_many(NAMESPACE, batch)
+        return count
+
+
+def get_llm_cache():
+    """Return the cache configured by RESUME_LLM_CACHE (a path, or 'off' to disable)."""
+    path = os.environ.get('RESUME_LLM_CACHE', DEFAULT_PATH)
+    if path.lower() in ('', 'off', 'none'):
+        return None
+    max_bytes = int(os.environ.get('RESUME_LLM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    return LLMResponseCache(path, max_bytes=max_bytes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or warm the LLM response cache.")
+    parser.add_argument('--cache', default=os.environ.get('RESUME_LLM_CACHE', DEFAULT_PATH))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export = subparsers.add_parser('export', help="Write all cached parses as JSON Lines")
+    export.add_argument('output', nargs='?', default='-')
+    warm = subparsers.add_parser('warm', help="Load cached parses from JSON Lines")
+    warm.add_argument('input', nargs='?', default='-')
+    args = parser.parse_args(argv)
+
+    cache = LLMResponseCache(args.cache)
+    if args.command == 'export':
+        if args.output == '-':
+            count = cache.export(sys.stdout)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                count = cache.export(f)
+        print(f"Exported {count} cached parses", file=sys.stderr)
+    else:
+        if args.input == '-':
+            count = cache.warm(sys.stdin)
+        else:
+            with open(args.input, encoding='utf-8') as f:
+                count = cache.warm(f)
+        print(f"Loaded {count} cached parses", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
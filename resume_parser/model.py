@@ -1,9 +1,62 @@
+import os
 import re
 import spacy
 import time
 import json
 import anthropic
 
+from resume_parser.concurrency import DeadlineExceeded, LLM_DEADLINE, llm_limiter
+from resume_parser.scheduler import INTERACTIVE_JOB, llm_scheduler
+from resume_parser.llm_cache import cache_key, get_llm_cache
+from resume_parser.education import DEGREE, education_classifier
+
+# Everything that shapes the LLM's answer is part of the response cache key
+SYSTEM_PROMPT = """You are a resume parsing expert. Extract the following information from the resume:
+
+1. Skills: Extract a comprehensive list of all technical and soft skills mentioned in the resume.
+   Return as a simple list of skill names.
+
+2. Education: Extract all educational qualifications including degree name, institution name, 
+   graduation year, GPA, and any relevant details. Format each entry as a dictionary with fields: 
+   'institution', 'degree', 'graduation_year', 'gpa', and 'education_level'. 
+   
+   For education_level, categorize as:
+   - 'degree' for Bachelor's degrees, B.Tech, Engineering degrees, College education
+   - 'secondary' for Senior Secondary, 12th, Intermediate, 10+2
+   - 'high_school' for Secondary, 10th, High School
+   
+   IMPORTANT: Only set the 'graduation_year' field for degree-level education (B.Tech, Bachelor's, etc.).
+   For secondary and high_school levels, use 'completion_year' instead of 'graduation_year'.
+   
+   For GPA, ensure it's converted to a float value on a 10-point scale. If GPA is missing, set it to null.
+
+3. Experience: Extract all work experiences, internships, and relevant projects including company name, 
+   position title, time period, and key responsibilities. Format each entry as a dictionary with fields: 
+   'company', 'position', 'date', and 'description'.
+
+Return the information in a valid JSON format with these three main categories: "skills" (array of strings), 
+"education" (array of objects), and "experience" (array of objects).
+"""
+TEMPERATURE = 0.1
+MAX_TOKENS = 4000
+
+# Bump the matching entry whenever a rule-based extractor changes, so that
+# `python -m resume_parser.reprocess` re-runs just that extractor on stored resumes
+RULE_VERSIONS = {
+    "skills": 1,
+    "education": 2,
+    "experience": 1,
+}
+
+
+def current_model_name():
+    return os.environ.get("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")
+
+
+def prompt_version(model):
+    """Short fingerprint of the LLM request settings; changes whenever the prompt or model does."""
+    return cache_key("", model, SYSTEM_PROMPT, TEMPERATURE)[:12]
+
 class ResumeParserModel:
     _instance = None
     
@@ -22,88 +75,118 @@ class ResumeParserModel:
             subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
             self.nlp = spacy.load("en_core_web_sm")
 
-    
-        # Define education level keywords for classification
-        self.degree_keywords = [
-            "bachelor", "b.tech", "btech", "b. tech", "undergraduate", "ug", "be", "b.e.",
-            "engineering", "computer science", "cse", "it", "information technology",
-            "electrical", "mechanical", "civil", "electronics", "college"
-        ]
-        
-        self.secondary_keywords = [
-            "senior secondary", "12th", "12 th", "xii", "higher secondary", "intermediate",
-            "junior college", "pre-university", "hsc", "intermediate", "10+2"
-        ]
-        
-        self.high_school_keywords = [
-            "secondary", "high school", "10th", "10 th", "x", "ssc", "matriculation"
-        ]
+        # Retries are left to the limiter so that it sees every rate-limit response
+        self.client = anthropic.Anthropic(max_retries=0) if os.environ.get("ANTHROPIC_API_KEY") else None
+        self.model = current_model_name()
+        self.llm_cache = get_llm_cache()
         
         print("Resume parser model initialized successfully!")
 
-    def parse_resume(self, text, use_llm=True):
-        """Parse the resume text using both LLM and rule-based approaches."""
+    def parse_resume(self, text, use_llm=True, deadline=None, job=INTERACTIVE_JOB):
+        """Parse the resume text using both LLM and rule-based approaches.
+        
+        Args:
+            text: Resume text
+            use_llm: Whether to try the LLM first
+            deadline: time.monotonic() value by which the LLM must have answered;
+                defaults to LLM_DEADLINE seconds from now
+            job: scheduler Job (priority class and tenant) the LLM call is made for
+        """
         start_time = time.time()
         
         llm_results = None
-        if use_llm:
+        shed = False
+        key = cache_key(text, self.model, SYSTEM_PROMPT, TEMPERATURE)
+        if use_llm and self.llm_cache is not None:
+            # The same text from a differently formatted file costs no API call
+            llm_results = self.llm_cache.get(key)
+            if llm_results:
+                print("Reused cached Anthropic AI parse.")
+                llm_results["parse_method"] = "llm"
+                return llm_results
+        
+        if use_llm and self.client is not None:
+            if deadline is None:
+                deadline = time.monotonic() + LLM_DEADLINE
             try:
-                llm_results = self._parse_with_anthropic(text)
+                llm_results = self._parse_with_anthropic(text, deadline, job)
+                if llm_results and self.llm_cache is not None:
+                    self.llm_cache.set(key, llm_results)
                 print(f"Anthropic AI parsing completed in {time.time() - start_time:.2f} seconds")
+            except DeadlineExceeded as e:
+                print(f"{e}. Shedding to rule-based parsing.")
+                shed = True
             except Exception as e:
                 print(f"Error using Anthropic AI: {e}. Falling back to rule-based parsing.")
         
         if not llm_results:
-            doc = self.nlp(text)
-            skills = self._extract_skills(text, doc)
-            education = self._extract_education(text, doc)
-            experience = self._extract_experience(text, doc)
-
-            rule_based_results = {
-                "skills": skills,
-                "education": education,
-                "experience": experience
-            }
+            rule_based_results = self.parse_with_rules(text)
+            rule_based_results["parse_method"] = "rules"
+            if use_llm and self.client is not None:
+                # The LLM was wanted but did not answer (load, API or JSON error, empty reply);
+                # lets callers avoid caching the parse and reprocess redo it with the LLM
+                rule_based_results["llm_fallback"] = True
+            if shed:
+                rule_based_results["llm_shed"] = True
             print(f"Rule-based parsing completed in {time.time() - start_time:.2f} seconds")
             return rule_based_results
         
+        llm_results["parse_method"] = "llm"
         return llm_results
 
-    def _parse_with_anthropic(self, text):
-        """Parse resume using Anthropic API."""
-        system_prompt = """You are a resume parsing expert. Extract the following information from the resume:
-
-1. Skills: Extract a comprehensive list of all technical and soft skills mentioned in the resume.
-   Return as a simple list of skill names.
+    def parse_with_rules(self, text, fields=RULE_VERSIONS):
+        """Run the rule-based extractors for ``fields`` (default: all of them) over ``text``."""
+        doc = self.nlp(text)
+        extractors = {
+            "skills": self._extract_skills,
+            "education": self._extract_education,
+            "experience": self._extract_experience,
+        }
+        return {field: extractors[field](text, doc) for field in fields}
 
-2. Education: Extract all educational qualifications including degree name, institution name, 
-   graduation year, GPA, and any relevant details. Format each entry as a dictionary with fields: 
-   'institution', 'degree', 'graduation_year', 'gpa', and 'education_level'. 
-   
-   For education_level, categorize as:
-   - 'degree' for Bachelor's degrees, B.Tech, Engineering degrees, College education
-   - 'secondary' for Senior Secondary, 12th, Intermediate, 10+2
-   - 'high_school' for Secondary, 10th, High School
-   
-   IMPORTANT: Only set the 'graduation_year' field for degree-level education (B.Tech, Bachelor's, etc.).
-   For secondary and high_school levels, use 'completion_year' instead of 'graduation_year'.
-   
-   For GPA, ensure it's converted to a float value on a 10-point scale. If GPA is missing, set it to null.
+    def _create_message(self, deadline, job=INTERACTIVE_JOB, **kwargs):
+        """Call the Anthropic API through the scheduler and adaptive limiter, retrying rate limits until the deadline."""
+        while True:
+            # The scheduler admits interactive uploads ahead of bulk imports; the limiter paces the API
+            with llm_scheduler.slot(job, deadline):
+                started = llm_limiter.acquire(deadline)
+                try:
+                    message = self.client.messages.create(
+                        timeout=max(1.0, deadline - time.monotonic()), **kwargs)
+                except anthropic.APIStatusError as e:
+                    # 529 means the API is overloaded, which calls for the same back-off as a 429
+                    overloaded = e.status_code in (429, 529)
+                    llm_limiter.release(started, rate_limited=overloaded, failed=not overloaded)
+                    if not overloaded:
+                        raise
+                    retry_after = self._retry_after(e)
+                except Exception:
+                    llm_limiter.release(started, failed=True)
+                    raise
+                else:
+                    llm_limiter.release(started)
+                    return message
+            # Back off without holding a slot; the next acquire sheds the call if the deadline can no longer be met
+            time.sleep(min(retry_after, max(0.0, deadline - time.monotonic())))
 
-3. Experience: Extract all work experiences, internships, and relevant projects including company name, 
-   position title, time period, and key responsibilities. Format each entry as a dictionary with fields: 
-   'company', 'position', 'date', and 'description'.
+    @staticmethod
+    def _retry_after(error, default=1.0):
+        try:
+            return float(error.response.headers.get("retry-after", default))
+        except (AttributeError, TypeError, ValueError):
+            return default
 
-Return the information in a valid JSON format with these three main categories: "skills" (array of strings), 
-"education" (array of objects), and "experience" (array of objects).
-"""
+    def _parse_with_anthropic(self, text, deadline, job=INTERACTIVE_JOB):
+        """Parse resume using Anthropic API."""
         
         try:
-            message = self.client.messages.create(
+            message = self._create_message(
+                deadline,
+                job,
                 model=self.model,
-                max_tokens=4000,
-                temperature=0.1,
-                system=system_prompt,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                system=SYSTEM_PROMPT,
                 messages=[
                     {"role": "user", "content": f"Parse the following resume and extract skills, education, and experience:\n\n{text}"}
                 ]
@@ -117,11 +200,12 @@ Return the information in a valid JSON format with these three main categories:
                 
                 # Process education entries
                 if 'education' in parsed_data:
+                    # If education_level is not set, determine it based on degree name
+                    unlabelled = [edu for edu in parsed_data['education'] if 'education_level' not in edu and 'degree' in edu]
+                    for edu, level in zip(unlabelled, education_classifier.classify_many(edu['degree'] for edu in unlabelled)):
+                        edu['education_level'] = level
+                    
                     for edu in parsed_data['education']:
-                        # If education_level is not set, determine it based on degree name
-                        if 'education_level' not in edu and 'degree' in edu:
-                            edu['education_level'] = self._classify_education_level(edu['degree'])
-                        
                         # Ensure GPA is properly formatted as a float or None
                         if 'gpa' in edu and edu['gpa']:
                             try:
@@ -146,44 +230,17 @@ Return the information in a valid JSON format with these three main categories:
                 print(f"Error parsing JSON from Anthropic response: {e}")
                 print(f"Raw content: {content}")
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"Error with Anthropic API request: {e}")
         
-        # Fallback to rule-based parsing
-        doc = self.nlp(text)
-        return {
-            "skills": self._extract_skills(text, doc),
-            "education": self._extract_education(text, doc),
-            "experience": self._extract_experience(text, doc)
-        }
+        # parse_resume falls back to rule-based parsing
+        return None
     
     def _classify_education_level(self, degree_text):
         """Classify education level based on degree text."""
-        if not degree_text:
-            return None
-            
-        degree_text = degree_text.lower()
-        
-        # Check for degree level
-        for keyword in self.degree_keywords:
-            if keyword in degree_text:
-                return "degree"
-                
-        # Check for senior secondary
-        for keyword in self.secondary_keywords:
-            if keyword in degree_text:
-                return "secondary"
-                
-        # Check for high school
-        for keyword in self.high_school_keywords:
-            if keyword in degree_text:
-                return "high_school"
-                
-        # Default to degree if contains the word "degree"
-        if "degree" in degree_text:
-            return "degree"
-            
-        return None
+        return education_classifier.classify(degree_text)
     
     def _extract_json_from_text(self, text):
         """Extract JSON content from text that might contain markdown or other formatting."""
@@ -306,8 +363,7 @@ Return the information in a valid JSON format with these three main categories:
                         continue
                     
                     # Check if this line contains degree information
-                    has_degree_keywords = any(keyword in line.lower() for keyword in 
-                                             self.degree_keywords + self.secondary_keywords + self.high_school_keywords)
+                    has_degree_keywords = education_classifier.mentions_education(line)
                     
                     if not education_entry["institution"] or has_degree_keywords:
                         education_entry["institution"] = line
@@ -478,11 +534,8 @@ Return the information in a valid JSON format with these three main categories:
                 
         # Fallback: try to identify degree by keywords if education_level is not set
         for edu in parsed_data["education"]:
-            degree = edu.get("degree", "").lower() if edu.get("degree") else ""
-            institution = edu.get("institution", "").lower() if edu.get("institution") else ""
-            
-            # Check if it contains degree keywords
-            if any(keyword in degree or keyword in institution for keyword in self.degree_keywords):
+            # Check if the degree or institution reads as degree level
+            if DEGREE in education_classifier.classify_many([edu.get("degree"), edu.get("institution")]):
                 # Only return if it has a graduation_year (not completion_year)
                 if "graduation_year" in edu:
                     return edu
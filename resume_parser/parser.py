@@ -1,32 +1,127 @@
 import PyPDF2
-import docx
 import time
 import re
 import os
+import io
+import codecs
+import hashlib
+import zipfile
 import logging
 
+from resume_parser.docx_reader import extract_docx_text
+from resume_parser.scheduler import INTERACTIVE_JOB
+from resume_parser.education import DEGREE, SECONDARY, HIGH_SCHOOL, education_classifier
+from resume_parser.query import CANONICAL_FIELD, canonical_degree, ResumeQuery, QueryIndex, run_query
+
+try:
+    from PIL.Image import DecompressionBombError
+except ImportError:
+    DecompressionBombError = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def parse_resume(file_path, use_llm=True):
-    """Parse a resume file and extract relevant information."""
+# Bump when extract_text/clean_text change what text a file produces
+EXTRACTOR_VERSION = 1
+# Bump when derive_degree_fields changes
+DERIVE_VERSION = 2
+
+# An upload that hits a resource limit must fail, not parse as empty text: the
+# extraction sandbox turns these into an error and replaces its worker
+LIMIT_ERRORS = tuple(filter(None, (MemoryError, DecompressionBombError)))
+
+def parse_resume(file_path, use_llm=True, dedup_index=None, reuse_duplicate=None, file_type=None, deadline=None,
+                 artifacts=None, extractor=None, job=None):
+    """Parse a resume file and extract relevant information.
+    
+    Args:
+        file_path: Path to the resume file, or its contents as bytes or a binary file-like object
+        use_llm: Whether to try the LLM before the rule-based parser
+        dedup_index: Optional MinHashLSH index used to flag near-duplicate resumes
+        reuse_duplicate: Optional callable taking the id of an earlier, practically identical
+            resume and returning its parsed data (or None) to reuse instead of parsing again
+        file_type: Optional file type ('pdf', 'docx', 'image' or 'text'); sniffed if not given
+        deadline: Optional time.monotonic() value after which the LLM is skipped
+            in favour of the rule-based parser
+        artifacts: Optional ArtifactStore that keeps the extracted and cleaned text
+        extractor: Optional callable with the signature of extract_text, e.g.
+            ExtractionPool.extract to extract in a sandboxed process
+        job: Optional scheduler Job (priority class and tenant); defaults to interactive
+        
+    Returns:
+        Dictionary of parsed resume data
+    """
     start_time = time.time()
     
     # Import the model here to avoid circular imports
     from resume_parser.model import ResumeParserModel
     
     # Extract text from the file
-    text = extract_text(file_path)
+    raw_text = (extractor or extract_text)(file_path, file_type)
     
     # Clean up the text
-    text = clean_text(text)
+    text = clean_text(raw_text)
+    
+    # Keep both so later stages never have to extract this file again
+    if artifacts is not None:
+        artifacts.put(raw_text)
+        artifacts.put(text)
+    
+    # Check for near-duplicates of resumes we have already parsed
+    signature = None
+    duplicate_of = None
+    if dedup_index is not None:
+        signature = dedup_index.signature(text)
+        match = dedup_index.query(signature) if signature is not None else None
+        if match:
+            duplicate_of = dedup_index.canonical(match[0])
+            logger.info(f"{_source_name(file_path)} is a near-duplicate of {duplicate_of}")
+            # Only a practically identical text may take over another resume's parse
+            if reuse_duplicate is not None and match[1] >= dedup_index.reuse_threshold:
+                previous = reuse_duplicate(match[0])
+                if previous:
+                    parsed_data = dict(previous)
+                    parsed_data["minhash_signature"] = signature
+                    parsed_data["duplicate_of"] = duplicate_of
+                    if parsed_data.get("pipeline"):
+                        parsed_data["pipeline"] = dict(parsed_data["pipeline"], text_sha256=text_sha256(text),
+                                                       raw_text_sha256=text_sha256(raw_text))
+                    print(f"Reused parse of {duplicate_of} in {time.time() - start_time:.2f} seconds.")
+                    return parsed_data
     
     # Initialize the model and parse the resume
     model = ResumeParserModel()
-    parsed_data = model.parse_resume(text, use_llm)
+    parsed_data = model.parse_resume(text, use_llm, deadline, job or INTERACTIVE_JOB)
+    
+    if signature is not None:
+        parsed_data["minhash_signature"] = signature
+        parsed_data["duplicate_of"] = duplicate_of
+    
+    derive_degree_fields(parsed_data, model)
+    parsed_data["pipeline"] = pipeline_metadata(parsed_data, text, model, raw_text)
+    
+    # Log the parsing time
+    parsing_time = time.time() - start_time
+    print(f"Total parsing completed in {parsing_time:.2f} seconds.")
     
+    return parsed_data
+
+def flag_duplicate(parsed_data, dedup_index):
+    """Return a copy of a cached parse with ``duplicate_of`` looked up in ``dedup_index`` now.
+    
+    A parse cached by file hash still has the right MinHash signature for a
+    new upload of the same file, but which stored resume it duplicates (the
+    first upload of that file, typically) depends on when it is reused.
+    """
+    signature = parsed_data.get("minhash_signature")
+    if dedup_index is None or signature is None:
+        return parsed_data
+    return dict(parsed_data, duplicate_of=dedup_index.find_duplicate(signature))
+
+def derive_degree_fields(parsed_data, model):
+    """(Re)compute the degree fields used for filtering from a parse's education entries."""
     # Add degree-specific information for filtering
     parsed_data["degree_education"] = model.get_degree_education(parsed_data)
     
@@ -42,72 +137,229 @@ def parse_resume(file_path, use_llm=True):
     parsed_data["degree_gpa"] = degree_gpa
     parsed_data["degree_graduation_year"] = degree_graduation_year
     
-    # Log the parsing time
-    parsing_time = time.time() - start_time
-    print(f"Total parsing completed in {parsing_time:.2f} seconds.")
-    
+    # Resolve typed year and GPA once so filters never re-parse them; a stale
+    # canonical value would otherwise shadow the fields computed above
+    parsed_data.pop(CANONICAL_FIELD, None)
+    parsed_data[CANONICAL_FIELD] = canonical_degree(parsed_data)
     return parsed_data
 
-def extract_text(file_path):
-    """Extract text from different file formats."""
-    if not os.path.exists(file_path):
-        logger.error(f"File not found: {file_path}")
-        return ""
+def text_sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def stage_versions(model_name, parse_method):
+    """Return the versions of every stage that produces a parse made with ``parse_method``."""
+    from resume_parser.model import RULE_VERSIONS, prompt_version
+    
+    versions = {"extract": EXTRACTOR_VERSION, "derive": DERIVE_VERSION}
+    if parse_method == "llm":
+        versions["llm"] = prompt_version(model_name)
+    else:
+        versions.update({f"rules.{field}": version for field, version in RULE_VERSIONS.items()})
+    return versions
+
+def pipeline_metadata(parsed_data, text, model, raw_text=None):
+    """Record how a parse was produced, so later pipeline changes can re-run only what changed.
+    
+    The text hashes double as addresses in the artifact store.
+    """
+    method = parsed_data.pop("parse_method", "rules")
+    pipeline = {
+        "method": method,
+        "versions": stage_versions(model.model, method),
+        "text_sha256": text_sha256(text),
+    }
+    if raw_text is not None:
+        pipeline["raw_text_sha256"] = text_sha256(raw_text)
+    return pipeline
+
+def read_stream(stream, chunk_size=1024 * 1024):
+    """Read a binary stream once, hashing it as it is read.
+    
+    Seekable streams (uploads spooled by the web server) are read straight
+    into a buffer of their size, so the contents are copied exactly once.
+    
+    Returns:
+        Tuple of (contents as a bytearray, SHA-256 hex digest)
+    """
+    digest = hashlib.sha256()
+    size = _remaining_size(stream)
+    if size is None:
+        buffer = bytearray()
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            buffer += chunk
+        return buffer, digest.hexdigest()
+    
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    filled = 0
+    while filled < size:
+        count = stream.readinto(view[filled:filled + chunk_size])
+        if not count:
+            break
+        digest.update(view[filled:filled + count])
+        filled += count
+    view.release()
+    # The stream was shorter than it claimed
+    del buffer[filled:]
+    return buffer, digest.hexdigest()
+
+def _remaining_size(stream):
+    """Bytes left in ``stream`` if it can tell without reading them, else None."""
+    try:
+        if not stream.seekable() or not hasattr(stream, 'readinto'):
+            return None
+        position = stream.tell()
+        end = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def sniff_file_type(data):
+    """Detect the real file type from its leading magic bytes.
+    
+    Returns:
+        'pdf', 'docx', 'image', 'text', or None if the type is not supported
+    """
+    head = bytes(data[:8])
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head.startswith(b'\x89PNG\r\n\x1a\n') or head.startswith(b'\xff\xd8\xff'):
+        return 'image'
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return 'docx'
+        except zipfile.BadZipFile:
+            pass
+        return None
+    try:
+        # Incremental decoding tolerates a multi-byte character cut off at the end of the sample
+        codecs.getincrementaldecoder('utf-8')().decode(bytes(data[:4096]), final=len(data) <= 4096)
+        return 'text'
+    except UnicodeDecodeError:
+        return None
+
+def _file_type_from_name(file_path):
+    """Guess the file type from a path's extension."""
+    lower = file_path.lower()
+    if lower.endswith('.pdf'):
+        return 'pdf'
+    elif lower.endswith('.docx'):
+        return 'docx'
+    elif lower.endswith(('.png', '.jpg', '.jpeg')):
+        return 'image'
+    return 'text'
+
+def _source_name(source):
+    """Describe a path, bytes or stream source for log messages."""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    return getattr(source, 'name', None) or f"<{type(source).__name__}>"
+
+def _as_stream(source):
+    """Return a binary stream for bytes or a file-like object; paths are returned unchanged."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+def extract_text(file_path, file_type=None):
+    """Extract text from different file formats.
+    
+    Args:
+        file_path: Path to the file, or its contents as bytes or a binary file-like object.
+            In-memory sources are read directly, without going through the filesystem.
+        file_type: Optional file type ('pdf', 'docx', 'image' or 'text'). Sniffed from
+            the magic bytes for in-memory sources and taken from the extension for paths.
+    """
+    if isinstance(file_path, (str, os.PathLike)):
+        if not os.path.exists(file_path):
+            logger.error(f"File not found: {file_path}")
+            return ""
+        file_type = file_type or _file_type_from_name(str(file_path))
+        source = file_path
+    else:
+        source = _as_stream(file_path)
+        if file_type is None:
+            position = source.tell()
+            file_type = sniff_file_type(source.read())
+            source.seek(position)
         
-    if file_path.lower().endswith('.pdf'):
-        return extract_text_from_pdf(file_path)
-    elif file_path.lower().endswith('.docx'):
-        return extract_text_from_docx(file_path)
-    elif file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-        return extract_text_from_image(file_path)
+    if file_type == 'pdf':
+        return extract_text_from_pdf(source)
+    elif file_type == 'docx':
+        return extract_text_from_docx(source)
+    elif file_type == 'image':
+        return extract_text_from_image(source)
     else:
         # Try to read as plain text
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            if isinstance(source, (str, os.PathLike)):
+                with open(source, 'r', encoding='utf-8') as file:
+                    return file.read()
+            return source.read().decode('utf-8')
+        except LIMIT_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error reading file: {e}")
             return ""
 
 def extract_text_from_pdf(file_path):
-    """Extract text from PDF file."""
+    """Extract text from a PDF file path or binary stream."""
     text = ""
     try:
-        with open(file_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        logger.info(f"Successfully extracted text from PDF: {file_path}")
+        if isinstance(file_path, (str, os.PathLike)):
+            with open(file_path, 'rb') as file:
+                text = _read_pdf_pages(file)
+        else:
+            text = _read_pdf_pages(_as_stream(file_path))
+        logger.info(f"Successfully extracted text from PDF: {_source_name(file_path)}")
+    except LIMIT_ERRORS:
+        raise
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {e}")
     return text.strip()
 
+def _read_pdf_pages(stream):
+    reader = PyPDF2.PdfReader(stream)
+    pages = []
+    for page in reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            pages.append(page_text + "\n")
+    return "".join(pages)
+
 def extract_text_from_docx(file_path):
-    """Extract text from DOCX file."""
+    """Extract text from a DOCX file path or binary stream, including tables, headers and text boxes."""
     text = ""
     try:
-        doc = docx.Document(file_path)
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        logger.info(f"Successfully extracted text from DOCX: {file_path}")
+        text = extract_docx_text(_as_stream(file_path))
+        logger.info(f"Successfully extracted text from DOCX: {_source_name(file_path)}")
+    except LIMIT_ERRORS:
+        raise
     except Exception as e:
         logger.error(f"Error extracting text from DOCX: {e}")
     return text.strip()
 
 def extract_text_from_image(file_path):
-    """Extract text from image file using OCR."""
+    """Extract text from an image file path or binary stream using OCR."""
     text = ""
     try:
         import pytesseract
         from PIL import Image
         
-        img = Image.open(file_path)
+        img = Image.open(_as_stream(file_path))
         text = pytesseract.image_to_string(img)
-        logger.info(f"Successfully extracted text from image: {file_path}")
+        logger.info(f"Successfully extracted text from image: {_source_name(file_path)}")
     except ImportError:
         logger.error("pytesseract or PIL not installed. Install with: pip install pytesseract pillow")
+    except LIMIT_ERRORS:
+        raise
     except Exception as e:
         logger.error(f"Error extracting text from image: {e}")
     return text.strip()
@@ -185,6 +437,9 @@ def get_all_skills():
         "Cypress", "JUnit", "PyTest"
     ]
 
+# Set form of the predefined skills for fast membership tests
+PREDEFINED_SKILLS = frozenset(get_all_skills())
+
 def format_parsed_data(parsed_data):
     """Format the parsed data for better display in the web interface."""
     formatted_data = {
@@ -196,7 +451,7 @@ def format_parsed_data(parsed_data):
     
     # Format skills
     if parsed_data.get("skills"):
-        all_skills = get_all_skills()
+        all_skills = PREDEFINED_SKILLS
         # Prioritize skills that match our predefined list
         matched_skills = [skill for skill in parsed_data["skills"] if skill in all_skills]
         other_skills = [skill for skill in parsed_data["skills"] if skill not in all_skills]
@@ -211,24 +466,15 @@ def format_parsed_data(parsed_data):
         high_school_education = []
         
         for edu in parsed_data.get("education", []):
-            education_level = edu.get("education_level")
+            # If education_level is not set, try to determine it from the degree name
+            education_level = edu.get("education_level") or education_classifier.classify(edu.get("degree"))
             
-            if education_level == "degree":
+            if education_level == DEGREE:
                 degree_education.append(edu)
-            elif education_level == "secondary":
+            elif education_level == SECONDARY:
                 secondary_education.append(edu)
-            elif education_level == "high_school":
+            elif education_level == HIGH_SCHOOL:
                 high_school_education.append(edu)
-            else:
-                # If education_level is not set, try to determine from degree name
-                if "degree" in edu:
-                    degree_name = edu.get("degree", "").lower()
-                    if any(keyword in degree_name for keyword in ['bachelor', 'b.tech', 'btech', 'engineering']):
-                        degree_education.append(edu)
-                    elif any(keyword in degree_name for keyword in ['12th', 'intermediate', 'senior secondary']):
-                        secondary_education.append(edu)
-                    elif any(keyword in degree_name for keyword in ['10th', 'high school', 'secondary']):
-                        high_school_education.append(edu)
         
         # Order education by level: degree first, then secondary, then high school
         formatted_data["education"] = degree_education + secondary_education + high_school_education
@@ -264,55 +510,9 @@ def filter_resumes_by_criteria(resumes, skills=None, graduation_year=None, min_g
     Returns:
         List of filtered resumes
     """
-    filtered_resumes = []
-    
-    for resume in resumes:
-        # Skip if no parsed data
-        if not resume or not isinstance(resume, dict):
-            continue
-            
-        # Check skills criteria
-        if skills and len(skills) > 0:
-            resume_skills = resume.get("skills", [])
-            if not all(skill in resume_skills for skill in skills):
-                continue
-        
-        # Get degree education information - directly from degree fields if available
-        degree_graduation_year = resume.get("degree_graduation_year")
-        degree_gpa = resume.get("degree_gpa")
-        
-        # Fallback to degree_info if direct fields not available
-        if degree_graduation_year is None or degree_gpa is None:
-            degree_info = resume.get("degree_info", {})
-            if not degree_info:
-                # Try to get from degree_education directly
-                degree_education = resume.get("degree_education", {})
-                if degree_education:
-                    degree_graduation_year = degree_education.get("graduation_year")
-                    degree_gpa = degree_education.get("gpa")
-            else:
-                degree_graduation_year = degree_info.get("graduation_year")
-                degree_gpa = degree_info.get("degree_gpa")
-        
-        # Check graduation year criteria (only for degree/B.Tech)
-        if graduation_year and degree_graduation_year:
-            if str(degree_graduation_year) != str(graduation_year):
-                continue
-        
-        # Check minimum GPA criteria (only for degree/B.Tech)
-        if min_gpa > 0 and degree_gpa:
-            try:
-                degree_gpa_float = float(degree_gpa)
-                if degree_gpa_float < float(min_gpa):
-                    continue
-            except (ValueError, TypeError):
-                # If GPA can't be converted to float, it doesn't match
-                continue
-        
-        # If all criteria pass, add to filtered results
-        filtered_resumes.append(resume)
-    
-    return filtered_resumes
+    query = ResumeQuery.from_criteria(skills, graduation_year, min_gpa)
+    positions = run_query(query, QueryIndex.from_resumes(resumes))
+    return [resumes[position] for position in positions]
 
 def get_degree_graduation_years(parsed_resumes):
     """Extract only graduation years from degree/B.Tech level education across all resumes."""
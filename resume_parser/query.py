@@ -0,0 +1,347 @@
+"""Filter queries over parsed resumes.
+
+A :class:`ResumeQuery` describes what to match (skills with AND/OR/NOT,
+graduation year range, GPA range, number of experience entries).
+:func:`compile_query` turns it into a :class:`QueryPlan` for one
+:class:`QueryIndex`: predicates that an index can answer are ordered by how
+many resumes they would let through, the smallest one produces the
+candidates, and the rest are checked against each candidate's precomputed
+:class:`ResumeFacts`. Nothing is re-parsed at query time.
+
+Degree year and GPA are resolved once, at ingest, by
+:func:`canonical_degree` and stored under ``degree_canonical``.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+CANONICAL_FIELD = 'degree_canonical'
+
+_YEAR = re.compile(r'\b(19|20)\d{2}\b')
+# "3.8", "3.8/4.0", "3.8 / 4"; anything else is not a usable GPA
+_GPA = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(?:/\s*\d+(?:\.\d+)?)?\s*$')
+
+
+def parse_year(value):
+    """Return ``value`` as an integer year, or None."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = _YEAR.search(str(value))
+    return int(match.group(0)) if match else None
+
+
+def parse_gpa(value):
+    """Return ``value`` as a float GPA, or None."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _GPA.match(str(value))
+    return float(match.group(1)) if match else None
+
+
+def canonical_degree(raw, formatted=None):
+    """Resolve the degree graduation year and GPA of a parse into typed values.
+
+    Each value is taken from the first source that has it: the direct
+    ``degree_*`` fields, then ``degree_education``, then ``degree_info`` of
+    the raw parse, then ``degree_info`` of the formatted view.
+
+    Returns:
+        Dict with 'graduation_year' (int or None) and 'gpa' (float or None)
+    """
+    raw = raw or {}
+    canonical = raw.get(CANONICAL_FIELD)
+    if canonical is not None:
+        return canonical
+
+    sources = [
+        (raw.get('degree_graduation_year'), raw.get('degree_gpa')),
+        ((raw.get('degree_education') or {}).get('graduation_year'), (raw.get('degree_education') or {}).get('gpa')),
+        ((raw.get('degree_info') or {}).get('graduation_year'), (raw.get('degree_info') or {}).get('degree_gpa')),
+        (((formatted or {}).get('degree_info') or {}).get('graduation_year'),
+         ((formatted or {}).get('degree_info') or {}).get('degree_gpa')),
+    ]
+    year = next((parse_year(y) for y, _ in sources if parse_year(y) is not None), None)
+    gpa = next((parse_gpa(g) for _, g in sources if parse_gpa(g) is not None), None)
+    return {'graduation_year': year, 'gpa': gpa}
+
+
+class ResumeFacts:
+    """The fields of one resume that queries look at, resolved once."""
+
+    __slots__ = ('skills', 'year', 'gpa', 'experience_count')
+
+    def __init__(self, skills, year, gpa, experience_count):
+        self.skills = skills
+        self.year = year
+        self.gpa = gpa
+        self.experience_count = experience_count
+
+    @classmethod
+    def from_parse(cls, raw, formatted=None):
+        """Build facts from a raw parse and, for stored records, its formatted view."""
+        source = formatted if formatted is not None else (raw or {})
+        degree = canonical_degree(raw, formatted)
+        return cls(frozenset(skill.lower() for skill in source.get('skills') or []),
+                   degree['graduation_year'], degree['gpa'],
+                   len(source.get('experience') or []))
+
+    @classmethod
+    def from_record(cls, record):
+        return cls.from_parse(record.get('raw_parsed_data'), record.get('parsed_data'))
+
+
+class ResumeQuery:
+    """Filter criteria for resumes.
+
+    Skills are matched case-insensitively: every skill in ``all_skills``,
+    at least one of ``any_skills`` and none of ``none_skills``. Ranges are
+    inclusive and ``None`` leaves that end open. As with the original
+    filters, a resume with no known graduation year or GPA is not excluded
+    by a year or GPA range unless ``include_missing`` is False.
+    """
+
+    def __init__(self, all_skills=(), any_skills=(), none_skills=(), year_min=None, year_max=None,
+                 gpa_min=None, gpa_max=None, min_experience=None, max_experience=None, include_missing=True):
+        self.all_skills = frozenset(skill.lower() for skill in all_skills if skill)
+        self.any_skills = frozenset(skill.lower() for skill in any_skills if skill)
+        self.none_skills = frozenset(skill.lower() for skill in none_skills if skill)
+        self.year_min = year_min
+        self.year_max = year_max
+        self.gpa_min = gpa_min
+        self.gpa_max = gpa_max
+        self.min_experience = min_experience
+        self.max_experience = max_experience
+        self.include_missing = include_missing
+
+    @classmethod
+    def from_criteria(cls, skills=None, graduation_year=None, min_gpa=0):
+        """Build the query the original ``skills``/``graduation_year``/``min_gpa`` filters describe."""
+        year = parse_year(graduation_year) if graduation_year else None
+        gpa = parse_gpa(min_gpa) if min_gpa else None
+        return cls(all_skills=skills or (), year_min=year, year_max=year,
+                   gpa_min=gpa if gpa and gpa > 0 else None)
+
+    @classmethod
+    def from_filter(cls, data):
+        """Build a query from the filter page's JSON body.
+
+        'skills', 'year' and 'degreeGpa' keep their original meaning (all skills,
+        exact degree year, minimum degree GPA); 'anySkills', 'excludeSkills',
+        'yearFrom'/'yearTo', 'maxGpa' and 'minExperience'/'maxExperience' refine it.
+
+        Raises:
+            ValueError, TypeError: if a value is not a number where one is expected
+        """
+        def number(key, convert):
+            value = data.get(key)
+            return convert(value) if value not in (None, '') else None
+
+        query = cls.from_criteria(data.get('skills', []), data.get('year', ''), data.get('degreeGpa', 0))
+        query.any_skills = frozenset(skill.lower() for skill in data.get('anySkills', []) if skill)
+        query.none_skills = frozenset(skill.lower() for skill in data.get('excludeSkills', []) if skill)
+        if data.get('yearFrom') or data.get('yearTo'):
+            query.year_min = number('yearFrom', int)
+            query.year_max = number('yearTo', int)
+        query.gpa_max = number('maxGpa', float)
+        query.min_experience = number('minExperience', int)
+        query.max_experience = number('maxExperience', int)
+        return query
+
+    def has_year_range(self):
+        return self.year_min is not None or self.year_max is not None
+
+    def has_gpa_range(self):
+        return self.gpa_min is not None or self.gpa_max is not None
+
+    def matches(self, facts):
+        """Check every criterion against one resume's facts."""
+        if not self.all_skills <= facts.skills:
+            return False
+        if self.any_skills and self.any_skills.isdisjoint(facts.skills):
+            return False
+        if self.none_skills and not self.none_skills.isdisjoint(facts.skills):
+            return False
+        if self.has_year_range() and not _in_range(facts.year, self.year_min, self.year_max, self.include_missing):
+            return False
+        if self.has_gpa_range() and not _in_range(facts.gpa, self.gpa_min, self.gpa_max, self.include_missing):
+            return False
+        if self.min_experience is not None and facts.experience_count < self.min_experience:
+            return False
+        if self.max_experience is not None and facts.experience_count > self.max_experience:
+            return False
+        return True
+
+
+def _in_range(value, low, high, include_missing):
+    if value is None:
+        return include_missing
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+RANGE_ATTRIBUTES = ('year', 'gpa')
+
+
+class RangeIndex:
+    """Resume ids by the value of one numeric fact (year or GPA), for range lookups.
+
+    ``postings`` maps each value to the set of ids that have it and
+    ``missing`` holds the ids without one. The distinct values are kept
+    sorted with running totals, so sizing a range takes two bisections and
+    its ids are only gathered when asked for.
+    """
+
+    def __init__(self, postings=None, missing=frozenset()):
+        self.postings = postings if postings is not None else {}
+        self.missing = missing
+        self.values = sorted(self.postings)
+        self._totals = list(accumulate(len(self.postings[value]) for value in self.values))
+
+    @classmethod
+    def build(cls, facts, attribute):
+        """Index ``attribute`` of every :class:`ResumeFacts` in ``facts``."""
+        postings = {}
+        missing = set()
+        for resume_id, resume_facts in facts.items():
+            value = getattr(resume_facts, attribute)
+            if value is None:
+                missing.add(resume_id)
+            else:
+                postings.setdefault(value, set()).add(resume_id)
+        return cls({value: frozenset(ids) for value, ids in postings.items()}, frozenset(missing))
+
+    def _bounds(self, low, high):
+        start = bisect_left(self.values, low) if low is not None else 0
+        end = bisect_right(self.values, high) if high is not None else len(self.values)
+        return start, max(start, end)
+
+    def count(self, low, high, include_missing):
+        """Return how many ids :meth:`ids` would return, without gathering them."""
+        start, end = self._bounds(low, high)
+        total = (self._totals[end - 1] if end else 0) - (self._totals[start - 1] if start else 0)
+        return total + (len(self.missing) if include_missing else 0)
+
+    def ids(self, low, high, include_missing):
+        """Return the ids whose value lies in [low, high], plus missing ones if asked."""
+        start, end = self._bounds(low, high)
+        selected = set()
+        for value in self.values[start:end]:
+            selected.update(self.postings[value])
+        if include_missing:
+            selected.update(self.missing)
+        return selected
+
+
+class QueryIndex:
+    """Indexes over a fixed set of resumes that query plans can draw candidates from.
+
+    ``facts`` maps a resume id to its :class:`ResumeFacts`. The skill index
+    and the year and GPA :class:`RangeIndex` can be supplied by the owner
+    (the corpus maintains them incrementally); otherwise each is built the
+    first time a plan needs it.
+    """
+
+    def __init__(self, facts, skill_index=None, ranges=None):
+        self.facts = facts
+        self._skill_index = skill_index
+        self._ranges = dict(ranges or {})
+
+    @classmethod
+    def from_resumes(cls, resumes):
+        """Index a list of raw parses, keyed by their position in the list."""
+        return cls({position: ResumeFacts.from_parse(resume)
+                    for position, resume in enumerate(resumes)
+                    if resume and isinstance(resume, dict)})
+
+    @property
+    def skill_index(self):
+        if self._skill_index is None:
+            index = {}
+            for resume_id, facts in self.facts.items():
+                for skill in facts.skills:
+                    index.setdefault(skill, set()).add(resume_id)
+            self._skill_index = {skill: frozenset(ids) for skill, ids in index.items()}
+        return self._skill_index
+
+    def ids_with_skill(self, skill):
+        return self.skill_index.get(skill, frozenset())
+
+    def range_index(self, attribute):
+        if attribute not in self._ranges:
+            self._ranges[attribute] = RangeIndex.build(self.facts, attribute)
+        return self._ranges[attribute]
+
+    def range_count(self, attribute, low, high, include_missing):
+        """Return how many ids :meth:`range_ids` would return, without gathering them."""
+        return self.range_index(attribute).count(low, high, include_missing)
+
+    def range_ids(self, attribute, low, high, include_missing):
+        """Return the ids whose ``attribute`` lies in [low, high], plus missing ones if asked."""
+        return self.range_index(attribute).ids(low, high, include_missing)
+
+
+class QueryPlan:
+    """An ordered set of index lookups followed by a per-resume check."""
+
+    def __init__(self, query, index, steps):
+        self.query = query
+        self.index = index
+        # (description, estimated size, thunk returning a set of ids), most selective first
+        self.steps = steps
+
+    def explain(self):
+        if not self.steps:
+            return ["scan all resumes"]
+        return [f"{description} (~{size})" for description, size, _ in self.steps]
+
+    def execute(self):
+        """Return the ids of matching resumes, sorted."""
+        if self.steps:
+            candidates = self.steps[0][2]()
+            # Intersecting with another index only pays off while it still narrows things down
+            for _, size, lookup in self.steps[1:]:
+                if not candidates or size > 4 * len(candidates):
+                    break
+                candidates = candidates & lookup()
+        else:
+            candidates = self.index.facts.keys()
+
+        facts = self.index.facts
+        return sorted(resume_id for resume_id in candidates if self.query.matches(facts[resume_id]))
+
+
+def compile_query(query, index):
+    """Plan ``query`` against ``index``, cheapest candidate source first."""
+    steps = []
+    for skill in query.all_skills:
+        ids = index.ids_with_skill(skill)
+        steps.append((f"skill {skill!r}", len(ids), lambda ids=ids: set(ids)))
+
+    if query.any_skills:
+        def any_ids():
+            selected = set()
+            for skill in query.any_skills:
+                selected.update(index.ids_with_skill(skill))
+            return selected
+        size = sum(len(index.ids_with_skill(skill)) for skill in query.any_skills)
+        steps.append((f"any of {sorted(query.any_skills)}", size, any_ids))
+
+    for attribute, low, high, active in (('year', query.year_min, query.year_max, query.has_year_range()),
+                                         ('gpa', query.gpa_min, query.gpa_max, query.has_gpa_range())):
+        if not active:
+            continue
+        # Sized by bisection; the ids are gathered only if this step is used
+        size = index.range_count(attribute, low, high, query.include_missing)
+        steps.append((f"{attribute} in [{low}, {high}]", size,
+                       lambda args=(attribute, low, high, query.include_missing): index.range_ids(*args)))
+
+    steps.sort(key=lambda step: step[1])
+    return QueryPlan(query, index, steps)
+
+
+def run_query(query, index):
+    """Compile and execute ``query`` against ``index``."""
+    return compile_query(query, index).execute()
@@ -0,0 +1,329 @@
+"""Bring stored resumes up to date with the current pipeline.
+
+Every parse records the version of each stage that produced it (see
+``parser.pipeline_metadata``): text extraction, the LLM prompt or each
+rule-based extractor, and the derived degree fields. This command compares
+those with the current versions and re-runs only the stages that changed:
+
+- ``derive``: recompute the degree fields from the stored education entries;
+  needs no text at all.
+- ``rules.<field>``: re-run one rule-based extractor and replace that field.
+- ``llm``: parse again with the LLM (falls back to rules as usual). Parses
+  that were shed to rules under load are retried here too.
+- ``extract``: extract the text again from the saved upload. If the text
+  comes out different, every parse stage is re-run on it. Uploads are
+  untrusted, so they are extracted in a sandbox process (see
+  ``resume_parser.sandbox``) at bulk priority, as the app does.
+
+Parse stages read the cleaned text from the artifact store and only fall
+back to extracting the upload when it is not there.
+
+The formatted view (``format_parsed_data``) is derived when a record is read,
+so changes to it need no reprocessing. Work is spread over processes and
+each finished record is appended to a checkpoint file; an interrupted run
+picks up where it stopped.
+
+Usage:
+    python -m resume_parser.reprocess [data_dir] [--uploads uploads] [--workers 4]
+        [--artifacts artifacts] [--checkpoint cache/reprocess_checkpoint.jsonl]
+        [--no-llm] [--dry-run] [--restart]
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import hashlib
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from resume_parser.parser import (clean_text, sniff_file_type, derive_degree_fields,
+                                  stage_versions, text_sha256, EXTRACTOR_VERSION, DERIVE_VERSION)
+from resume_parser.artifacts import ArtifactStore
+from resume_parser.sandbox import ExtractionPool
+from resume_parser.scheduler import Job, BULK
+from resume_parser.storage import RECORD_SUFFIX, LEGACY_SUFFIX, decode_record, write_record
+from resume_parser.model import ResumeParserModel, RULE_VERSIONS, current_model_name, prompt_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = os.path.join('cache', 'reprocess_checkpoint.jsonl')
+DEFAULT_ARTIFACTS = 'artifacts'
+
+# Reprocessing is bulk work: it yields the LLM and sandboxes to uploads and may
+# wait as long as an import does rather than be shed to the rules parser
+REPROCESS_JOB = Job(BULK, 'reprocess')
+REPROCESS_LLM_DEADLINE = float(os.environ.get('RESUME_REPROCESS_LLM_DEADLINE', '3600'))
+
+# One sandbox per reprocess worker process, started on first use
+_extraction_pool = None
+
+
+class ReprocessError(Exception):
+    """Raised when a record cannot be brought up to date."""
+
+
+def target_fingerprint(use_llm):
+    """Identify the pipeline a run brings records up to; checkpoints only count for the same one."""
+    parts = [EXTRACTOR_VERSION, DERIVE_VERSION, sorted(RULE_VERSIONS.items()),
+             prompt_version(current_model_name()), use_llm]
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def _order(stages):
+    return sorted(stages, key=lambda stage: {'extract': 0, 'derive': 2}.get(stage, 1))
+
+
+def stale_stages(raw, use_llm=True):
+    """Return the stages of ``raw``'s pipeline that are out of date, in the order they run."""
+    pipeline = raw.get('pipeline') or {}
+    method = pipeline.get('method')
+    if method is None:
+        # Parsed before stage versions were recorded: redo everything
+        return ['extract', 'llm' if use_llm else 'rules', 'derive']
+
+    stored = pipeline.get('versions') or {}
+    current = stage_versions(current_model_name(), method)
+    stages = [stage for stage in current if stored.get(stage) != current[stage]]
+    if use_llm and (raw.get('llm_fallback') or raw.get('llm_shed')) and 'llm' not in stages:
+        stages.append('llm')
+    return _order(stages)
+
+
+def source_path(record, resume_id, upload_dir):
+    """Return the path of the saved upload a record was parsed from."""
+    source = record.get('source_file')
+    if not source:
+        # Older records: uploads are saved as "<timestamp>_<original name>" and
+        # records as "<timestamp>_<original stem><suffix>"
+        source = f"{resume_id[:15]}_{record.get('filename')}"
+    return os.path.join(upload_dir, source)
+
+
+def sandboxed_extract(data, file_type=None):
+    """Extract ``data`` in this process's sandbox pool, with the app's extraction limits."""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ExtractionPool(
+            workers=1,
+            timeout=float(os.environ.get('RESUME_EXTRACTION_TIMEOUT', '30')),
+            cpu_seconds=int(os.environ.get('RESUME_EXTRACTION_CPU_SECONDS', '20')),
+            memory_bytes=int(os.environ.get('RESUME_EXTRACTION_MEMORY_MB', '1024')) * 1024 * 1024,
+            jobs_per_worker=int(os.environ.get('RESUME_EXTRACTION_JOBS_PER_WORKER', '50')))
+        atexit.register(_extraction_pool.close)
+    return _extraction_pool.extract(data, file_type, job=REPROCESS_JOB)
+
+
+def load_text(record, resume_id, upload_dir, artifacts=None, reextract=False, extractor=None):
+    """Return the cleaned text a record was parsed from.
+
+    The text comes from the artifact store unless ``reextract`` is set or it
+    is missing there; then the original upload is extracted again by
+    ``extractor`` (default: :func:`sandboxed_extract`) and the result stored
+    for next time.
+
+    Returns:
+        Tuple of (cleaned text, address of the extracted text or None)
+    """
+    pipeline = (record.get('raw_parsed_data') or {}).get('pipeline') or {}
+    if artifacts is not None and not reextract:
+        text = artifacts.get_text(pipeline.get('text_sha256'))
+        if text is not None:
+            return text, pipeline.get('raw_text_sha256')
+
+    path = source_path(record, resume_id, upload_dir)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        raise ReprocessError(f"upload {path} not found")
+    expected = record.get('content_sha256')
+    if expected and hashlib.sha256(data).hexdigest() != expected:
+        raise ReprocessError(f"upload {path} does not match the stored content hash")
+    raw_text = (extractor or sandboxed_extract)(data, sniff_file_type(data))
+    text = clean_text(raw_text)
+    if artifacts is not None:
+        artifacts.put(raw_text)
+        artifacts.put(text)
+    return text, text_sha256(raw_text)
+
+
+def reprocess_record(data_dir, resume_id, upload_dir='uploads', use_llm=True, dry_run=False,
+                     artifact_dir=DEFAULT_ARTIFACTS):
+    """Re-run the stale stages of one stored record.
+
+    Returns:
+        Tuple of (resume_id, stages run, error message or None)
+    """
+    path = os.path.join(data_dir, resume_id)
+    try:
+        if not resume_id.endswith(RECORD_SUFFIX):
+            raise ReprocessError("legacy record; run `python -m resume_parser.storage convert` first")
+        with open(path, 'rb') as f:
+            record = decode_record(f.read())
+        raw = record.get('raw_parsed_data') or {}
+        stages = stale_stages(raw, use_llm)
+        if not stages or dry_run:
+            return resume_id, stages, None
+
+        # Loaded only once there is work to do; dry runs never load spaCy
+        model = ResumeParserModel()
+
+        pipeline = raw.get('pipeline') or {}
+        method = pipeline.get('method', 'rules')
+        text_hash = pipeline.get('text_sha256')
+        raw_text_hash = pipeline.get('raw_text_sha256')
+        versions = dict(pipeline.get('versions') or {})
+        ran = []
+
+        text = None
+        if any(stage != 'derive' for stage in stages):
+            artifacts = ArtifactStore(artifact_dir) if artifact_dir else None
+            text, raw_text_hash = load_text(record, resume_id, upload_dir, artifacts,
+                                            reextract='extract' in stages)
+            if text_sha256(text) != text_hash:
+                # New text invalidates everything parsed from the old one
+                reparse = 'llm' if method == 'llm' or 'llm' in stages else 'rules'
+                if reparse == 'llm' and not use_llm:
+                    raise ReprocessError("extracted text changed; the LLM parse must be redone without --no-llm")
+                stages = [stage for stage in stages if stage == 'extract'] + [reparse, 'derive']
+                text_hash = text_sha256(text)
+                if raw.get('minhash_signature') is not None:
+                    from resume_parser.dedup import MinHashLSH
+                    raw['minhash_signature'] = MinHashLSH().signature(text)
+            if 'extract' in stages:
+                versions['extract'] = EXTRACTOR_VERSION
+                ran.append('extract')
+
+        if 'llm' in stages and use_llm or 'rules' in stages:
+            parsed = model.parse_resume(text, use_llm='llm' in stages and use_llm,
+                                        deadline=time.monotonic() + REPROCESS_LLM_DEADLINE, job=REPROCESS_JOB)
+            method = parsed.pop('parse_method', 'rules')
+            raw.pop('llm_shed', None)
+            raw.pop('llm_fallback', None)
+            raw.update(parsed)
+            versions = {key: value for key, value in versions.items()
+                        if key in ('extract', 'derive')}
+            versions.update({key: value for key, value in stage_versions(model.model, method).items()
+                             if key not in ('extract', 'derive')})
+            ran.append('llm' if method == 'llm' else 'rules')
+        else:
+            fields = [stage.split('.', 1)[1] for stage in stages if stage.startswith('rules.')]
+            if fields:
+                raw.update(model.parse_with_rules(text, fields))
+                current = stage_versions(model.model, method)
+                versions.update({f"rules.{field}": current[f"rules.{field}"] for field in fields})
+                ran.extend(f"rules.{field}" for field in fields)
+
+        if ran or 'derive' in stages:
+            derive_degree_fields(raw, model)
+            versions['derive'] = DERIVE_VERSION
+            ran.append('derive')
+        if not ran:
+            # Only LLM stages were stale and --no-llm was given
+            return resume_id, [], None
+
+        raw['pipeline'] = {'method': method, 'versions': versions, 'text_sha256': text_hash}
+        if raw_text_hash:
+            raw['pipeline']['raw_text_sha256'] = raw_text_hash
+        record['raw_parsed_data'] = raw
+        write_record(path, record)
+        return resume_id, ran, None
+    except Exception as e:
+        return resume_id, [], str(e)
+
+
+def read_checkpoint(path, target):
+    """Return the ids already finished by earlier runs towards ``target``."""
+    done = set()
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a partial last line
+                    continue
+                if entry.get('target') == target and not entry.get('error'):
+                    done.add(entry['id'])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def reprocess_corpus(data_dir, upload_dir='uploads', workers=None, checkpoint=DEFAULT_CHECKPOINT,
+                     use_llm=True, dry_run=False, restart=False, artifact_dir=DEFAULT_ARTIFACTS):
+    """Bring every stored record in ``data_dir`` up to date.
+
+    Returns:
+        Dict counting records 'updated', 'current', 'failed' and 'skipped' (finished by an earlier run)
+    """
+    target = target_fingerprint(use_llm)
+    if restart and checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    done = read_checkpoint(checkpoint, target) if checkpoint and not dry_run else set()
+    names = sorted(name for name in os.listdir(data_dir)
+                   if name.endswith((RECORD_SUFFIX, LEGACY_SUFFIX)))
+    pending = [name for name in names if name not in done]
+    counts = {'updated': 0, 'current': 0, 'failed': 0, 'skipped': len(names) - len(pending)}
+
+    log = None
+    if checkpoint and not dry_run:
+        directory = os.path.dirname(checkpoint)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        log = open(checkpoint, 'a', encoding='utf-8')
+
+    def record_result(resume_id, stages, error):
+        if error:
+            counts['failed'] += 1
+            logger.error(f"{resume_id}: {error}")
+        elif stages:
+            counts['updated'] += 1
+            logger.info(f"{resume_id}: {'would run' if dry_run else 'ran'} {', '.join(stages)}")
+        else:
+            counts['current'] += 1
+        if log is not None:
+            log.write(json.dumps({'id': resume_id, 'target': target, 'stages': stages, 'error': error}) + '\n')
+            log.flush()
+
+    try:
+        if workers == 1:
+            for name in pending:
+                record_result(*reprocess_record(data_dir, name, upload_dir, use_llm, dry_run, artifact_dir))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(reprocess_record, data_dir, name, upload_dir, use_llm, dry_run,
+                                           artifact_dir)
+                           for name in pending]
+                for future in as_completed(futures):
+                    record_result(*future.result())
+    finally:
+        if log is not None:
+            log.close()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run outdated pipeline stages on stored resumes.")
+    parser.add_argument('data_dir', nargs='?', default='parsed_data')
+    parser.add_argument('--uploads', default='uploads', help="Directory holding the original uploads")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACTS, help="Artifact store holding cached text")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--no-llm', action='store_true', help="Never call the LLM; LLM stages are left as they are")
+    parser.add_argument('--dry-run', action='store_true', help="Only report which stages would run")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint of an earlier run")
+    args = parser.parse_args(argv)
+
+    counts = reprocess_corpus(args.data_dir, args.uploads, args.workers, args.checkpoint,
+                              use_llm=not args.no_llm, dry_run=args.dry_run, restart=args.restart,
+                              artifact_dir=args.artifacts)
+    print(f"{counts['updated']} {'to update' if args.dry_run else 'updated'}, {counts['current']} current, "
+          f"{counts['failed']} failed, {counts['skipped']} done in an earlier run")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Text extraction in sandboxed, recyclable worker processes.
+
+PDF parsing, DOCX unzipping and OCR run on untrusted uploads. A malformed
+PDF can make PyPDF2 loop for minutes and a decompression-bomb image can
+exhaust memory, so :class:`ExtractionPool` runs ``extract_text`` in
+separate processes instead of the web worker:
+
+- each worker's address space is capped (``RLIMIT_AS``), so an allocation
+  past the cap fails inside the worker instead of swapping the host;
+- each job gets a CPU-time budget (``RLIMIT_CPU``, raised per job) and a
+  wall-clock watchdog in the parent, which kills a worker that has not
+  answered in time;
+- a worker exits after ``jobs_per_worker`` jobs, so memory crept up by
+  extraction libraries is returned to the OS, and is replaced on demand.
+
+Workers are fresh interpreters (``python -m resume_parser.sandbox``) that
+exchange length-prefixed pickles with the parent over stdin and stdout, so
+nothing of the web process, its threads or its ``__main__`` module is
+copied into them.
+
+A job that hits a limit raises :class:`ExtractionError` for that upload only;
+its worker is replaced and other uploads carry on. Resource limits need the
+``resource`` module (Unix); elsewhere only the watchdog applies.
+"""
+import os
+import sys
+import time
+import queue
+import pickle
+import signal
+import struct
+import logging
+import argparse
+import threading
+import subprocess
+
+from resume_parser.concurrency import DeadlineExceeded
+from resume_parser.scheduler import PriorityScheduler, INTERACTIVE, INTERACTIVE_JOB
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_FRAME = struct.Struct('>Q')
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ExtractionError(Exception):
+    """Raised when a file could not be extracted within the sandbox limits."""
+
+
+def _write_frame(stream, obj):
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    # Two writes rather than concatenating, which would copy the whole upload again
+    stream.write(_FRAME.pack(len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def _read_frame(stream):
+    """Read one frame; raises EOFError when the other side has gone away."""
+    header = stream.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        raise EOFError
+    size = _FRAME.unpack(header)[0]
+    payload = stream.read(size)
+    if len(payload) < size:
+        raise EOFError
+    return pickle.loads(payload)
+
+
+def _set_memory_limit(memory_bytes):
+    if resource is None or not memory_bytes:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = memory_bytes if hard == resource.RLIM_INFINITY else min(memory_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _set_cpu_budget(cpu_seconds):
+    """Allow ``cpu_seconds`` more CPU time from now; past it the kernel sends SIGXCPU."""
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    limit = int(usage.ru_utime + usage.ru_stime) + int(cpu_seconds) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+
+
+def serve(memory_bytes, cpu_seconds, jobs, max_image_pixels):
+    """Worker loop: answer extraction jobs on stdin/stdout until recycled or orphaned."""
+    # Keep the protocol stream to ourselves; anything printed goes to stderr
+    requests = sys.stdin.buffer
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    sys.stdout = sys.stderr
+    # The parent handles Ctrl-C and shuts workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    _set_memory_limit(memory_bytes)
+    from resume_parser.parser import extract_text
+    if max_image_pixels:
+        try:
+            from PIL import Image
+            Image.MAX_IMAGE_PIXELS = max_image_pixels
+        except ImportError:
+            pass
+
+    for _ in range(jobs):
+        try:
+            data, file_type = _read_frame(requests)
+        except EOFError:
+            return
+        _set_cpu_budget(cpu_seconds)
+        try:
+            _write_frame(replies, ('ok', extract_text(data, file_type)))
+        except MemoryError:
+            # Whatever was allocated may still be pinned; exit so the parent starts a fresh worker
+            _write_frame(replies, ('error', f"memory limit of {memory_bytes // (1024 * 1024)} MB exceeded"))
+            return
+        except Exception as e:
+            _write_frame(replies, ('error', f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """One sandbox process and the pipes to it."""
+
+    def __init__(self, pool):
+        command = [sys.executable, '-m', 'resume_parser.sandbox',
+                   '--memory-bytes', str(pool.memory_bytes or 0), '--cpu-seconds', str(pool.cpu_seconds or 0),
+                   '--jobs', str(pool.jobs_per_worker), '--max-image-pixels', str(pool.max_image_pixels or 0)]
+        python_path = os.pathsep.join(filter(None, [_PACKAGE_ROOT, os.environ.get('PYTHONPATH')]))
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        env=dict(os.environ, PYTHONPATH=python_path))
+        self.jobs = 0
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def call(self, data, file_type, timeout):
+        """Run one job; returns ('ok'|'error'|'died', result), or None if it did not answer in time."""
+        reply = []
+
+        def read():
+            try:
+                reply.append(_read_frame(self.process.stdout))
+            except (EOFError, OSError, pickle.UnpicklingError):
+                pass
+
+        try:
+            _write_frame(self.process.stdin, (data, file_type))
+        except OSError:
+            return 'died', None
+        # Read on a helper thread so that the wait can time out on every platform
+        reader = threading.Thread(target=read, name='extraction-reply', daemon=True)
+        reader.start()
+        reader.join(timeout)
+        if reader.is_alive():
+            return None
+        return reply[0] if reply else ('died', None)
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def describe_exit(self, cpu_seconds):
+        try:
+            code = self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            return "extraction worker stopped answering"
+        if code == -getattr(signal, 'SIGXCPU', 0):
+            return f"CPU time limit of {cpu_seconds} s exceeded"
+        if code < 0:
+            return f"extraction worker killed by signal {-code}"
+        return f"extraction worker exited with status {code}"
+
+
+class ExtractionPool:
+    """Pool of sandboxed processes running ``extract_text``.
+
+    Workers are started on first use and handed out one job at a time by a
+    :class:`PriorityScheduler`, with ``reserved_interactive`` of them kept
+    free for interactive uploads. Interactive callers wait up to ``timeout``
+    seconds for a worker; bulk callers wait as long as it takes. The pool is
+    safe to share between threads.
+    """
+
+    def __init__(self, workers=2, timeout=30.0, cpu_seconds=20, memory_bytes=1024 * 1024 * 1024,
+                 jobs_per_worker=50, max_image_pixels=50_000_000, reserved_interactive=1, tenant_limit=None):
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.jobs_per_worker = jobs_per_worker
+        self.max_image_pixels = max_image_pixels
+
+        self._idle = queue.LifoQueue()
+        # With a single worker nothing can be reserved without stalling bulk work entirely
+        self.scheduler = PriorityScheduler(workers, reserved={INTERACTIVE: min(reserved_interactive, workers - 1)},
+                                           tenant_limit=tenant_limit)
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._closed = False
+
+        self._started = 0
+        self._recycled = 0
+        self._killed = 0
+        self._failed = 0
+
+    def extract(self, data, file_type=None, job=INTERACTIVE_JOB):
+        """Extract the text of ``data`` (bytes) in a sandbox worker on behalf of ``job``.
+
+        Raises:
+            ExtractionError: if the file hit a time or memory limit, crashed its
+                worker, or (interactive jobs) no worker became free within ``timeout`` seconds
+        """
+        deadline = time.monotonic() + self.timeout if job.priority == INTERACTIVE else None
+        try:
+            self.scheduler.acquire(job, deadline)
+        except DeadlineExceeded:
+            raise ExtractionError(f"no extraction worker free within {self.timeout} s")
+        try:
+            worker = self._checkout()
+            reply = worker.call(data if isinstance(data, (bytes, bytearray)) else bytes(data), file_type,
+                                self.timeout)
+            if reply is None:
+                self._discard(worker, killed=True)
+                raise ExtractionError(f"extraction took longer than {self.timeout} s")
+            status, result = reply
+            if status == 'died':
+                reason = worker.describe_exit(self.cpu_seconds)
+                self._discard(worker, killed=True)
+                raise ExtractionError(reason)
+
+            worker.jobs += 1
+            if (status == 'error' and 'memory limit' in result) or worker.jobs >= self.jobs_per_worker:
+                # The worker exits by itself after its last job
+                self._discard(worker, killed=False)
+            else:
+                self._idle.put(worker)
+            if status == 'error':
+                with self._lock:
+                    self._failed += 1
+                raise ExtractionError(result)
+            return result
+        finally:
+            self.scheduler.release(job)
+
+    def _checkout(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker.alive():
+                return worker
+            self._discard(worker, killed=False)
+        with self._lock:
+            if self._closed:
+                raise ExtractionError("extraction pool is closed")
+            worker = _Worker(self)
+            self._workers.add(worker)
+            self._started += 1
+        return worker
+
+    def _discard(self, worker, killed):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            if killed:
+                self._killed += 1
+                logger.warning(f"Killed extraction worker {worker.pid}")
+            else:
+                self._recycled += 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'workers': len(self._workers),
+                'started': self._started,
+                'recycled': self._recycled,
+                'killed': self._killed,
+                'failed_jobs': self._failed,
+            }
+
+    def close(self):
+        """Stop every worker; later calls to :meth:`extract` fail."""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extraction sandbox worker; started by ExtractionPool.")
+    parser.add_argument('--memory-bytes', type=int, default=0)
+    parser.add_argument('--cpu-seconds', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=50)
+    parser.add_argument('--max-image-pixels', type=int, default=0)
+    args = parser.parse_args(argv)
+    serve(args.memory_bytes, args.cpu_seconds, args.jobs, args.max_image_pixels)
+
+
+if __name__ == '__main__':
+    main()
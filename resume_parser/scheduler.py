@@ -0,0 +1,295 @@
+"""Priority scheduling of parse stages between interactive and bulk work.
+
+A recruiter waiting on the ``/upload`` redirect and a 20k-file import both
+need the same scarce stages: sandboxed extraction (including OCR) and LLM
+calls. :class:`PriorityScheduler` sits in front of such a stage and decides
+which waiting job gets the next free slot:
+
+- Each job carries a :class:`Job` naming its priority class and tenant
+  (a customer, or one import batch).
+- Classes share the stage by weighted fair queuing: with weights 8:1,
+  interactive jobs get eight slots for every bulk slot while both are
+  waiting, and either may use the whole stage while the other is idle.
+  Each job is given virtual start and finish times when it is queued
+  (start-time fair queuing) and the lowest finish time is granted first.
+- Within a class, tenants take turns, so one large import cannot starve a
+  smaller one, and ``tenant_limit`` caps how many slots one tenant holds.
+- ``reserved`` slots are held back for a class: bulk work never fills the
+  last free slot that is reserved for interactive work, so an interactive
+  job starts as soon as it arrives instead of waiting behind a bulk call.
+  Reservations are clamped to ``capacity - 1``, so every class keeps at
+  least one slot when an adaptive capacity shrinks.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+
+from resume_parser.concurrency import DeadlineExceeded, llm_limiter
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+DEFAULT_TENANT = 'default'
+
+
+class QuotaExceeded(Exception):
+    """Raised when a tenant already has as many jobs queued as it may."""
+
+
+class Job:
+    """Who a unit of work is for: its priority class and tenant."""
+
+    __slots__ = ('priority', 'tenant')
+
+    def __init__(self, priority=INTERACTIVE, tenant=DEFAULT_TENANT):
+        self.priority = priority
+        self.tenant = tenant or DEFAULT_TENANT
+
+    def __repr__(self):
+        return f"Job({self.priority!r}, {self.tenant!r})"
+
+
+INTERACTIVE_JOB = Job(INTERACTIVE)
+
+
+class _Waiter:
+    __slots__ = ('condition', 'tenant', 'granted', 'enqueued')
+
+    def __init__(self, condition, tenant):
+        self.condition = condition
+        self.tenant = tenant
+        self.granted = False
+        self.enqueued = time.monotonic()
+
+
+class _Class:
+    """Queues and counters of one priority class."""
+
+    def __init__(self, weight, reserved):
+        self.weight = float(weight)
+        self.reserved = reserved
+        self.finish = 0.0               # virtual finish time of the last job queued
+        self.tags = deque()             # (start, finish) virtual times of queued jobs, oldest first
+        self.tenants = OrderedDict()    # tenant -> deque of waiters, in round-robin order
+        self.in_flight = 0
+        self.started = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_ewma = None
+
+    def has_waiters(self):
+        return bool(self.tenants)
+
+
+class PriorityScheduler:
+    """Weighted fair admission to a stage with ``capacity`` concurrent slots.
+
+    ``capacity`` may be a callable, e.g. ``lambda: llm_limiter.limit``, for a
+    stage whose concurrency is itself adaptive; waiters then re-check every
+    ``recheck_interval`` seconds as it changes.
+    """
+
+    def __init__(self, capacity, weights=None, reserved=None, tenant_limit=None, max_queued_per_tenant=None,
+                 recheck_interval=0.5):
+        self._capacity = capacity
+        weights = weights or {INTERACTIVE: 8, BULK: 1}
+        reserved = reserved or {}
+        self._classes = {name: _Class(weight, reserved.get(name, 0)) for name, weight in weights.items()}
+        self.tenant_limit = tenant_limit
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.recheck_interval = recheck_interval
+
+        self._lock = threading.Lock()
+        self._virtual = 0.0
+        self._in_flight = 0
+        self._tenant_in_flight = {}
+
+    @property
+    def capacity(self):
+        capacity = self._capacity() if callable(self._capacity) else self._capacity
+        return max(1, int(capacity))
+
+    def _class(self, job):
+        try:
+            return self._classes[job.priority]
+        except KeyError:
+            raise ValueError(f"Unknown priority class {job.priority!r}") from None
+
+    def _free_for(self, cls):
+        """Slots ``cls`` may take now, leaving other classes' unused reservations alone.
+
+        Reservations never hold back the last slot: an adaptive capacity can
+        drop to 1, and a class must not be shut out of the stage entirely.
+        """
+        capacity = self.capacity
+        held_back = sum(max(0, other.reserved - other.in_flight)
+                        for other in self._classes.values() if other is not cls)
+        return capacity - self._in_flight - min(held_back, capacity - 1)
+
+    def _tenant_has_room(self, tenant):
+        return self.tenant_limit is None or self._tenant_in_flight.get(tenant, 0) < self.tenant_limit
+
+    def _next_tenant(self, cls):
+        for tenant in cls.tenants:
+            if self._tenant_has_room(tenant):
+                return tenant
+        return None
+
+    def _dispatch(self):
+        """Grant free slots to waiting jobs, lowest virtual finish time first.
+
+        A class's tags are its jobs' places in line, whichever of its tenants
+        is served; the tenant is picked round-robin.
+        """
+        while True:
+            best = None
+            for cls in self._classes.values():
+                if not cls.has_waiters() or self._free_for(cls) <= 0:
+                    continue
+                tenant = self._next_tenant(cls)
+                if tenant is None:
+                    continue
+                tag = cls.tags[0][1]
+                if best is None or tag < best[0]:
+                    best = (tag, cls, tenant)
+            if best is None:
+                return
+            _, cls, tenant = best
+            start, _ = cls.tags.popleft()
+            # System virtual time is the start time of the job in service
+            self._virtual = max(self._virtual, start)
+            waiters = cls.tenants[tenant]
+            waiter = waiters.popleft()
+            # Round-robin: this tenant goes to the back of its class
+            del cls.tenants[tenant]
+            if waiters:
+                cls.tenants[tenant] = waiters
+            self._grant(cls, tenant, waiter)
+            waiter.condition.notify()
+
+    def _grant(self, cls, tenant, waiter):
+        cls.in_flight += 1
+        cls.started += 1
+        self._in_flight += 1
+        self._tenant_in_flight[tenant] = self._tenant_in_flight.get(tenant, 0) + 1
+        waiter.granted = True
+        waited = time.monotonic() - waiter.enqueued
+        cls.wait_ewma = waited if cls.wait_ewma is None else cls.wait_ewma + 0.1 * (waited - cls.wait_ewma)
+
+    def acquire(self, job=INTERACTIVE_JOB, deadline=None):
+        """Wait for a slot for ``job``.
+
+        Args:
+            deadline: time.monotonic() value after which to give up, or None to wait
+
+        Raises:
+            DeadlineExceeded: if no slot was granted before ``deadline``
+            QuotaExceeded: if the tenant already has ``max_queued_per_tenant`` jobs waiting
+        """
+        with self._lock:
+            cls = self._class(job)
+            tenant = job.tenant
+            queue = cls.tenants.get(tenant)
+            if queue is not None and self.max_queued_per_tenant is not None \
+                    and len(queue) >= self.max_queued_per_tenant:
+                cls.rejected += 1
+                raise QuotaExceeded(f"Tenant {tenant!r} already has {len(queue)} {job.priority} jobs queued")
+            if queue is None:
+                queue = cls.tenants[tenant] = deque()
+            waiter = _Waiter(threading.Condition(self._lock), tenant)
+            queue.append(waiter)
+            start = max(self._virtual, cls.finish)
+            cls.finish = start + 1.0 / cls.weight
+            cls.tags.append((start, cls.finish))
+            # Usually grants the slot right away; otherwise the waiter is queued fairly
+            self._dispatch()
+
+            while not waiter.granted:
+                timeout = self.recheck_interval
+                if deadline is not None:
+                    timeout = min(timeout, deadline - time.monotonic())
+                    if timeout <= 0:
+                        self._remove(cls, waiter)
+                        cls.timed_out += 1
+                        raise DeadlineExceeded(f"No {job.priority} slot free before the deadline")
+                waiter.condition.wait(timeout)
+                if not waiter.granted:
+                    # Capacity may have grown without a release
+                    self._dispatch()
+            return job
+
+    def _remove(self, cls, waiter):
+        queue = cls.tenants.get(waiter.tenant)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        if not queue:
+            del cls.tenants[waiter.tenant]
+        # The class has one job fewer in line; give up the last place it was given
+        start, _ = cls.tags.pop()
+        cls.finish = start
+
+    def release(self, job):
+        """Give back the slot taken by :meth:`acquire` for ``job``."""
+        with self._lock:
+            cls = self._class(job)
+            cls.in_flight -= 1
+            self._in_flight -= 1
+            remaining = self._tenant_in_flight.get(job.tenant, 1) - 1
+            if remaining:
+                self._tenant_in_flight[job.tenant] = remaining
+            else:
+                self._tenant_in_flight.pop(job.tenant, None)
+            self._dispatch()
+
+    def slot(self, job=INTERACTIVE_JOB, deadline=None):
+        """Context manager holding a slot for ``job`` for the duration of the block."""
+        return _Slot(self, job, deadline)
+
+    def metrics(self):
+        """Return per-class queue depth, slots in use, counters and smoothed queueing delay."""
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'in_flight': self._in_flight,
+                'classes': {
+                    name: {
+                        'weight': cls.weight,
+                        'reserved': cls.reserved,
+                        'in_flight': cls.in_flight,
+                        'queued': sum(len(queue) for queue in cls.tenants.values()),
+                        'tenants_queued': len(cls.tenants),
+                        'started': cls.started,
+                        'rejected': cls.rejected,
+                        'timed_out': cls.timed_out,
+                        'wait_ewma': cls.wait_ewma,
+                    }
+                    for name, cls in self._classes.items()
+                },
+            }
+
+
+class _Slot:
+    def __init__(self, scheduler, job, deadline):
+        self.scheduler = scheduler
+        self.job = job
+        self.deadline = deadline
+
+    def __enter__(self):
+        self.scheduler.acquire(self.job, self.deadline)
+        return self.job
+
+    def __exit__(self, *exc_info):
+        self.scheduler.release(self.job)
+        return False
+
+
+# LLM calls from every request in the process; capacity follows the adaptive limit
+llm_scheduler = PriorityScheduler(
+    lambda: llm_limiter.limit,
+    weights={INTERACTIVE: int(os.environ.get('RESUME_INTERACTIVE_WEIGHT', '8')), BULK: 1},
+    reserved={INTERACTIVE: int(os.environ.get('RESUME_LLM_RESERVED_INTERACTIVE', '1'))},
+    tenant_limit=int(os.environ['RESUME_TENANT_LLM_LIMIT']) if os.environ.get('RESUME_TENANT_LLM_LIMIT') else None)
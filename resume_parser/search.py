@@ -0,0 +1,142 @@
+import re
+import math
+import heapq
+import threading
+from collections import Counter
+
+from resume_parser.corpus import REMOVED
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*')
+
+STOP_WORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "our", "the", "to", "we", "with", "you", "your", "will", "who",
+    "have", "has", "this", "that", "must", "should", "experience", "years", "strong"
+])
+
+# Relative weight of each field when computing term frequencies
+FIELD_WEIGHTS = {
+    "skills": 3.0,
+    "experience": 1.0,
+    "education": 1.0,
+}
+
+
+def tokenize(text):
+    """Split text into lowercase search terms, keeping tokens like c++, c# and node.js intact."""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def resume_fields(record):
+    """Return the searchable text of a stored record, grouped by field."""
+    raw = record.get('raw_parsed_data') or {}
+
+    experience = []
+    for exp in raw.get('experience', []) or []:
+        if isinstance(exp, dict):
+            experience.extend(str(exp.get(key) or '') for key in ('position', 'company', 'description'))
+
+    education = []
+    for edu in raw.get('education', []) or []:
+        if isinstance(edu, dict):
+            education.extend(str(edu.get(key) or '') for key in ('degree', 'institution'))
+
+    return {
+        "skills": " ".join(str(skill) for skill in raw.get('skills', []) or []),
+        "experience": " ".join(experience),
+        "education": " ".join(education),
+    }
+
+
+class BM25Index:
+    """Incrementally maintained Okapi BM25 index.
+
+    Postings map each term to ``{doc_id: weighted term frequency}``. Document
+    frequencies and the average document length are derived from the postings
+    at query time, so adding or removing a document only touches that
+    document's own terms.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, field_weights=None):
+        self.k1 = k1
+        self.b = b
+        self.field_weights = field_weights or FIELD_WEIGHTS
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    def add(self, doc_id, fields):
+        """Index (or re-index) a document given as ``{field: text}``."""
+        frequencies = Counter()
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for token in tokenize(text):
+                frequencies[token] += weight
+
+        with self._lock:
+            self.remove(doc_id)
+            for term, tf in frequencies.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(frequencies.values())
+            self._doc_terms[doc_id] = tuple(frequencies)
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+
+    def remove(self, doc_id):
+        """Remove a document from the index if present."""
+        with self._lock:
+            terms = self._doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def search(self, query, k=10):
+        """Return the ``k`` best ``(doc_id, score)`` pairs for a free-text query."""
+        terms = Counter(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            k1 = self.k1
+            # Per-document length normalisation is shared by every query term
+            length_scale = k1 * self.b / avg_length
+            length_base = k1 * (1 - self.b)
+            doc_lengths = self._doc_lengths
+            scores = {}
+
+            for term, query_tf in terms.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                weight = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * query_tf * (k1 + 1)
+                for doc_id, tf in postings.items():
+                    norm = length_base + length_scale * doc_lengths[doc_id]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norm)
+
+        # Partial selection keeps this O(n log k) instead of sorting every match
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def corpus_listener(self, kind, resume_id, record):
+        """Keep the index in sync with a :class:`ResumeCorpus`."""
+        if kind == REMOVED:
+            self.remove(resume_id)
+        else:
+            self.add(resume_id, resume_fields(record))
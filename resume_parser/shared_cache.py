@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """Key-value cache shared by every worker process on the host.
+
+    Entries live in a SQLite database (WAL mode) rather than in process
+    memory, so adding workers does not multiply the cache and a value
+    computed by one worker is reused by the others. Values are stored as
+    JSON with an optional TTL; once the cache holds more than
+    ``max_entries`` entries or ``max_bytes`` of values, the least recently
+    used ones are evicted. Triggers keep the entry count and total size in
+    a one-row ``totals`` table, so checking the limits on a write does not
+    scan the table.
+
+    Each namespace has a generation counter. Entries remember the generation
+    they were written under and are ignored once :meth:`bump_generation` has
+    moved the namespace on, so a worker that changes the data (e.g. a new
+    upload) invalidates everyone else's cached copies in one write.
+    """
+
+    def __init__(self, path, max_entries=10000, max_bytes=256 * 1024 * 1024, touch_interval=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Recency is only rewritten when it is this stale, to keep reads from becoming writes
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    generation INTEGER NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+                CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at) WHERE expires_at IS NOT NULL;
+                CREATE TABLE IF NOT EXISTS generations (
+                    namespace TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+            """)
+            # One transaction, so workers starting together seed the totals once
+            conn.executescript("""
+                BEGIN IMMEDIATE;
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO totals (id, entries, bytes)
+                    SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM entries;
+                CREATE TRIGGER IF NOT EXISTS entries_inserted AFTER INSERT ON entries BEGIN
+                    UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0;
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_deleted AFTER DELETE ON entries BEGIN
+                    UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0;
+                END;
+                CREATE TRIGGER IF NOT EXISTS entries_resized AFTER UPDATE OF size ON entries BEGIN
+                    UPDATE totals SET bytes = bytes + NEW.size - OLD.size WHERE id = 0;
+                END;
+                COMMIT;
+            """)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            # Connections must not be shared across threads or forked workers
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def generation(self, namespace):
+        """Return the current generation of ``namespace``."""
+        row = self._connection().execute(
+            "SELECT value FROM generations WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self, namespace):
+        """Invalidate every entry of ``namespace`` in all processes."""
+        conn = self._connection()
+        conn.execute("""
+            INSERT INTO generations (namespace, value) VALUES (?, 1)
+            ON CONFLICT (namespace) DO UPDATE SET value = value + 1
+        """, (namespace,))
+        # Entries of older generations can never be read again
+        conn.execute("""
+            DELETE FROM entries WHERE namespace = ?
+            AND generation < (SELECT value FROM generations WHERE namespace = ?)
+        """, (namespace, namespace))
+
+    def get(self, namespace, key, default=None):
+        """Return the cached value, or ``default`` if missing, expired or invalidated."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute("""
+                SELECT e.value, e.last_access FROM entries e
+                LEFT JOIN generations g ON g.namespace = e.namespace
+                WHERE e.namespace = ? AND e.key = ?
+                AND e.generation = COALESCE(g.value, 0)
+                AND (e.expires_at IS NULL OR e.expires_at > ?)
+            """, (namespace, key, now)).fetchone()
+            if row is None:
+                return default
+            if now - row[1] > self.touch_interval:
+                conn.execute("UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                             (now, namespace, key))
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache read failed: {e}")
+            return default
+
+    def set(self, namespace, key, value, ttl=None):
+        """Store a JSON-serialisable value under the namespace's current generation."""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        try:
+            conn = self._connection()
+            conn.execute("""
+                INSERT INTO entries (namespace, key, value, generation, expires_at, last_access, size)
+                VALUES (?, ?, ?, (SELECT COALESCE(MAX(value), 0) FROM generations WHERE namespace = ?), ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE SET
+                    value = excluded.value, generation = excluded.generation, expires_at = excluded.expires_at,
+                    last_access = excluded.last_access, size = excluded.size
+            """, (namespace, key, payload, namespace, now + ttl if ttl else None, now, len(payload)))
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache write failed: {e}")
+
+    def set_many(self, namespace, items, ttl=None):
+        """Store many ``(key, value)`` pairs in one transaction; returns how many were stored."""
+        now = time.time()
+        rows = []
+        for key, value in items:
+            payload = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+            rows.append((namespace, key, payload, namespace, now + ttl if ttl else None, now, len(payload)))
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("""
+                INSERT INTO entries (namespace, key, value, generation, expires_at, last_access, size)
+                VALUES (?, ?, ?, (SELECT COALESCE(MAX(value), 0) FROM generations WHERE namespace = ?), ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE SET
+                    value = excluded.value, generation = excluded.generation, expires_at = excluded.expires_at,
+                    last_access = excluded.last_access, size = excluded.size
+            """, rows)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self._evict(conn, now)
+        return len(rows)
+
+    def items(self, namespace):
+        """Yield ``(key, value)`` for every live entry of ``namespace``."""
+        rows = self._connection().execute("""
+            SELECT e.key, e.value FROM entries e
+            LEFT JOIN generations g ON g.namespace = e.namespace
+            WHERE e.namespace = ? AND e.generation = COALESCE(g.value, 0)
+            AND (e.expires_at IS NULL OR e.expires_at > ?)
+            ORDER BY e.key
+        """, (namespace, time.time()))
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def delete(self, namespace, key):
+        self._connection().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _evict(self, conn, now):
+        # Both use an index, so a write costs the entries it removes rather than the table size
+        conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        count, total = conn.execute("SELECT entries, bytes FROM totals WHERE id = 0").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Evict the least recently used tenth in one go rather than one row per write
+        excess = max(count - self.max_entries, count // 10, 1)
+        conn.execute("""
+            DELETE FROM entries WHERE rowid IN (
+                SELECT rowid FROM entries ORDER BY last_access LIMIT ?
+            )
+        """, (excess,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
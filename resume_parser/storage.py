@@ -0,0 +1,248 @@
+"""Compact, versioned storage for parsed resume records.
+
+A stored record keeps the raw parse once; the formatted view shown by the
+web interface is derived from it with ``format_parsed_data`` when the record
+is read. Each ``.rpr`` file starts with a 6-byte header::
+
+    b'RPR' | format version | codec id | compression id
+
+followed by the encoded payload. The codec is msgpack when installed and
+compact JSON otherwise; the payload can be compressed with zstd (when
+installed) or gzip. Legacy ``.json`` files written with ``json.dump`` are
+still readable, and ``python -m resume_parser.storage convert <dir>``
+rewrites a directory of them in the new format.
+"""
+import os
+import sys
+import gzip
+import json
+import argparse
+import logging
+import threading
+
+from resume_parser.parser import format_parsed_data
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RPR'
+FORMAT_VERSION = 1
+RECORD_SUFFIX = '.rpr'
+LEGACY_SUFFIX = '.json'
+RECORD_SUFFIXES = (RECORD_SUFFIX, LEGACY_SUFFIX)
+
+CODECS = {'json': 0, 'msgpack': 1}
+COMPRESSIONS = {'none': 0, 'gzip': 1, 'zstd': 2}
+
+# Fields kept in a stored record; everything else is derived on read
+STORED_FIELDS = ('filename', 'source_file', 'content_sha256', 'raw_parsed_data')
+
+
+class StorageError(Exception):
+    """Raised when a stored record cannot be decoded."""
+
+
+def default_codec():
+    return 'msgpack' if msgpack is not None else 'json'
+
+
+def default_compression():
+    return 'zstd' if zstandard is not None else 'gzip'
+
+
+def compress(payload, compression):
+    """Compress bytes with the named compression ('none', 'gzip' or 'zstd')."""
+    if compression == 'gzip':
+        return gzip.compress(payload, compresslevel=6, mtime=0)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise StorageError("zstandard not installed. Install with: pip install zstandard")
+        return zstandard.ZstdCompressor(level=3).compress(payload)
+    if compression != 'none':
+        raise StorageError(f"Unknown compression: {compression}")
+    return payload
+
+
+def decompress(payload, compression_id):
+    """Undo :func:`compress`, given the compression's id from ``COMPRESSIONS``."""
+    if compression_id == COMPRESSIONS['gzip']:
+        return gzip.decompress(payload)
+    if compression_id == COMPRESSIONS['zstd']:
+        if zstandard is None:
+            raise StorageError("zstandard not installed. Install with: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+
+def encode_record(record, codec=None, compression=None):
+    """Encode a record (legacy or compact shape) to bytes in the current format."""
+    codec = codec or default_codec()
+    compression = compression or default_compression()
+    stored = {key: record[key] for key in STORED_FIELDS if key in record}
+    stored.update({key: value for key, value in record.items()
+                   if key not in STORED_FIELDS and key not in ('parsed_data', 'version')})
+    stored['version'] = FORMAT_VERSION
+
+    if codec == 'msgpack':
+        if msgpack is None:
+            raise StorageError("msgpack not installed. Install with: pip install msgpack")
+        payload = msgpack.packb(stored, use_bin_type=True)
+    elif codec == 'json':
+        payload = json.dumps(stored, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    else:
+        raise StorageError(f"Unknown codec: {codec}")
+
+    header = MAGIC + bytes([FORMAT_VERSION, CODECS[codec], COMPRESSIONS[compression]])
+    return header + compress(payload, compression)
+
+
+def decode_record(data):
+    """Decode bytes written by :func:`encode_record` (or legacy JSON) into a stored record."""
+    if not data.startswith(MAGIC):
+        try:
+            return json.loads(data.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise StorageError(f"Not a resume record: {e}")
+
+    version, codec_id, compression_id = data[3], data[4], data[5]
+    if version > FORMAT_VERSION:
+        raise StorageError(f"Record format version {version} is newer than supported ({FORMAT_VERSION})")
+    payload = data[6:]
+
+    payload = decompress(payload, compression_id)
+
+    if codec_id == CODECS['msgpack']:
+        if msgpack is None:
+            raise StorageError("msgpack not installed. Install with: pip install msgpack")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload.decode('utf-8'))
+
+
+def expand_record(stored):
+    """Return the in-memory view of a stored record, deriving 'parsed_data' if needed."""
+    if 'parsed_data' in stored:
+        return stored
+    record = dict(stored)
+    record['parsed_data'] = format_parsed_data(stored.get('raw_parsed_data') or {})
+    return record
+
+
+def read_record(path):
+    """Read a stored record (new or legacy format) and return its in-memory view."""
+    with open(path, 'rb') as f:
+        return expand_record(decode_record(f.read()))
+
+
+def write_record(path, record, codec=None, compression=None):
+    """Atomically write a record in the current format."""
+    data = encode_record(record, codec, compression)
+    # Unique temp name: an import worker and reprocess may write the same record at once
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return len(data)
+
+
+def record_filename(stem):
+    return stem + RECORD_SUFFIX
+
+
+def is_record_id(resume_id):
+    """Whether ``resume_id`` is a plain record file name, with no directory part."""
+    return (isinstance(resume_id, str) and resume_id.endswith(RECORD_SUFFIXES)
+            and os.path.basename(resume_id) == resume_id
+            and not any(char in resume_id for char in ('/', '\\', '\0')))
+
+
+def resolve_record_path(data_dir, resume_id):
+    """Return the path of ``resume_id``, following a legacy .json id to its converted .rpr file.
+
+    Raises:
+        ValueError: if ``resume_id`` is not a plain record file name, so a
+            client-supplied id can never reach outside ``data_dir``
+    """
+    if not is_record_id(resume_id):
+        raise ValueError(f"Not a resume record: {resume_id!r}")
+    path = os.path.join(data_dir, resume_id)
+    if not os.path.exists(path) and resume_id.endswith(LEGACY_SUFFIX):
+        converted = os.path.join(data_dir, resume_id[:-len(LEGACY_SUFFIX)] + RECORD_SUFFIX)
+        if os.path.exists(converted):
+            return converted
+    return path
+
+
+def convert_directory(data_dir, codec=None, compression=None, backup_dir=None):
+    """Convert every legacy .json record in ``data_dir`` to the compact format.
+
+    References between records (``duplicate_of``) are rewritten to the new
+    file names. Originals are moved to ``backup_dir`` if given, otherwise
+    deleted, so the directory never holds both copies of a record.
+
+    Returns:
+        Tuple of (records converted, bytes before, bytes after)
+    """
+    if backup_dir:
+        os.makedirs(backup_dir, exist_ok=True)
+    legacy = sorted(name for name in os.listdir(data_dir) if name.endswith(LEGACY_SUFFIX))
+    renames = {name: name[:-len(LEGACY_SUFFIX)] + RECORD_SUFFIX for name in legacy}
+    before = after = converted = 0
+
+    for name in legacy:
+        path = os.path.join(data_dir, name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            record = decode_record(data)
+        except (OSError, StorageError) as e:
+            logger.error(f"Skipping {name}: {e}")
+            continue
+
+        raw = record.get('raw_parsed_data') or {}
+        if raw.get('duplicate_of') in renames:
+            raw['duplicate_of'] = renames[raw['duplicate_of']]
+
+        after += write_record(os.path.join(data_dir, renames[name]), record, codec, compression)
+        before += len(data)
+        converted += 1
+        if backup_dir:
+            os.replace(path, os.path.join(backup_dir, name))
+        else:
+            os.remove(path)
+
+    return converted, before, after
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage stored resume records.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help="Convert legacy .json records to the compact format")
+    convert.add_argument('data_dir', nargs='?', default='parsed_data')
+    convert.add_argument('--codec', choices=sorted(CODECS))
+    convert.add_argument('--compression', choices=sorted(COMPRESSIONS))
+    convert.add_argument('--backup-dir', help="Move the original .json files here instead of deleting them")
+    args = parser.parse_args(argv)
+
+    converted, before, after = convert_directory(args.data_dir, args.codec, args.compression, args.backup_dir)
+    ratio = (after / before * 100) if before else 0
+    print(f"Converted {converted} records: {before} bytes -> {after} bytes ({ratio:.1f}%)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import os
+from datetime import datetime, timezone
+
+
+def build_result_view(record):
+    """Build the view model rendered by results.html from a stored record."""
+    parsed = record.get('parsed_data') or {}
+    return {
+        'filename': record.get('filename'),
+        'skills': parsed.get('skills', []),
+        'education': parsed.get('education', []),
+        'experience': parsed.get('experience', []),
+        'degree_info': parsed.get('degree_info') or {}
+    }
+
+
+class RecordVersion:
+    """Version of a stored record file, used for cache keys and HTTP validators."""
+
+    def __init__(self, path):
+        stat = os.stat(path)
+        self.name = os.path.basename(path)
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+
+    @property
+    def key(self):
+        return f"{self.name}:{self.mtime_ns}:{self.size}"
+
+    @property
+    def etag(self):
+        return f"{self.mtime_ns:x}-{self.size:x}"
+
+    @property
+    def last_modified(self):
+        # HTTP dates have one-second resolution
+        return datetime.fromtimestamp(self.mtime_ns // 1_000_000_000, tz=timezone.utc)
@@ -0,0 +1,177 @@
+import os
+import threading
+import logging
+
+from resume_parser.corpus import ADDED, UPDATED, REMOVED
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotBackend:
+    """Detect changes by diffing (mtime, size) snapshots of the directory."""
+
+    name = "snapshot"
+
+    def __init__(self, directory, suffixes, interval=2.0):
+        self.directory = directory
+        self.suffixes = suffixes
+        self.interval = interval
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        state = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(self.suffixes) and entry.is_file():
+                        st = entry.stat()
+                        state[entry.name] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
+        return state
+
+    def prime(self):
+        self._state = self._scan()
+
+    def read(self, stop_event):
+        if stop_event.wait(self.interval):
+            return []
+        return self.diff()
+
+    def read_now(self):
+        return self.diff()
+
+    def diff(self):
+        """Return the events since the previous scan."""
+        with self._lock:
+            return self._diff()
+
+    def _diff(self):
+        state = self._scan()
+        events = []
+        for name, signature in state.items():
+            previous = self._state.get(name)
+            if previous is None:
+                events.append((ADDED, name))
+            elif previous != signature:
+                events.append((UPDATED, name))
+        for name in self._state:
+            if name not in state:
+                events.append((REMOVED, name))
+        self._state = state
+        return events
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Receive change events from the kernel via inotify."""
+
+    name = "inotify"
+
+    def __init__(self, directory, suffixes, interval=2.0):
+        from inotify_simple import INotify, flags
+
+        self.directory = directory
+        self.suffixes = suffixes
+        self.interval = interval
+        self.flags = flags
+        self.inotify = INotify()
+        self.inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE)
+        # Used to resynchronise after a kernel queue overflow
+        self._fallback = SnapshotBackend(directory, suffixes)
+
+    def prime(self):
+        self._fallback.prime()
+
+    def read(self, stop_event):
+        events = self._translate(self.inotify.read(timeout=int(self.interval * 1000)))
+        return [] if stop_event.is_set() else events
+
+    def read_now(self):
+        return self._translate(self.inotify.read(timeout=0))
+
+    def _translate(self, raw_events):
+        flags = self.flags
+
+        changes = {}
+        for event in raw_events:
+            if event.mask & flags.Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, rescanning directory")
+                return self._fallback.diff()
+            if not event.name.endswith(self.suffixes):
+                continue
+            if event.mask & (flags.MOVED_FROM | flags.DELETE):
+                changes[event.name] = REMOVED
+            else:
+                changes[event.name] = UPDATED
+        return [(kind, name) for name, kind in changes.items()]
+
+    def close(self):
+        self.inotify.close()
+
+
+class CorpusWatcher:
+    """Watch a directory of parsed results and report incremental changes.
+
+    ``callback`` receives a list of ``(kind, name)`` events, the format
+    consumed by :meth:`ResumeCorpus.apply`. inotify is used when the
+    ``inotify_simple`` package is installed and the platform supports it;
+    otherwise the directory is polled every ``interval`` seconds and
+    compared against the previous (mtime, size) snapshot.
+    """
+
+    def __init__(self, directory, callback, suffixes=('.json',), interval=2.0):
+        self.directory = directory
+        self.callback = callback
+        self.suffixes = tuple(suffixes)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.backend = self._create_backend()
+
+    def _create_backend(self):
+        try:
+            backend = InotifyBackend(self.directory, self.suffixes, self.interval)
+            logger.info(f"Watching {self.directory} with inotify")
+            return backend
+        except ImportError:
+            logger.info("inotify_simple not installed, falling back to polling. Install with: pip install inotify_simple")
+        except OSError as e:
+            logger.info(f"inotify unavailable ({e}), falling back to polling")
+        return SnapshotBackend(self.directory, self.suffixes, self.interval)
+
+    def prime(self):
+        """Record the current directory state so only later changes are reported."""
+        self.backend.prime()
+
+    def sync(self):
+        """Pick up pending changes immediately instead of waiting for the next poll."""
+        events = self.backend.read_now()
+        if events:
+            self.callback(events)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                events = self.backend.read(self._stop)
+                if events:
+                    self.callback(events)
+            except Exception as e:
+                logger.error(f"Error watching {self.directory}: {str(e)}")
+                self._stop.wait(self.interval)
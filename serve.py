@@ -0,0 +1,91 @@
+"""Production launcher: the app under gunicorn with worker counts from flags or the environment.
+
+Two modes:
+
+- wsgi: app:app on gunicorn's threaded workers; every request holds one of
+  a worker's ``--threads`` threads until its response is sent, uploads
+  waiting on the LLM included;
+- asgi: asgi:application on gunicorn's asgi worker (or uvicorn when this
+  gunicorn has none); connections are held by the event loop and views run
+  on a pool of RESUME_ASGI_THREADS threads (``--threads`` sets it), uploads
+  on one of RESUME_ASGI_UPLOAD_THREADS.
+
+Each worker process loads its own corpus, indexes and extraction sandboxes,
+so workers cost memory; add threads before adding workers. Worker counts
+default to RESUME_WEB_WORKERS, then WEB_CONCURRENCY, then the number of CPUs
+up to 4. Run it from the directory that holds (or should hold) uploads and
+parsed_data.
+
+Usage:
+    python serve.py [--mode asgi|wsgi] [--bind 0.0.0.0:8000] [--workers 4] [--threads 16]
+        [--connections 1000] [--timeout 120]
+"""
+import os
+import sys
+import argparse
+import importlib.util
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_workers():
+    workers = os.environ.get('RESUME_WEB_WORKERS') or os.environ.get('WEB_CONCURRENCY')
+    return int(workers) if workers else min(4, os.cpu_count() or 1)
+
+
+def installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def build_command(args):
+    """Return (argv, extra environment) of the server process for ``args``."""
+    env = {}
+    if args.mode == 'asgi':
+        if args.threads:
+            env['RESUME_ASGI_THREADS'] = str(args.threads)
+        if installed('gunicorn.workers.gasgi'):
+            command = [sys.executable, '-m', 'gunicorn', '-k', 'asgi', '--worker-connections', str(args.connections)]
+        elif installed('uvicorn'):
+            host, _, port = args.bind.rpartition(':')
+            return [sys.executable, '-m', 'uvicorn', '--app-dir', REPO, '--host', host or '127.0.0.1',
+                    '--port', port, '--workers', str(args.workers), '--lifespan', 'on',
+                    '--limit-concurrency', str(args.connections), 'asgi:application'], env
+        else:
+            raise SystemExit("No ASGI server found. Install one with: pip install 'gunicorn>=25' (or uvicorn)")
+        app = 'asgi:application'
+    else:
+        if not installed('gunicorn'):
+            raise SystemExit("gunicorn not installed. Install with: pip install gunicorn")
+        command = [sys.executable, '-m', 'gunicorn', '-k', 'gthread', '--threads', str(args.threads or 8)]
+        app = 'app:app'
+    # No --preload: the corpus watcher and extraction sandboxes must start in each worker, not before the fork
+    command += ['--pythonpath', REPO, '--bind', args.bind, '--workers', str(args.workers),
+                '--timeout', str(args.timeout), '--graceful-timeout', str(args.timeout), app]
+    return command, env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['asgi', 'wsgi'], default=os.environ.get('RESUME_SERVE_MODE', 'asgi'))
+    parser.add_argument('--bind', default=os.environ.get('RESUME_BIND', '127.0.0.1:8000'))
+    parser.add_argument('--workers', type=int, default=default_workers(), help="Worker processes")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Threads per worker (wsgi, default 8) or view threads per worker (asgi)")
+    parser.add_argument('--connections', type=int, default=1000, help="Open connections per worker (asgi)")
+    parser.add_argument('--timeout', type=int, default=120, help="Seconds before a stuck worker is restarted")
+    parser.add_argument('--dry-run', action='store_true', help="Print the server command instead of running it")
+    args = parser.parse_args()
+
+    command, env = build_command(args)
+    if args.dry_run:
+        print(*(f'{key}={value}' for key, value in env.items()), *command)
+        return
+    os.environ.update(env)
+    os.execv(command[0], command)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Near-duplicate flagging of uploads served from the shared parse cache."""
+import os
+
+from resume_parser.corpus import ResumeCorpus, UPDATED
+from resume_parser.dedup import MinHashLSH
+from resume_parser.export import matching_ids
+from resume_parser.parser import flag_duplicate
+from resume_parser.query import ResumeQuery
+from resume_parser.shared_cache import SharedCache
+from resume_parser.storage import write_record, record_filename
+
+TEXT = ' '.join(f"Jane Doe built data pipeline number {i} in Python and SQL" for i in range(10))
+
+
+def store(corpus, data_dir, name, parsed):
+    """Write a record the way ingest_upload does and make it visible to the corpus."""
+    resume_id = record_filename(name)
+    write_record(os.path.join(data_dir, resume_id),
+                 {'filename': 'cv.docx', 'source_file': f'{name}_cv.docx', 'content_sha256': 'sha',
+                  'raw_parsed_data': parsed})
+    corpus.apply([(UPDATED, resume_id)])
+    return resume_id
+
+
+def test_second_upload_served_from_parse_cache_is_collapsed(tmp_path):
+    data_dir = tmp_path / 'parsed_data'
+    data_dir.mkdir()
+    cache = SharedCache(str(tmp_path / 'shared_cache.sqlite3'))
+    dedup_index = MinHashLSH()
+    corpus = ResumeCorpus(str(data_dir))
+    corpus.subscribe(dedup_index.corpus_listener)
+
+    # The first upload's parse, cached by file hash before any duplicate existed
+    cache.set('parse', 'sha', {'name': 'Jane Doe', 'skills': ['Python', 'SQL'],
+                               'minhash_signature': dedup_index.signature(TEXT), 'duplicate_of': None})
+    first = store(corpus, data_dir, 'first', flag_duplicate(cache.get('parse', 'sha'), dedup_index))
+    second = store(corpus, data_dir, 'second', flag_duplicate(cache.get('parse', 'sha'), dedup_index))
+
+    snapshot = corpus.snapshot()
+    assert snapshot.get(first)['raw_parsed_data']['duplicate_of'] is None
+    assert snapshot.get(second)['raw_parsed_data']['duplicate_of'] == first
+    assert matching_ids(snapshot, ResumeQuery(all_skills=['python'])) == [first]
+    assert matching_ids(snapshot, ResumeQuery(all_skills=['python']), collapse_duplicates=False) == [first, second]
+    # Flagging works on a copy; the cached parse stays as it was
+    assert cache.get('parse', 'sha')['duplicate_of'] is None
+
+
+def test_shared_cache_evicts_down_to_max_entries(tmp_path):
+    cache = SharedCache(str(tmp_path / 'shared_cache.sqlite3'), max_entries=50)
+    for i in range(200):
+        cache.set('parse', f'sha{i}', {'skills': ['Python'], 'n': i})
+    assert len(list(cache.items('parse'))) <= 50
+    assert cache.get('parse', 'sha199') == {'skills': ['Python'], 'n': 199}
@@ -0,0 +1,50 @@
+"""PriorityScheduler: weighted fair shares between classes and reservation clamping."""
+import time
+import threading
+
+from resume_parser.scheduler import PriorityScheduler, Job, INTERACTIVE, BULK
+
+
+def grant_order(scheduler, jobs):
+    """Queue ``jobs`` behind a held slot, then release it; returns the priorities in the order granted."""
+    blocker = Job(INTERACTIVE, 'blocker')
+    scheduler.acquire(blocker)
+    order = []
+
+    def run(job):
+        with scheduler.slot(job):
+            order.append(job.priority)
+
+    threads = []
+    for job in jobs:
+        thread = threading.Thread(target=run, args=(job,))
+        thread.start()
+        threads.append(thread)
+        # Queue in a known order
+        while sum(cls['queued'] for cls in scheduler.metrics()['classes'].values()) < len(threads):
+            time.sleep(0.001)
+    scheduler.release(blocker)
+    for thread in threads:
+        thread.join(timeout=10)
+    return order
+
+
+def test_classes_interleave_by_weight():
+    scheduler = PriorityScheduler(1, weights={INTERACTIVE: 8, BULK: 1})
+    # Bulk queued first: strict priority would still serve all 40 interactive jobs before it
+    jobs = [Job(BULK, 'import')] * 10 + [Job(INTERACTIVE, 'recruiter')] * 40
+    order = grant_order(scheduler, jobs)
+
+    assert len(order) == 50
+    # While both classes wait, every run of nine grants holds one bulk job
+    for start in range(0, 36, 9):
+        assert order[start:start + 9].count(BULK) == 1, order
+
+
+def test_reservation_leaves_one_slot_when_capacity_shrinks():
+    capacity = [4]
+    scheduler = PriorityScheduler(lambda: capacity[0], reserved={INTERACTIVE: 3})
+    capacity[0] = 1
+    # Without the clamp the reservation would hold back the only slot from bulk work forever
+    with scheduler.slot(Job(BULK, 'import'), deadline=time.monotonic() + 1):
+        pass